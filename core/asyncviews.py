@@ -0,0 +1,196 @@
+# core/asyncviews.py
+"""Async-native read endpoints for the ASGI entry point.
+
+``AsyncReadView`` serves list and detail GETs with Django's async ORM, so
+under ASGI a single worker can keep many slow reads in flight instead of
+parking each one on a thread. Rows are read with ``values()`` and rendered by
+the same ``RowBuilder`` as the ``?fast=1`` path, so the payloads match the
+regular API (including ``?fields=`` / ``?expand=``). Access mirrors the API:
+a ``Token`` header, or else the session, checked against
+``DEFAULT_PERMISSION_CLASSES``.
+"""
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views import View
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import aauthenticate_token
+from .fastpath import RowBuilder
+from .models import Category, Location, Person, Supplier
+from .serializers import CategorySerializer, LocationSerializer, PersonSerializer, SupplierSerializer, split_param
+
+
+async def aauthenticate(request):
+    """Return the active user behind a ``Token`` header or the session, or None."""
+    header = request.headers.get('Authorization', '').split()
+    if header and header[0].lower() == 'token':
+        if len(header) != 2:
+            return None
+        return await aauthenticate_token(header[1])
+    user = await sync_to_async(get_user)(request)
+    return user if user.is_authenticated else None
+
+
+def _error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+async def aauthorize(request, view):
+    """The 401 / 403 response the API would give ``request``, or None when it may proceed.
+
+    Checks ``DEFAULT_PERMISSION_CLASSES`` like the DRF viewsets; permissions
+    may read the user row, so they run in a thread.
+    """
+    user = await aauthenticate(request)
+    if user is None:
+        response = _error('Authentication credentials were not provided.', 401)
+        response['WWW-Authenticate'] = 'Token'
+        return response
+    request.user = user
+    permissions = [permission() for permission in api_settings.DEFAULT_PERMISSION_CLASSES]
+    allowed = await sync_to_async(lambda: all(permission.has_permission(request, view) for permission in permissions))()
+    if not allowed:
+        return _error('You do not have permission to perform this action.', 403)
+    return None
+
+
+class AsyncReadView(View):
+    """Read-only async list (``pk`` absent) and detail endpoint.
+
+    Lists use page-number pagination like the regular API, or keyset
+    pagination over ``cursor_ordering`` when it is set, so deep pages of large
+    ledgers never count or offset.
+    """
+    http_method_names = ['get', 'head', 'options']
+    queryset = None
+    serializer_class = None
+    filterset_class = None
+    cursor_ordering = None
+    page_size = None
+    max_page_size = 500
+
+    def get_page_size(self):
+        return self.page_size or api_settings.PAGE_SIZE
+
+    def get_builder(self, request):
+        serializer = self.serializer_class(
+            fields=split_param(request.GET.get('fields')), expand=split_param(request.GET.get('expand')),
+        )
+        return RowBuilder(serializer)
+
+    async def get_queryset(self, request):
+        queryset = self.queryset.all()
+        if self.filterset_class is not None and set(request.GET) & set(self.filterset_class.base_filters):
+            # Model choice filters validate their ids against the database.
+            filterset = self.filterset_class(request.GET, queryset=queryset, request=request)
+            if not await sync_to_async(filterset.is_valid)():
+                return None, filterset.errors
+            queryset = filterset.qs
+        return queryset, None
+
+    async def get(self, request, pk=None):
+        denied = await aauthorize(request, self)
+        if denied is not None:
+            return denied
+        builder = self.get_builder(request)
+        if pk is not None:
+            row = await self.queryset.filter(pk=pk).values(*builder.columns).afirst()
+            if row is None:
+                return _error('Not found.', 404)
+            return JsonResponse(builder.build(row))
+        queryset, errors = await self.get_queryset(request)
+        if errors:
+            return JsonResponse(errors, status=400)
+        if self.cursor_ordering:
+            return await self.keyset_page(request, queryset, builder)
+        return await self.numbered_page(request, queryset, builder)
+
+    async def numbered_page(self, request, queryset, builder):
+        size = self.get_page_size()
+        try:
+            number = int(request.GET.get('page', 1))
+        except ValueError:
+            number = 0
+        if number < 1:
+            return _error('Invalid page.', 404)
+        count = await queryset.acount()
+        if number > 1 and (number - 1) * size >= count:
+            return _error('Invalid page.', 404)
+        offset = (number - 1) * size
+        rows = [builder.build(row) async for row in queryset.values(*builder.columns)[offset:offset + size]]
+        url = request.build_absolute_uri()
+        previous = None
+        if number == 2:
+            previous = remove_query_param(url, 'page')
+        elif number > 2:
+            previous = replace_query_param(url, 'page', number - 1)
+        return JsonResponse({
+            'count': count,
+            'next': replace_query_param(url, 'page', number + 1) if offset + size < count else None,
+            'previous': previous,
+            'results': rows,
+        })
+
+    def decode_cursor(self, value):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(value.encode()))
+            return parse_datetime(position[0]) or position[0], int(position[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            return None
+
+    def encode_cursor(self, row):
+        first, last = (name.lstrip('-') for name in self.cursor_ordering)
+        value = row[first].isoformat() if hasattr(row[first], 'isoformat') else row[first]
+        position = json.dumps([value, row[last]])
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    async def keyset_page(self, request, queryset, builder):
+        # ``cursor_ordering`` is a descending (value, unique id) pair such as ('-date', '-id').
+        first, last = (name.lstrip('-') for name in self.cursor_ordering)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            position = self.decode_cursor(cursor)
+            if position is None:
+                return _error('Invalid cursor', 404)
+            value, pk = position
+            queryset = queryset.filter(Q(**{f'{first}__lt': value}) | Q(**{first: value, f'{last}__lt': pk}))
+        try:
+            size = min(int(request.GET.get('page_size', self.get_page_size())), self.max_page_size)
+        except ValueError:
+            size = self.get_page_size()
+        size = max(size, 1)
+        columns = [*builder.columns, *(name for name in (first, last) if name not in builder.columns)]
+        rows = [row async for row in queryset.order_by(*self.cursor_ordering).values(*columns)[:size + 1]]
+        url = request.build_absolute_uri()
+        next_url = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_url = replace_query_param(url, 'cursor', self.encode_cursor(rows[-1]))
+        return JsonResponse({'next': next_url, 'results': [builder.build(row) for row in rows]})
+
+
+class CategoryReadView(AsyncReadView):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+
+
+class SupplierReadView(AsyncReadView):
+    queryset = Supplier.objects.all()
+    serializer_class = SupplierSerializer
+
+
+class LocationReadView(AsyncReadView):
+    queryset = Location.objects.all()
+    serializer_class = LocationSerializer
+
+
+class PersonReadView(AsyncReadView):
+    queryset = Person.objects.all()
+    serializer_class = PersonSerializer
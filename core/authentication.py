@@ -0,0 +1,148 @@
+# core/authentication.py
+"""Token authentication with the token lookup cached.
+
+``CachedTokenAuthentication`` is a drop-in replacement for DRF's
+``TokenAuthentication``: the token's user id and ``is_active`` flag are kept
+in the Django cache for ``CORE_TOKEN_CACHE_TIMEOUT`` seconds, so repeat
+requests with the same token skip the ``authtoken_token`` / ``auth_user``
+query, and the user row is only loaded if the request reads more than its id.
+Entries are dropped as soon as the token is deleted or its user is saved
+(deactivated, password changed, ...), and again on commit so a concurrent
+request cannot put the old state back; code that changes users with
+``QuerySet.update()`` must call ``invalidate_users()``.
+
+A revoked token must stop working in every worker, so the cache is only used
+when the default backend is shared between processes; with a process-local one
+(``LocMemCache``, ``DummyCache``) every request reads the token. Hit and miss
+counts are kept per process.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def cache_key(key):
+    return 'core:token:' + hashlib.sha1(key.encode()).hexdigest()
+
+
+def cache_timeout():
+    return getattr(settings, 'CORE_TOKEN_CACHE_TIMEOUT', 60)
+
+
+def caching():
+    """Whether token lookups are cached: only with a cache every worker sees."""
+    return cache_timeout() > 0 and settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def record(hit):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def stats():
+    """Hits, misses and hit rate of the token cache in this process."""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+def invalidate(keys):
+    keys = [cache_key(key) for key in keys]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_users(user_ids):
+    """Drop the cached tokens of ``user_ids``, e.g. after deactivating them with ``QuerySet.update()``."""
+    invalidate(Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+
+
+class CachedUser(SimpleLazyObject):
+    """An active user known by id; the row is loaded on first use of any other attribute."""
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        super().__init__(lambda: get_user_model()._default_manager.get(pk=user_id))
+        self.__dict__.update(pk=user_id, id=user_id)
+
+    def __bool__(self):
+        return True
+
+
+def _token_state(key):
+    return Token.objects.filter(key=key).values_list('user_id', 'user__is_active')
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = caching()
+        entry = cache.get(cache_key(key)) if cached else None
+        record(entry is not None)
+        if entry is None:
+            entry = _token_state(key).first()
+            if entry is None:
+                raise AuthenticationFailed(_('Invalid token.'))
+            if cached:
+                cache.set(cache_key(key), entry, cache_timeout())
+        user_id, is_active = entry
+        if not is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return CachedUser(user_id), Token(key=key, user_id=user_id)
+
+
+async def aauthenticate_token(key):
+    """Async counterpart of ``CachedTokenAuthentication``; returns the user or None."""
+    cached = caching()
+    entry = await cache.aget(cache_key(key)) if cached else None
+    record(entry is not None)
+    if entry is None:
+        entry = await _token_state(key).afirst()
+        if entry is None:
+            return None
+        if cached:
+            await cache.aset(cache_key(key), entry, cache_timeout())
+    user_id, is_active = entry
+    return CachedUser(user_id) if is_active else None
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate([instance.key])
+
+
+@receiver(post_save, sender=get_user_model())
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # Deleting a user deletes its tokens, which invalidates them above; logins
+    # only touch last_login.
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidate_users([instance.pk])
@@ -0,0 +1,86 @@
+# core/caching.py
+"""Conditional GET and response caching for rarely changing reference data.
+
+Every model has a version stamp in the ``ModelVersion`` table, moved forward
+(after commit) whenever one of its rows is saved or deleted. ETag and
+Last-Modified derive from that stamp, so a client revalidating an unchanged
+collection gets a 304 after a single primary-key lookup and no serialization,
+and other requests reuse the cached response data until the next change.
+Keeping the stamp in the database means every worker process sees a bump at
+once; the cached responses are keyed by the stamp, so a process-local cache
+backend is fine for them.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .db import pin_primary
+from .models import ModelVersion
+
+
+def model_version(model):
+    """Timestamp of the last change to ``model``, starting a new one if unknown."""
+    label = model._meta.label_lower
+    version = ModelVersion.objects.filter(label=label).values_list('version', flat=True).first()
+    if version is None:
+        ModelVersion.objects.bulk_create([ModelVersion(label=label, version=time.time())], ignore_conflicts=True)
+        with pin_primary():
+            version = ModelVersion.objects.filter(label=label).values_list('version', flat=True).get()
+    return version
+
+
+def _bump(label):
+    now = time.time()
+    # Never move backwards, whatever the clock of the bumping worker says.
+    if not ModelVersion.objects.filter(label=label).update(version=Greatest(F('version') + 0.001, Value(now))):
+        ModelVersion.objects.bulk_create([ModelVersion(label=label, version=now)], ignore_conflicts=True)
+
+
+def bump_model_version(model):
+    label = model._meta.label_lower
+    transaction.on_commit(lambda: _bump(label))
+
+
+class ConditionalCacheMixin:
+    """Serve ``list`` and ``retrieve`` with ETag / Last-Modified from a model version stamp."""
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        version = model_version(self.queryset.model)
+        fingerprint = hashlib.md5(
+            f'{version}:{request.get_full_path()}:{request.META.get("HTTP_ACCEPT", "")}'.encode()
+        ).hexdigest()
+        etag = quote_etag(fingerprint)
+        # Last-Modified has whole seconds: until the stamp's second is over, a
+        # later write could share it, so the date cannot validate anything yet.
+        last_modified = int(version) if int(version) < int(time.time()) else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            key = f'core:response:{self.queryset.model._meta.label_lower}:{fingerprint}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response.data, getattr(settings, 'CORE_RESPONSE_CACHE_TIMEOUT', 600))
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
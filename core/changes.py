@@ -0,0 +1,180 @@
+# core/changes.py
+"""Delta-sync change feed for offline clients.
+
+Registered models are read in ``(updated_at, id)`` order and their deletes
+from ``Tombstone`` in ``(deleted_at, id)`` order, both by range scans on
+indexes of those columns. A page merges these streams by time, and the cursor
+records how far each stream has been read, so an incremental sync only touches
+rows that changed since. A sync without a cursor returns every row and no
+tombstones.
+
+Only rows older than ``CORE_CHANGES_SETTLE_SECONDS`` are served: ``updated_at``
+comes from the application clock when the row is saved, so a slow transaction
+can commit a timestamp that is already behind a cursor handed out meanwhile.
+The settle window must exceed the longest write transaction plus any clock
+skew between workers. Tombstones older than ``CORE_TOMBSTONE_RETENTION_DAYS``
+are pruned by ``manage.py prune_tombstones``; a cursor that old is rejected
+and the client has to sync from scratch.
+"""
+import base64
+import heapq
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import SET_NULL, Q
+from django.db.models.signals import post_delete, pre_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .db import pin_primary
+from .models import Location, Person, Tombstone
+from .serializers import LocationSerializer, PersonSerializer
+
+# Feed name -> (model, serializer class).
+_registry = {}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def register(name, model, serializer_class):
+    """Publish ``model`` in the change feed as ``name``; deletes are recorded from now on."""
+    _registry[name] = (model, serializer_class)
+    post_delete.connect(record_delete, sender=model, dispatch_uid=f'core.changes.{name}')
+    # Only models that feed rows point at with SET_NULL get a pre_delete
+    # receiver; any receiver at all stops a model's deletes from being fast.
+    for field in model._meta.fields:
+        if field.is_relation and field.remote_field.on_delete is SET_NULL:
+            target = field.related_model
+            pre_delete.connect(touch_orphans, sender=target, dispatch_uid=f'core.changes.orphans.{target._meta.label}')
+
+
+def registered():
+    return list(_registry)
+
+
+def _feed_name(model):
+    for name, (registered_model, _) in _registry.items():
+        if registered_model is model:
+            return name
+    return None
+
+
+def record_delete(sender, instance, **kwargs):
+    Tombstone.objects.create(model=_feed_name(sender), object_id=instance.pk)
+
+
+def touch_orphans(sender, instance, **kwargs):
+    # SET_NULL clears the foreign key with a queryset update, which leaves
+    # updated_at alone; move the referencing feed rows forward instead.
+    for relation in sender._meta.related_objects:
+        if relation.on_delete is SET_NULL and _feed_name(relation.related_model):
+            relation.related_model._default_manager.filter(**{relation.field.name: instance}).update(
+                updated_at=timezone.now(),
+            )
+
+
+def settle_seconds():
+    return getattr(settings, 'CORE_CHANGES_SETTLE_SECONDS', 5)
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'CORE_TOMBSTONE_RETENTION_DAYS', 90))
+
+
+def decode_cursor(value):
+    """``{stream: (time, id or None)}``; an id of None means everything up to that time was read."""
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(value.encode()))
+        decoded = {}
+        for stream, (moment, pk) in positions.items():
+            moment = parse_datetime(moment)
+            if moment is None:
+                raise ValueError(moment)
+            decoded[stream] = (moment, None if pk is None else int(pk))
+        return decoded
+    except (TypeError, ValueError, AttributeError):
+        raise InvalidCursor('Invalid cursor.')
+
+
+def encode_cursor(positions):
+    value = json.dumps({stream: [moment.isoformat(), pk] for stream, (moment, pk) in positions.items()})
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def _after(position, time_field):
+    if position is None:
+        return Q()
+    moment, pk = position
+    if pk is None:
+        return Q(**{f'{time_field}__gt': moment})
+    return Q(**{f'{time_field}__gt': moment}) | Q(**{time_field: moment, 'id__gt': pk})
+
+
+def page(names, cursor=None, limit=500):
+    """The next ``limit`` changes of the named models after ``cursor``.
+
+    Returns ``(changes, cursor, more)``; ``changes`` are ``upsert`` entries with
+    the serialized row and ``delete`` entries with the id, oldest first.
+    """
+    now = timezone.now()
+    horizon = now - timedelta(seconds=settle_seconds())
+    positions = decode_cursor(cursor) if cursor else {}
+    for name in names:
+        # A fresh client gets the current rows, so earlier deletes are moot.
+        positions.setdefault(f'delete:{name}', (horizon, None))
+        if positions[f'delete:{name}'][0] < now - retention():
+            raise CursorExpired('The cursor is older than the deletion log; sync from scratch.')
+
+    streams = {}
+    with pin_primary():
+        for name in names:
+            model = _registry[name][0]
+            streams[f'upsert:{name}'] = list(
+                model._default_manager.filter(_after(positions.get(f'upsert:{name}'), 'updated_at'))
+                .filter(updated_at__lte=horizon).order_by('updated_at', 'id')
+                .values_list('updated_at', 'id')[:limit + 1]
+            )
+            streams[f'delete:{name}'] = list(
+                Tombstone.objects.filter(model=name).filter(_after(positions[f'delete:{name}'], 'deleted_at'))
+                .filter(deleted_at__lte=horizon).order_by('deleted_at', 'id')
+                .values_list('deleted_at', 'id', 'object_id')[:limit + 1]
+            )
+
+        taken = list(heapq.merge(*(
+            [(key[0], stream, key[1], key[-1]) for key in keys] for stream, keys in sorted(streams.items())
+        )))
+        more = len(taken) > limit
+        taken = taken[:limit]
+
+        rows = {}
+        for name in names:
+            model, serializer_class = _registry[name]
+            ids = [object_id for _, stream, _, object_id in taken if stream == f'upsert:{name}']
+            if ids:
+                objects = model._default_manager.filter(pk__in=ids)
+                data = serializer_class(objects, many=True, fields=None, expand=set()).data
+                rows.update({(name, row['id']): row for row in data})
+
+    changes = []
+    for moment, stream, pk, object_id in taken:
+        operation, name = stream.split(':')
+        positions[stream] = (moment, pk)
+        if operation == 'delete':
+            changes.append({'model': name, 'op': 'delete', 'id': object_id})
+        elif (name, object_id) in rows:
+            changes.append({'model': name, 'op': 'upsert', 'id': object_id, 'data': rows[(name, object_id)]})
+    if not more:
+        # Every stream is exhausted up to the horizon.
+        positions.update({stream: (horizon, None) for stream in streams})
+    return changes, encode_cursor(positions), more
+
+
+register('location', Location, LocationSerializer)
+register('person', Person, PersonSerializer)
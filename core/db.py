@@ -0,0 +1,133 @@
+# core/db.py
+"""Primary/replica routing and per-connection database setup.
+
+Reads of ``core`` and ``invent`` models go to the primary unless
+``ReplicaPinningMiddleware`` opted the current request into a replica: a
+safe-method request from a client that has not written in the last
+``DB_REPLICA_PIN_SECONDS`` (read-your-writes) gets one replica from
+``DATABASE_REPLICAS`` for all of its queries, so a paginated response counts
+and pages the same data. Signal handlers, management commands and other code
+outside such a request therefore read the primary, and so do reads while the
+primary has a transaction open, during ``pin_primary()``, and after the request
+has written anything. The pin is keyed by the client's token or session in the
+default cache, which must be shared between processes for the pin to follow a
+client across workers.
+"""
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+ROUTED_APPS = {'core', 'invent'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+_pinned = ContextVar('core_db_pinned', default=False)
+_replica = ContextVar('core_db_replica', default=None)
+
+
+@contextmanager
+def pin_primary():
+    """Send every read inside the block to the primary."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        replica = _replica.get()
+        if replica is None or _pinned.get() or connections['default'].in_atomic_block:
+            return 'default'
+        return replica
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        # Whatever the request reads after a write (pre_save and post_save
+        # handlers included) must see it.
+        if _replica.get() is not None:
+            _replica.set(None)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *getattr(settings, 'DATABASE_REPLICAS', ())}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in getattr(settings, 'DATABASE_REPLICAS', ()) else None
+
+
+def _pin_key(request):
+    identity = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not identity:
+        return None
+    return 'core:db:pin:' + hashlib.sha1(identity.encode()).hexdigest()
+
+
+def _choose_replica(request, pinned):
+    replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+    if pinned or request.method not in SAFE_METHODS or not replicas:
+        return None
+    return random.choice(replicas)
+
+
+class ReplicaPinningMiddleware:
+    """Read a safe-method request from one replica, unless its client wrote in the last few seconds."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key, writing = _pin_key(request), request.method not in SAFE_METHODS
+        pinned = writing or (key is not None and cache.get(key) is not None)
+        token = _replica.set(_choose_replica(request, pinned))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+        if writing and key is not None and response.status_code < 400:
+            cache.set(key, 1, settings.DB_REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        key, writing = _pin_key(request), request.method not in SAFE_METHODS
+        pinned = writing or (key is not None and await cache.aget(key) is not None)
+        token = _replica.set(_choose_replica(request, pinned))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+        if writing and key is not None and response.status_code < 400:
+            await cache.aset(key, 1, settings.DB_REPLICA_PIN_SECONDS)
+        return response
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # WAL lets readers (and the replica stand-in) proceed while a writer
+        # holds the lock; NORMAL sync is durable in WAL mode at a fraction of
+        # the fsyncs.
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(connection.settings_dict["OPTIONS"].get("timeout", 5) * 1000)}')
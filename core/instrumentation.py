@@ -0,0 +1,192 @@
+# core/instrumentation.py
+"""Sampled per-request timings: queries, SQL time, serializer time and total.
+
+``InstrumentationMiddleware`` samples ``CORE_INSTRUMENTATION_SAMPLE_RATE`` of
+the requests. For a sampled request every query on every connection is timed
+(a wrapper installed on each connection when it opens checks a context
+variable, so it follows the request into ``sync_to_async`` threads), and
+serializers and the fast list path add the time spent building
+representations. The response gets a ``Server-Timing`` header, requests slower
+than ``CORE_SLOW_REQUEST_MS`` are logged with their slowest query, and the
+last ``CORE_INSTRUMENTATION_WINDOW`` samples of each route are kept in memory
+for the admin metrics endpoint. Unsampled requests only pay for one random
+draw, and none at all when the rate is 0.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('core_request_metrics', default=None)
+_samples = defaultdict(deque)
+_samples_lock = threading.Lock()
+METRICS = ('total_ms', 'db_ms', 'serialize_ms', 'queries')
+_NAMED_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'db_time', 'slowest', 'serialize_time', 'serializing')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest = (0.0, '')
+        self.serialize_time = 0.0
+        self.serializing = False
+
+
+def current():
+    """Metrics of the sampled request being handled, or None."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.queries += 1
+        metrics.db_time += elapsed
+        if elapsed > metrics.slowest[0]:
+            metrics.slowest = (elapsed, sql)
+
+
+@contextmanager
+def measure():
+    """Collect metrics for the code in the block, as for a sampled request."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializing():
+    """Count the block as serializer time; nested blocks are not counted twice."""
+    metrics = _current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_time += time.perf_counter() - started
+        metrics.serializing = False
+
+
+def route_name(request):
+    """``"GET /api/items/<pk>/"``: the matched route with regex syntax from routers removed."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return f'{request.method} <unresolved>'
+    route = _NAMED_GROUP.sub(r'<\1>', match.route).replace('^', '').replace('$', '')
+    return f'{request.method} /{route}'
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def snapshot():
+    """Count and p50/p95/p99 of every metric, per route."""
+    with _samples_lock:
+        samples = {route: list(values) for route, values in _samples.items()}
+    report = {}
+    for route, values in sorted(samples.items()):
+        report[route] = {'count': len(values)}
+        for index, metric in enumerate(METRICS):
+            ordered = sorted(value[index] for value in values)
+            report[route][metric] = {
+                name: round(_percentile(ordered, fraction), 3)
+                for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))
+            }
+    return report
+
+
+def reset():
+    with _samples_lock:
+        _samples.clear()
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rate = getattr(settings, 'CORE_INSTRUMENTATION_SAMPLE_RATE', 0.0)
+        self.slow_ms = getattr(settings, 'CORE_SLOW_REQUEST_MS', 500)
+        self.window = getattr(settings, 'CORE_INSTRUMENTATION_WINDOW', 1000)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.rate > 0 and (self.rate >= 1 or random.random() < self.rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        with measure() as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        with measure() as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total_ms = (time.perf_counter() - metrics.started) * 1000
+        db_ms = metrics.db_time * 1000
+        serialize_ms = metrics.serialize_time * 1000
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{metrics.queries} queries", '
+            f'serialize;dur={serialize_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+        route = route_name(request)
+        with _samples_lock:
+            samples = _samples[route]
+            if samples.maxlen != self.window:
+                samples = _samples[route] = deque(samples, maxlen=self.window)
+            samples.append((total_ms, db_ms, serialize_ms, metrics.queries))
+        if total_ms >= self.slow_ms:
+            slowest_ms, slowest_sql = metrics.slowest
+            logger.warning(
+                'Slow request %s %s: %.1f ms total, %d queries in %.1f ms, serialize %.1f ms; '
+                'slowest query %.1f ms: %s',
+                request.method, request.get_full_path(), total_ms, metrics.queries, db_ms, serialize_ms,
+                slowest_ms * 1000, slowest_sql[:1000],
+            )
+        return response
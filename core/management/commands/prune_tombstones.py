@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import changes
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete change-feed tombstones older than CORE_TOMBSTONE_RETENTION_DAYS.'
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - changes.retention()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstone(s).'))
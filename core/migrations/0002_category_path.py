@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    Category = apps.get_model('core', 'Category')
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def path_of(pk):
+        if pk not in paths:
+            paths[pk] = (path_of(parents[pk]) if parents[pk] else '') + f'{pk}/'
+        return paths[pk]
+
+    Category.objects.bulk_update([Category(pk=pk, path=path_of(pk)) for pk in parents], ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
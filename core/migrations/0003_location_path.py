@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    Location = apps.get_model('core', 'Location')
+    parents = dict(Location.objects.values_list('pk', 'parent_location_id'))
+    paths = {}
+
+    def path_of(pk):
+        if pk not in paths:
+            paths[pk] = (path_of(parents[pk]) if parents[pk] else '') + f'{pk}/'
+        return paths[pk]
+
+    Location.objects.bulk_update([Location(pk=pk, path=path_of(pk)) for pk in parents], ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
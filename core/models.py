@@ -1,7 +1,99 @@
 # core/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q, Subquery, Value
+from django.db.models.functions import Concat, Length, StrIndex, Substr
+from django.utils import timezone
 
-class Category(models.Model):
+class TreeNode(models.Model):
+    """Self-referencing tree that also stores a materialized path.
+
+    ``path`` holds the ids from the root down to the node itself, e.g.
+    ``"1/5/9/"``. A whole subtree is then a single range scan on the path
+    index, and the ancestors are the ids in the path. Subclasses name their
+    parent foreign key in ``tree_parent_field``.
+    """
+    tree_parent_field = 'parent'
+
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def path_range(path):
+        # Every descendant path starts with ``path``, which ends in "/"; "0" is
+        # the next character after "/", so [path, upper) covers the subtree.
+        return path, Concat(Substr(path, 1, Length(path) - 1), Value('0'))
+
+    @classmethod
+    def subtree_q(cls, pk, prefix=''):
+        """Q matching the node ``pk`` and its descendants, optionally through a relation prefix."""
+        lower, upper = cls.path_range(Subquery(cls._default_manager.filter(pk=pk).order_by().values('path')[:1]))
+        return Q(**{f'{prefix}path__gte': lower, f'{prefix}path__lt': upper})
+
+    @property
+    def ancestor_ids(self):
+        return [int(pk) for pk in self.path.split('/')[:-2]]
+
+    def descendants(self):
+        return type(self)._default_manager.filter(
+            path__gte=self.path, path__lt=self.path[:-1] + '0',
+        ).exclude(pk=self.pk)
+
+    def ancestors(self):
+        return type(self)._default_manager.filter(pk__in=self.ancestor_ids)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.update_path()
+
+    def update_path(self):
+        manager = type(self)._default_manager
+        parent_id = getattr(self, f'{self.tree_parent_field}_id')
+        parent_path = ''
+        if parent_id is not None:
+            parent_path = manager.filter(pk=parent_id).values_list('path', flat=True).get()
+        path = f'{parent_path}{self.pk}/'
+        if path == self.path:
+            return
+        old_path = self.path
+        if old_path and parent_path.startswith(old_path):
+            raise ValueError(f'{self} cannot be moved below its own descendant.')
+        manager.filter(pk=self.pk).update(path=path)
+        if old_path:
+            manager.filter(path__gte=old_path, path__lt=old_path[:-1] + '0').update(
+                path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+            )
+        self.path = path
+        if old_path:
+            from .signals import tree_node_moved
+            tree_node_moved.send(sender=type(self), instance=self, old_path=old_path)
+
+    @classmethod
+    def detach_subtree(cls, pk):
+        """Re-root the descendants of a deleted node whose children were set to NULL."""
+        segment = f'/{pk}/'
+        cls._default_manager.filter(Q(path__startswith=f'{pk}/') | Q(path__contains=segment)).update(
+            path=Substr('path', StrIndex(Concat(Value('/'), 'path'), Value(segment)) + len(segment) - 1),
+        )
+
+    @classmethod
+    def rebuild_paths(cls):
+        """Recompute every path from the parent links, e.g. after a bulk insert."""
+        parents = dict(cls._default_manager.values_list('pk', f'{cls.tree_parent_field}_id'))
+        paths = {}
+
+        def path_of(pk):
+            if pk not in paths:
+                parent_id = parents[pk]
+                paths[pk] = (path_of(parent_id) if parent_id else '') + f'{pk}/'
+            return paths[pk]
+
+        nodes = [cls(pk=pk, path=path_of(pk)) for pk in parents]
+        cls._default_manager.bulk_update(nodes, ['path'], batch_size=500)
+
+class Category(TreeNode):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
@@ -29,7 +121,9 @@ class Supplier(models.Model):
     def __str__(self):
         return self.name
 
-class Location(models.Model):
+class Location(TreeNode):
+    tree_parent_field = 'parent_location'
+
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     address = models.TextField(blank=True)
@@ -37,6 +131,9 @@ class Location(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['updated_at', 'id'], name='core_location_updated_idx')]
+
     def __str__(self):
         return self.name
 
@@ -50,5 +147,28 @@ class Person(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['updated_at', 'id'], name='core_person_updated_idx')]
+
     def __str__(self):
         return self.name
+
+class Tombstone(models.Model):
+    """A deleted row of a change-feed model, so syncing clients learn about the delete."""
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['model', 'deleted_at', 'id'], name='core_tombstone_feed_idx')]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+class ModelVersion(models.Model):
+    """When rows of a model last changed, as a Unix timestamp; read by every worker for conditional GETs."""
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.FloatField()
+
+    def __str__(self):
+        return f'{self.label} @ {self.version}'
@@ -1,29 +1,153 @@
 from rest_framework import serializers
+from . import instrumentation
 from .models import Category, Supplier, Location, Person
 
+_FROM_REQUEST = object()
+
+
+def split_param(value):
+    """Parse a comma separated ``?fields=`` / ``?expand=`` value; None when absent."""
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+def _top_level(paths):
+    return None if paths is None else {path.split('.', 1)[0] for path in paths}
+
+
+def _children(paths, name, empty=None):
+    """Paths below ``name`` with the prefix stripped, or ``empty`` when there are none."""
+    if paths is None:
+        return None
+    prefix = f'{name}.'
+    children = {path[len(prefix):] for path in paths if path.startswith(prefix)}
+    return children or empty
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer shaped by ``?fields=`` and ``?expand=``.
+
+    Declared nested serializers are expanded by default; relations listed in
+    ``expandable_fields`` only on request. Once ``expand`` is given, exactly the
+    listed relations (dotted for deeper levels, e.g. ``item.category``) are
+    expanded and the others come back as primary keys. ``fields`` limits the
+    output to the listed fields, again dotted for nested ones.
+    """
+    # Relation name -> serializer class (or 'self') expanded only on request.
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=_FROM_REQUEST, expand=_FROM_REQUEST, **kwargs):
+        self._requested_fields = fields
+        self._requested_expand = expand
+        super().__init__(*args, **kwargs)
+
+    def _param(self, name, value):
+        if value is not _FROM_REQUEST:
+            return value
+        request = self.context.get('request')
+        return split_param(request.query_params.get(name)) if request is not None else None
+
+    @classmethod
+    def nested_serializers(cls):
+        """Map every expandable relation to ``(serializer class, expanded by default)``."""
+        nested = {
+            name: (type(field), True)
+            for name, field in cls._declared_fields.items()
+            if isinstance(field, DynamicFieldsModelSerializer)
+        }
+        for name, serializer_class in cls.expandable_fields.items():
+            nested[name] = (cls if serializer_class == 'self' else serializer_class, False)
+        return nested
+
+    @classmethod
+    def expanded_names(cls, expand):
+        if expand is None:
+            return {name for name, (_, default) in cls.nested_serializers().items() if default}
+        return _top_level(expand) & cls.nested_serializers().keys()
+
+    @classmethod
+    def query_shape(cls, fields=None, expand=None, prefix=''):
+        """Return ``(select_related paths, only() paths)`` needed to render this shape."""
+        model = cls.Meta.model
+        selected = _top_level(fields)
+        related, only = [], []
+        for name in cls.expanded_names(expand):
+            if selected is not None and name not in selected:
+                continue
+            nested_class = cls.nested_serializers()[name][0]
+            related.append(prefix + name)
+            nested_related, nested_only = nested_class.query_shape(
+                _children(fields, name), _children(expand, name, set()), f'{prefix}{name}__',
+            )
+            related += nested_related
+            only += nested_only
+        concrete = {field.name for field in model._meta.concrete_fields}
+        only += [prefix + name for name in (concrete if selected is None else selected & concrete)]
+        return related, only
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self._param('fields', self._requested_fields)
+        expand = self._param('expand', self._requested_expand)
+        top = _top_level(selected)
+        expanded = self.expanded_names(expand)
+        for name, (serializer_class, _) in self.nested_serializers().items():
+            if name not in fields or (top is not None and name not in top):
+                continue
+            if name in expanded:
+                fields[name] = serializer_class(
+                    read_only=True, fields=_children(selected, name), expand=_children(expand, name, set()),
+                )
+            elif isinstance(fields[name], DynamicFieldsModelSerializer):
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        if top is not None:
+            fields = {name: field for name, field in fields.items() if name in top}
+        return fields
+
+    def to_representation(self, instance):
+        if instrumentation.current() is None:
+            return super().to_representation(instance)
+        with instrumentation.serializing():
+            return super().to_representation(instance)
+
 # Serializer for the Category model
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsModelSerializer):
+    expandable_fields = {'parent': 'self'}
+
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'parent', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
+    def validate_parent(self, parent):
+        if parent and self.instance and (parent.pk == self.instance.pk or parent.path.startswith(self.instance.path)):
+            raise serializers.ValidationError('A category cannot be moved below itself.')
+        return parent
+
 # Serializer for the Supplier model
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Supplier
         fields = ['id', 'name', 'contact_person', 'email', 'phone', 'address', 'website', 'notes', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
 # Serializer for the Location model
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(DynamicFieldsModelSerializer):
+    expandable_fields = {'parent_location': 'self'}
+
     class Meta:
         model = Location
         fields = ['id', 'name', 'description', 'address', 'parent_location', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
+    def validate_parent_location(self, parent):
+        if parent and self.instance and (parent.pk == self.instance.pk or parent.path.startswith(self.instance.path)):
+            raise serializers.ValidationError('A location cannot be moved below itself.')
+        return parent
+
 # Serializer for the Person model
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Person
         fields = ['id', 'name', 'email', 'phone', 'department', 'position', 'notes', 'created_at', 'updated_at']
@@ -0,0 +1,28 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .caching import bump_model_version
+from .models import Category, Location, Person, Supplier
+
+# Sent by TreeNode after an existing node (and its subtree) moved to a new
+# parent. Receivers get ``instance`` with the new path and ``old_path``.
+tree_node_moved = Signal()
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+def detach_subtree(sender, instance, **kwargs):
+    sender.detach_subtree(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Person)
+def reference_data_changed(sender, **kwargs):
+    bump_model_version(sender)
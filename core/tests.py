@@ -1,3 +1,448 @@
-from django.test import TestCase
+import json
+import tempfile
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import authentication, db, instrumentation
+from .db import pin_primary
+from .models import Category, Supplier, Location, Person, ModelVersion, Tombstone
+
+
+class CoreAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('tester', password='secret')
+        # Version stamps from a minute ago, so responses carry Last-Modified.
+        ModelVersion.objects.bulk_create([
+            ModelVersion(label=model._meta.label_lower, version=time.time() - 60)
+            for model in (Category, Location, Person, Supplier)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class QueryBudgetTests(CoreAPITestCase):
+    # Maximum number of queries per endpoint, independent of page size.
+    LIST_BUDGET = 3  # version stamp + COUNT(*) + page
+    DETAIL_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        root = Category.objects.create(name='Root')
+        building = Location.objects.create(name='Building')
+        for i in range(10):
+            Category.objects.create(name=f'Category {i}', parent=root)
+            Supplier.objects.create(name=f'Supplier {i}', email=f'supplier{i}@example.com')
+            Location.objects.create(name=f'Room {i}', parent_location=building)
+            Person.objects.create(name=f'Person {i}', email=f'person{i}@example.com')
+
+    def assert_budget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_endpoints(self):
+        for url in ['/api/categories/', '/api/suppliers/', '/api/locations/', '/api/people/']:
+            with self.subTest(url=url):
+                self.assert_budget(url, self.LIST_BUDGET)
+
+    def test_detail_endpoints(self):
+        objects = {
+            'categories': Category.objects.first(),
+            'suppliers': Supplier.objects.first(),
+            'locations': Location.objects.first(),
+            'people': Person.objects.first(),
+        }
+        for prefix, obj in objects.items():
+            with self.subTest(prefix=prefix):
+                self.assert_budget(f'/api/{prefix}/{obj.pk}/', self.DETAIL_BUDGET)
+
+
+class CategoryTreeTests(CoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.computers = Category.objects.create(name='Computers', parent=self.electronics)
+        self.laptops = Category.objects.create(name='Laptops', parent=self.computers)
+        self.phones = Category.objects.create(name='Phones', parent=self.electronics)
+        self.tools = Category.objects.create(name='Tools')
+
+    def names(self, queryset):
+        return sorted(queryset.values_list('name', flat=True))
+
+    def test_paths_follow_inserts(self):
+        self.laptops.refresh_from_db()
+        self.assertEqual(self.laptops.path, f'{self.electronics.pk}/{self.computers.pk}/{self.laptops.pk}/')
+        self.assertEqual(self.names(self.electronics.descendants()), ['Computers', 'Laptops', 'Phones'])
+        self.assertEqual(self.laptops.ancestor_ids, [self.electronics.pk, self.computers.pk])
+
+    def test_move_rewrites_subtree(self):
+        self.computers.parent = self.tools
+        self.computers.save()
+        self.laptops.refresh_from_db()
+        self.assertEqual(self.laptops.ancestor_ids, [self.tools.pk, self.computers.pk])
+        self.assertEqual(self.names(self.electronics.descendants()), ['Phones'])
+        self.assertEqual(self.names(self.tools.descendants()), ['Computers', 'Laptops'])
+
+    def test_move_below_descendant_is_rejected(self):
+        response = self.client.patch(f'/api/categories/{self.electronics.pk}/', {'parent': self.laptops.pk})
+        self.assertEqual(response.status_code, 400)
+
+    def test_location_move_below_itself_is_rejected(self):
+        building = Location.objects.create(name='Building')
+        floor = Location.objects.create(name='Floor', parent_location=building)
+        for parent in [floor, building]:
+            with self.subTest(parent=parent.name):
+                response = self.client.patch(f'/api/locations/{building.pk}/', {'parent_location': parent.pk})
+                self.assertEqual(response.status_code, 400)
+        building.refresh_from_db()
+        self.assertIsNone(building.parent_location)
+
+    def test_delete_reroots_children(self):
+        self.computers.delete()
+        self.laptops.refresh_from_db()
+        self.assertIsNone(self.laptops.parent)
+        self.assertEqual(self.laptops.path, f'{self.laptops.pk}/')
+        self.assertEqual(self.names(self.electronics.descendants()), ['Phones'])
+
+    def test_rebuild_paths(self):
+        Category.objects.update(path='')
+        Category.rebuild_paths()
+        self.assertEqual(self.names(self.electronics.descendants()), ['Computers', 'Laptops', 'Phones'])
+
+    def test_descendants_and_ancestors_actions(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/categories/{self.electronics.pk}/descendants/')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Computers', 'Laptops', 'Phones'])
+        response = self.client.get(f'/api/categories/{self.laptops.pk}/ancestors/')
+        self.assertEqual([row['name'] for row in response.data], ['Electronics', 'Computers'])
+
+
+class ConditionalCacheTests(CoreAPITestCase):
+    url = '/api/suppliers/'
+
+    def setUp(self):
+        super().setUp()
+        self.supplier = Supplier.objects.create(name='Acme', email='acme@example.com')
+
+    def test_unchanged_collection_returns_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        # Only the version stamp is read.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['name'], 'Acme')
+
+    def test_no_last_modified_within_the_changed_second(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.supplier.save()
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        # A date from earlier in this second must not validate the new data.
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_invalidate(self):
+        etag = self.client.get(self.url)['ETag']
+        detail_etag = self.client.get(f'{self.url}{self.supplier.pk}/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.supplier.name = 'Acme Corp'
+            self.supplier.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['name'], 'Acme Corp')
+        response = self.client.get(f'{self.url}{self.supplier.pk}/', HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.data['name'], 'Acme Corp')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.supplier.delete()
+        self.assertEqual(self.client.get(self.url).data['count'], 0)
+
+    def test_other_models_are_unaffected(self):
+        etag = self.client.get('/api/people/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Supplier.objects.create(name='Globex', email='globex@example.com')
+        self.assertEqual(self.client.get('/api/people/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class AsyncReadTests(CoreAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.token = Token.objects.create(user=cls.user)
+        root = Category.objects.create(name='Tools')
+        for index in range(8):
+            Category.objects.create(name=f'Tool {index}', parent=root)
+
+    def get(self, url, **headers):
+        return self.async_client.get(url, headers={'Authorization': f'Token {self.token.key}', **headers})
+
+    async def test_pages_match_the_regular_api(self):
+        for query in ('', '?page=2', '?expand=parent&fields=id,name,parent'):
+            response = await self.get(f'/async/categories/{query}')
+            self.assertEqual(response.status_code, 200)
+            expected = (await self.get(f'/api/categories/{query}')).content.replace(b'/api/', b'/async/')
+            self.assertEqual(response.json(), json.loads(expected))
+
+    async def test_detail_and_missing(self):
+        category = await Category.objects.aget(name='Tool 3')
+        response = await self.get(f'/async/categories/{category.pk}/')
+        self.assertEqual(response.json()['parent'], category.parent_id)
+        self.assertEqual((await self.get('/async/categories/0/')).status_code, 404)
+        self.assertEqual((await self.get('/async/categories/?page=9')).status_code, 404)
+
+    async def test_authentication(self):
+        self.assertEqual((await self.async_client.get('/async/people/')).status_code, 401)
+        response = await self.async_client.get('/async/people/', headers={'Authorization': 'Token nope'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_authentication(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/async/people/').status_code, 200)
+
+    async def test_default_permissions_apply(self):
+        admin_only = {
+            **settings.REST_FRAMEWORK, 'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAdminUser'],
+        }
+        with override_settings(REST_FRAMEWORK=admin_only):
+            self.assertEqual((await self.get('/async/people/')).status_code, 403)
+            await get_user_model().objects.filter(pk=self.user.pk).aupdate(is_staff=True)
+            self.assertEqual((await self.get('/async/people/')).status_code, 200)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('tester', password='secret')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def test_reads_use_the_request_replica_unless_pinned(self):
+        # Commands, signal handlers and anything else outside a request read the primary.
+        self.assertEqual(Category.objects.all().db, 'default')
+        token = db._replica.set('replica1')
+        try:
+            self.assertEqual(Category.objects.all().db, 'replica1')
+            self.assertEqual(Token.objects.all().db, 'default')
+            with pin_primary():
+                self.assertEqual(Category.objects.all().db, 'default')
+            with transaction.atomic():
+                self.assertEqual(Category.objects.all().db, 'default')
+            # Once the request writes, its later reads (and its signal handlers) see the write.
+            Category.objects.create(name='Tools')
+            self.assertEqual(Category.objects.all().db, 'default')
+        finally:
+            db._replica.reset(token)
+
+    def test_read_your_writes_after_post(self):
+        replica = connections['replica1']
+        with CaptureQueriesContext(replica) as reads:
+            self.client.get('/api/suppliers/')
+        self.assertTrue(reads.captured_queries)
+        response = self.client.post('/api/suppliers/', {'name': 'Acme', 'email': 'acme@example.com'})
+        self.assertEqual(response.status_code, 201)
+        with CaptureQueriesContext(replica) as reads, CaptureQueriesContext(connection) as primary:
+            self.assertEqual(self.client.get('/api/suppliers/').data['count'], 1)
+        self.assertEqual(reads.captured_queries, [])
+        self.assertTrue(primary.captured_queries)
+
+        # Other clients are not pinned (the list itself is uncached here).
+        other = APIClient()
+        other.force_authenticate(self.user)
+        with CaptureQueriesContext(replica) as reads:
+            other.get('/api/suppliers/?page=1')
+        self.assertTrue(reads.captured_queries)
+
+
+class CachedTokenAuthenticationTests(CoreAPITestCase):
+    url = '/api/people/?page=1'
+
+    def setUp(self):
+        super().setUp()
+        # Tokens are only cached in a cache shared by every worker.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        })
+        shared.enable()
+        self.addCleanup(shared.disable)
+        self.client = APIClient()
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        authentication.reset_stats()
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.assertNumQueries(2):
+            self.client.get('/api/people/?page=1&fields=id')
+        self.assertEqual(authentication.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        # Only the id and active flag are cached, never the user row.
+        self.assertEqual(cache.get(authentication.cache_key(self.token.key)), (self.user.pk, True))
+
+    def test_process_local_cache_is_not_used(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+            with self.assertNumQueries(3):
+                self.client.get('/api/people/?page=1&fields=id')
+
+    def test_deleted_token_and_inactive_user_are_rejected_at_once(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        authentication.invalidate_users([self.user.pk])
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=True)
+        authentication.invalidate_users([self.user.pk])
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_stats_are_admin_only(self):
+        self.assertEqual(self.client.get('/api/auth/token-cache/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/auth/token-cache/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'hits', 'misses', 'hit_rate'})
+
+
+@override_settings(CORE_INSTRUMENTATION_SAMPLE_RATE=1.0, CORE_SLOW_REQUEST_MS=60000)
+class InstrumentationTests(CoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.reset()
+        Supplier.objects.create(name='Acme', email='acme@example.com')
+
+    def test_server_timing_and_histograms(self):
+        response = self.client.get('/api/suppliers/')
+        timing = dict(
+            part.strip().split(';', 1) for part in response['Server-Timing'].split(',')
+        )
+        self.assertEqual(set(timing), {'db', 'serialize', 'total'})
+        self.assertIn('desc="3 queries"', timing['db'])
+        self.client.get('/api/suppliers/')
+        self.client.get('/api/people/')
+        self.user.is_staff = True
+        self.user.save()
+        routes = self.client.get('/api/metrics/').data['routes']
+        suppliers = routes['GET /api/suppliers/']
+        self.assertEqual(suppliers['count'], 2)
+        self.assertEqual(set(suppliers['total_ms']), {'p50', 'p95', 'p99'})
+        self.assertEqual(suppliers['queries']['p99'], 3)
+        self.assertIn('GET /api/people/', routes)
+        self.client.get('/api/suppliers/1/')
+        self.assertIn('GET /api/suppliers/<pk>/', instrumentation.snapshot())
+
+    def test_metrics_are_admin_only(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    @override_settings(CORE_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_their_slowest_query(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get('/api/suppliers/')
+        self.assertIn('slowest query', logs.output[0])
+        self.assertRegex(logs.output[0], 'core_(supplier|modelversion)')
+
+    @override_settings(CORE_INSTRUMENTATION_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_untouched(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.assertNotIn('Server-Timing', self.client.get('/api/suppliers/'))
+        self.assertEqual(instrumentation.snapshot(), {})
+
+
+@override_settings(CORE_CHANGES_SETTLE_SECONDS=0)
+class ChangeFeedTests(CoreAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.building = Location.objects.create(name='Building')
+        for i in range(4):
+            Location.objects.create(name=f'Room {i}', parent_location=cls.building)
+            Person.objects.create(name=f'Person {i}', email=f'person{i}@example.com')
+
+    def sync(self, cursor=None, **params):
+        changes, more = [], True
+        while more:
+            response = self.client.get('/api/changes/', {'models': 'location,person', **params,
+                                                         **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            changes += response.data['changes']
+            cursor, more = response.data['cursor'], response.data['more']
+        return changes, cursor
+
+    def test_full_sync_is_paged(self):
+        changes, _ = self.sync(limit=3)
+        self.assertEqual(len(changes), 9)
+        self.assertEqual({change['op'] for change in changes}, {'upsert'})
+        upserts = {(change['model'], change['id']) for change in changes}
+        self.assertEqual(upserts, {('location', pk) for pk in Location.objects.values_list('pk', flat=True)}
+                         | {('person', pk) for pk in Person.objects.values_list('pk', flat=True)})
+        room = next(change['data'] for change in changes if change['data'].get('name') == 'Room 0')
+        self.assertEqual(room['parent_location'], self.building.pk)
+
+    def test_incremental_sync_returns_only_changes(self):
+        _, cursor = self.sync()
+        with self.assertNumQueries(4):
+            self.assertEqual(self.sync(cursor)[0], [])
+
+        person = Person.objects.get(name='Person 1')
+        person.phone = '555'
+        person.save()
+        gone = Location.objects.get(name='Room 2')
+        gone_pk = gone.pk
+        gone.delete()
+        added = Location.objects.create(name='Annex')
+        changes, cursor = self.sync(cursor)
+        self.assertEqual([(change['model'], change['op'], change['id']) for change in changes], [
+            ('person', 'upsert', person.pk), ('location', 'delete', gone_pk), ('location', 'upsert', added.pk),
+        ])
+        self.assertEqual(changes[0]['data']['phone'], '555')
+        self.assertEqual(self.sync(cursor)[0], [])
+
+    def test_deleting_a_parent_touches_its_children(self):
+        _, cursor = self.sync()
+        building_pk = self.building.pk
+        self.building.delete()
+        changes, _ = self.sync(cursor)
+        self.assertEqual(len(changes), 5)
+        self.assertTrue(all(change['data']['parent_location'] is None for change in changes[:-1]))
+        self.assertEqual(changes[-1], {'model': 'location', 'op': 'delete', 'id': building_pk})
+
+    def test_expired_and_invalid_cursors(self):
+        _, cursor = self.sync()
+        with override_settings(CORE_TOMBSTONE_RETENTION_DAYS=0):
+            Tombstone.objects.create(model='person', object_id=99, deleted_at=timezone.now() - timedelta(days=1))
+            self.assertEqual(self.client.get('/api/changes/', {'cursor': cursor}).status_code, 410)
+        self.assertEqual(self.client.get('/api/changes/', {'cursor': 'nonsense'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/changes/', {'models': 'widgets'}).status_code, 400)
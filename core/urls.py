@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, SupplierViewSet, LocationViewSet, PersonViewSet
+from .asyncviews import CategoryReadView, LocationReadView, PersonReadView, SupplierReadView
+from .views import (
+    CategoryViewSet, SupplierViewSet, LocationViewSet, PersonViewSet, ChangeFeedView, MetricsView, TokenCacheStatsView,
+)
 
 # Create a router and register the viewsets
 router = DefaultRouter()
@@ -12,4 +15,16 @@ router.register(r'people', PersonViewSet)
 # Define the URL patterns
 urlpatterns = [
     path('api/', include(router.urls)),
+    path('api/auth/token-cache/', TokenCacheStatsView.as_view()),
+    path('api/metrics/', MetricsView.as_view()),
+    path('api/changes/', ChangeFeedView.as_view()),
+    # Async-native reads for the ASGI deployment.
+    path('async/categories/', CategoryReadView.as_view()),
+    path('async/categories/<int:pk>/', CategoryReadView.as_view()),
+    path('async/suppliers/', SupplierReadView.as_view()),
+    path('async/suppliers/<int:pk>/', SupplierReadView.as_view()),
+    path('async/locations/', LocationReadView.as_view()),
+    path('async/locations/<int:pk>/', LocationReadView.as_view()),
+    path('async/people/', PersonReadView.as_view()),
+    path('async/people/<int:pk>/', PersonReadView.as_view()),
 ]
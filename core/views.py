@@ -1,20 +1,105 @@
 # views.py example
-from rest_framework import viewsets
+from django.conf import settings
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import authentication, changes, instrumentation
+from .caching import ConditionalCacheMixin
 from .models import Category, Supplier, Location, Person
-from .serializers import CategorySerializer, SupplierSerializer, LocationSerializer, PersonSerializer
+from .serializers import CategorySerializer, SupplierSerializer, LocationSerializer, PersonSerializer, split_param
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class SparseFieldsetMixin:
+    """Join and load only what the ``?fields=`` / ``?expand=`` shape renders."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = split_param(self.request.query_params.get('fields'))
+        expand = split_param(self.request.query_params.get('expand'))
+        related, only = self.get_serializer_class().query_shape(fields, expand)
+        if related:
+            queryset = queryset.select_related(*related)
+        if fields is not None and self.request.method in SAFE_METHODS:
+            ordering = [name.lstrip('-') for name in queryset.model._meta.ordering]
+            queryset = queryset.only(*only, *ordering)
+        return queryset
+
+class CategoryViewSet(ConditionalCacheMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
-class SupplierViewSet(viewsets.ModelViewSet):
+    @action(detail=True)
+    def descendants(self, request, pk=None):
+        return self.related_list(self.get_object().descendants())
+
+    @action(detail=True)
+    def ancestors(self, request, pk=None):
+        category = self.get_object()
+        ancestors = sorted(category.ancestors(), key=lambda ancestor: category.ancestor_ids.index(ancestor.pk))
+        return Response(self.get_serializer(ancestors, many=True).data)
+
+    def related_list(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+class SupplierViewSet(ConditionalCacheMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(ConditionalCacheMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
 
-class PersonViewSet(viewsets.ModelViewSet):
+class PersonViewSet(ConditionalCacheMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Person.objects.all()
     serializer_class = PersonSerializer
+
+class TokenCacheStatsView(APIView):
+    """Hit rate of the cached token authentication in this worker process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(authentication.stats())
+
+class MetricsView(APIView):
+    """Per-route p50/p95/p99 of the sampled requests handled by this worker process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'sample_rate': getattr(settings, 'CORE_INSTRUMENTATION_SAMPLE_RATE', 0.0),
+            'routes': instrumentation.snapshot(),
+            'token_cache': authentication.stats(),
+        })
+
+class ChangeFeedView(APIView):
+    """Rows created, updated or deleted since ``?cursor=``, oldest first, for offline sync.
+
+    ``?models=`` limits the feed to some of the registered models. Follow
+    ``cursor`` while ``more`` is true, then keep it for the next sync.
+    """
+
+    def get(self, request):
+        names = split_param(request.query_params.get('models'))
+        if names is None:
+            names = set(changes.registered())
+        unknown = names - set(changes.registered())
+        if unknown or not names:
+            raise ValidationError({'models': [f'Choose from {", ".join(changes.registered())}.']})
+        try:
+            limit = int(request.query_params.get('limit', settings.CORE_CHANGES_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({'limit': ['A whole number is required.']})
+        if not 1 <= limit <= settings.CORE_CHANGES_MAX_PAGE_SIZE:
+            raise ValidationError({'limit': [f'Must be between 1 and {settings.CORE_CHANGES_MAX_PAGE_SIZE}.']})
+        try:
+            rows, cursor, more = changes.page(sorted(names), request.query_params.get('cursor'), limit)
+        except changes.InvalidCursor as error:
+            raise ValidationError({'cursor': [str(error)]})
+        except changes.CursorExpired as error:
+            return Response({'detail': str(error)}, status=status.HTTP_410_GONE)
+        return Response({'changes': rows, 'cursor': cursor, 'more': more})
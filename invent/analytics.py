@@ -0,0 +1,213 @@
+# inventory/analytics.py
+"""Daily consumption rollups and the time-windowed reports built on them.
+
+Every posted transaction adds its units (and, for restocks and discards, their
+purchase value) to the ``DailyConsumption`` row of its day, item, category and
+location; maintenance records add their cost the same way. Reports then sum a
+few rows per day instead of grouping the raw ledger. ``backfill_consumption``
+recomputes the table from the ledger.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Category, Location
+from .models import ArchivedTransaction, DailyConsumption, Item, MaintenanceRecord, Transaction
+from .signals import transactions_posted
+
+UNIT_COLUMNS = {
+    Transaction.CHECKOUT: 'checked_out',
+    Transaction.CHECKIN: 'checked_in',
+    Transaction.RESTOCK: 'restocked',
+    Transaction.DISCARD: 'discarded',
+}
+VALUE_COLUMNS = {
+    Transaction.RESTOCK: 'restocked_value',
+    Transaction.DISCARD: 'discarded_value',
+}
+METRICS = (
+    'checked_out', 'checked_in', 'restocked', 'discarded',
+    'restocked_value', 'discarded_value', 'maintenance_cost',
+)
+BUCKETS = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
+GROUPS = {'item': Item, 'category': Category, 'location': Location}
+ZERO = Decimal('0.00')
+
+
+def write_deltas(deltas, create=True):
+    """Add ``{(day, item_id, category_id, location_id): {metric: delta}}`` to the rollup.
+
+    With ``create=False`` only existing rows are adjusted.
+    """
+    for (day, item_id, category_id, location_id), metrics in deltas.items():
+        metrics = {metric: delta for metric, delta in metrics.items() if delta}
+        if not metrics:
+            continue
+        rows = DailyConsumption.objects.filter(
+            day=day, item_id=item_id, category_id=category_id, location_id=location_id,
+        )
+        if not rows.update(**{metric: F(metric) + delta for metric, delta in metrics.items()}) and create:
+            DailyConsumption.objects.create(
+                day=day, item_id=item_id, category_id=category_id, location_id=location_id, **metrics,
+            )
+
+
+def _day(value):
+    if hasattr(value, 'tzinfo'):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+@receiver(transactions_posted, sender=Transaction)
+def transactions_consumed(sender, transactions, reverted, **kwargs):
+    sign = -1 if reverted else 1
+    items = Item.objects.in_bulk({transaction.item_id for transaction in transactions})
+    deltas = defaultdict(lambda: defaultdict(int))
+    for transaction in transactions:
+        item = items.get(transaction.item_id)
+        if item is None:
+            continue
+        key = (_day(transaction.date), item.pk, item.category_id, transaction.location_id or item.location_id)
+        kind = transaction.transaction_type
+        deltas[key][UNIT_COLUMNS[kind]] += sign * transaction.quantity
+        if kind in VALUE_COLUMNS and item.purchase_price is not None:
+            deltas[key][VALUE_COLUMNS[kind]] += sign * transaction.quantity * item.purchase_price
+    write_deltas(deltas)
+
+
+def _maintenance_state(record_id):
+    return (
+        MaintenanceRecord.objects.filter(pk=record_id)
+        .values_list('date', 'item_id', 'item__category_id', 'item__location_id', 'cost').first()
+    )
+
+
+def _maintenance_deltas(state, sign):
+    date, item_id, category_id, location_id, cost = state
+    if not cost:
+        return {}
+    return {(_day(date), item_id, category_id, location_id): {'maintenance_cost': sign * cost}}
+
+
+@receiver(pre_save, sender=MaintenanceRecord)
+def remember_maintenance(sender, instance, raw=False, **kwargs):
+    instance._consumption_before = None if raw or instance.pk is None else _maintenance_state(instance.pk)
+
+
+@receiver(post_save, sender=MaintenanceRecord)
+def maintenance_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_consumption_before', None)
+    if before:
+        write_deltas(_maintenance_deltas(before, -1))
+    after = _maintenance_state(instance.pk)
+    if after:
+        write_deltas(_maintenance_deltas(after, 1))
+
+
+@receiver(post_delete, sender=MaintenanceRecord)
+def maintenance_deleted(sender, instance, **kwargs):
+    # When the item itself is being deleted its rollup rows cascade with it, so
+    # never create a row here that would point at the vanishing item.
+    item = Item.objects.filter(pk=instance.item_id).values_list('category_id', 'location_id').first()
+    if instance.cost and item:
+        key = (_day(instance.date), instance.item_id, *item)
+        write_deltas({key: {'maintenance_cost': -instance.cost}}, create=False)
+
+
+def _value(kind):
+    return Coalesce(
+        Sum(
+            ExpressionWrapper(F('quantity') * F('item__purchase_price'), output_field=DecimalField()),
+            filter=Q(transaction_type=kind),
+        ),
+        Value(ZERO),
+        output_field=DecimalField(),
+    )
+
+
+def expected_rows(since=None):
+    """Recompute rollup rows from the hot and archived ledgers, attributed to each item's current category."""
+    ledgers = [Transaction.objects.order_by(), ArchivedTransaction.objects.order_by()]
+    maintenance = MaintenanceRecord.objects.order_by().exclude(cost=None)
+    if since is not None:
+        ledgers = [transactions.filter(date__date__gte=since) for transactions in ledgers]
+        maintenance = maintenance.filter(date__gte=since)
+    rows = defaultdict(lambda: defaultdict(int))
+    for transactions in ledgers:
+        units = (
+            transactions.annotate(
+                day=TruncDate('date'), location_key=Coalesce('location_id', 'item__location_id'),
+            )
+            .values('day', 'item_id', 'item__category_id', 'location_key')
+            .annotate(
+                **{
+                    column: Coalesce(Sum('quantity', filter=Q(transaction_type=kind)), Value(0))
+                    for kind, column in UNIT_COLUMNS.items()
+                },
+                **{column: _value(kind) for kind, column in VALUE_COLUMNS.items()},
+            )
+        )
+        for row in units:
+            key = (row.pop('day'), row.pop('item_id'), row.pop('item__category_id'), row.pop('location_key'))
+            for column, value in row.items():
+                rows[key][column] += value
+    costs = (
+        maintenance.values('date', 'item_id', 'item__category_id', 'item__location_id')
+        .annotate(total=Sum('cost'))
+    )
+    for row in costs:
+        key = (row['date'], row['item_id'], row['item__category_id'], row['item__location_id'])
+        rows[key]['maintenance_cost'] = row['total']
+    return rows
+
+
+def backfill(since=None):
+    """Replace the rollup rows from ``since`` (or all of them) with values recomputed from the ledger."""
+    stale = DailyConsumption.objects.all()
+    if since is not None:
+        stale = stale.filter(day__gte=since)
+    stale.delete()
+    rows = [
+        DailyConsumption(day=day, item_id=item_id, category_id=category_id, location_id=location_id, **metrics)
+        for (day, item_id, category_id, location_id), metrics in expected_rows(since).items()
+    ]
+    DailyConsumption.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def consumption_report(start, end, bucket='day', group_by=None, item=None, category=None, location=None):
+    """Totals per ``bucket`` between ``start`` and ``end`` (inclusive), optionally per group.
+
+    ``category`` and ``location`` include their whole subtree.
+    """
+    rows = DailyConsumption.objects.filter(day__gte=start, day__lte=end)
+    if item is not None:
+        rows = rows.filter(item_id=item)
+    if category is not None:
+        rows = rows.filter(category_id__in=Category.objects.filter(Category.subtree_q(category)).values('pk'))
+    if location is not None:
+        rows = rows.filter(location_id__in=Location.objects.filter(Location.subtree_q(location)).values('pk'))
+    trunc = BUCKETS[bucket]
+    rows = rows.annotate(period=trunc('day') if trunc else F('day'))
+    keys = ['period']
+    if group_by:
+        keys.append(f'{group_by}_id')
+    report = list(
+        rows.order_by().values(*keys).annotate(**{metric: Sum(metric) for metric in METRICS}).order_by(*keys)
+    )
+    if group_by:
+        names = dict(
+            GROUPS[group_by].objects.filter(pk__in={row[keys[1]] for row in report}).order_by()
+            .values_list('pk', 'name')
+        )
+        for row in report:
+            row['group'] = row.pop(keys[1])
+            row['name'] = names.get(row['group'])
+    return report
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class InventConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'invent'
+
+    def ready(self):
+        from core import changes
+        from core.views import LocationViewSet
+        from . import analytics, archive, events, lookup, rollups, snapshots  # noqa: F401
+        from .models import Item
+        from .serializers import ItemSerializer
+        from .views import LocationStockActions
+        changes.register('item', Item, ItemSerializer)
+        # core does not know about stock; the rollup is served from its location endpoint.
+        LocationViewSet.stock = LocationStockActions.stock
@@ -0,0 +1,142 @@
+# inventory/archive.py
+"""Hot/cold split of the transaction ledger.
+
+``archive()`` moves transactions dated before a cutoff (by default
+``INVENT_ARCHIVE_HORIZON_DAYS`` ago) from ``Transaction`` to
+``ArchivedTransaction`` in batches, each in its own database transaction.
+Before a batch is moved, the ``BalanceCheckpoint`` of each of its items is
+written, so that
+
+    checkpoint.quantity + hot ledger deltas == item.quantity
+    checkpoint.archived_count / archived_delta == the item's archived rows
+
+hold after every batch; ``verify()`` checks both. Together they mean the
+checkpoint's opening balance plus the archived and hot ledgers replays to the
+item's quantity, while the hot table only holds recent history.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import rollups
+from .ledger import STOCK_DIRECTION, signed_quantity
+from .models import ArchivedTransaction, BalanceCheckpoint, Item, Transaction
+
+ARCHIVED_COLUMNS = [
+    'id', 'item_id', 'transaction_type', 'quantity', 'person_id', 'location_id', 'date', 'notes', 'created_by_id',
+]
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=getattr(settings, 'INVENT_ARCHIVE_HORIZON_DAYS', 365))
+
+
+def _deltas(queryset):
+    return dict(
+        queryset.order_by().values('item_id').annotate(delta=Sum(signed_quantity())).values_list('item_id', 'delta')
+    )
+
+
+def archive_batch(cutoff, batch_size=5000):
+    """Checkpoint and move the oldest ``batch_size`` transactions before ``cutoff``; returns how many moved."""
+    with transaction.atomic():
+        rows = list(
+            Transaction.objects.filter(date__lt=cutoff).order_by('date', 'id').values(*ARCHIVED_COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        moved = defaultdict(lambda: [0, 0])
+        for row in rows:
+            moved[row['item_id']][0] += 1
+            moved[row['item_id']][1] += STOCK_DIRECTION[row['transaction_type']] * row['quantity']
+        quantities = dict(Item.objects.select_for_update().filter(pk__in=moved).values_list('pk', 'quantity'))
+        checkpoints = BalanceCheckpoint.objects.select_for_update().in_bulk(list(moved))
+        fresh = moved.keys() - checkpoints.keys()
+        hot = _deltas(Transaction.objects.filter(item_id__in=fresh)) if fresh else {}
+
+        now = timezone.now()
+        created = []
+        for item_id, (count, delta) in moved.items():
+            checkpoint = checkpoints.get(item_id)
+            if checkpoint is None:
+                checkpoint = BalanceCheckpoint(
+                    item_id=item_id, archived_through=cutoff, quantity=quantities[item_id] - hot.get(item_id, 0),
+                )
+                created.append(checkpoint)
+            checkpoint.quantity += delta
+            checkpoint.archived_count += count
+            checkpoint.archived_delta += delta
+            checkpoint.archived_through = max(checkpoint.archived_through, cutoff)
+            checkpoint.updated_at = now
+        BalanceCheckpoint.objects.bulk_create(created)
+        BalanceCheckpoint.objects.bulk_update(
+            list(checkpoints.values()),
+            ['quantity', 'archived_count', 'archived_delta', 'archived_through', 'updated_at'],
+        )
+
+        ArchivedTransaction.objects.bulk_create(
+            [ArchivedTransaction(archived_at=now, **row) for row in rows], batch_size=1000,
+        )
+        Transaction.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archive(cutoff=None, batch_size=5000):
+    """Archive every transaction before ``cutoff``; returns the number moved."""
+    cutoff = cutoff or default_cutoff()
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def verify():
+    """``(item_id, problem)`` for every item whose checkpoint disagrees with its ledgers."""
+    hot = _deltas(Transaction.objects.all())
+    archived = {
+        row['item_id']: (row['count'], row['delta'])
+        for row in ArchivedTransaction.objects.order_by().values('item_id')
+        .annotate(count=Count('id'), delta=Sum(signed_quantity()))
+    }
+    quantities = dict(Item.objects.filter(balance_checkpoint__isnull=False).values_list('pk', 'quantity'))
+    problems = []
+    for checkpoint in BalanceCheckpoint.objects.order_by('item_id').iterator():
+        item_id = checkpoint.item_id
+        count, delta = archived.pop(item_id, (0, 0))
+        if (count, delta) != (checkpoint.archived_count, checkpoint.archived_delta):
+            problems.append((item_id, (
+                f'archive holds {count} row(s) moving {delta:+}, '
+                f'checkpoint records {checkpoint.archived_count} moving {checkpoint.archived_delta:+}'
+            )))
+        expected = checkpoint.quantity + hot.get(item_id, 0)
+        if expected != quantities[item_id]:
+            problems.append((item_id, (
+                f'checkpoint {checkpoint.quantity} + hot ledger {hot.get(item_id, 0):+} = {expected}, '
+                f'item holds {quantities[item_id]}'
+            )))
+    for item_id, (count, _) in sorted(archived.items()):
+        problems.append((item_id, f'{count} archived row(s) without a checkpoint'))
+    overlap = Transaction.objects.filter(pk__in=ArchivedTransaction.objects.values('pk')).count()
+    if overlap:
+        problems.append((None, f'{overlap} row(s) are both archived and hot'))
+    return problems
+
+
+@receiver(post_save, sender=Item)
+def item_quantity_edited(sender, instance, raw=False, **kwargs):
+    # Quantities edited outside the ledger shift the opening balance, as the
+    # hot ledger does not explain them.
+    before = rollups.stock_before(instance)
+    if raw or before is None or before.quantity == instance.quantity:
+        return
+    BalanceCheckpoint.objects.filter(item_id=instance.pk).update(
+        quantity=F('quantity') + instance.quantity - before.quantity,
+    )
@@ -0,0 +1,101 @@
+# inventory/asyncviews.py
+import asyncio
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views import View
+
+from core.asyncviews import AsyncReadView, _error, aauthorize
+from core.models import Category, Location
+from . import events
+from .filters import ItemFilter, TransactionFilter
+from .models import Item, Transaction
+from .pagination import LedgerCursorPagination
+from .serializers import ItemSerializer, TransactionSerializer
+
+
+class ItemReadView(AsyncReadView):
+    queryset = Item.objects.all()
+    serializer_class = ItemSerializer
+    filterset_class = ItemFilter
+
+
+class TransactionReadView(AsyncReadView):
+    queryset = Transaction.objects.all()
+    serializer_class = TransactionSerializer
+    filterset_class = TransactionFilter
+    cursor_ordering = LedgerCursorPagination.ordering
+    page_size = LedgerCursorPagination.page_size
+    max_page_size = LedgerCursorPagination.max_page_size
+
+
+class StockStreamView(View):
+    """Server-Sent Events stream of stock changes, optionally for a ``?location=`` / ``?category=`` subtree.
+
+    Served by the ASGI application only. Connections end after
+    ``INVENT_STREAM_MAX_SECONDS`` (ASGI servers do not report a vanished client
+    to Django 4.2 while it streams), and ``EventSource`` reconnects with
+    ``Last-Event-ID`` to pick up where it left off.
+    """
+    http_method_names = ['get']
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return _error('The stock stream is only served by the ASGI application.', 501)
+        denied = await aauthorize(request, self)
+        if denied is not None:
+            return denied
+        filters = {}
+        for name, model in (('location', Location), ('category', Category)):
+            value = request.GET.get(name)
+            if value is None:
+                continue
+            if not value.isdigit() or not await model.objects.filter(pk=value).aexists():
+                return _error(f'Unknown {name}.', 400)
+            filters[name] = int(value)
+
+        subscription = events.Subscription(
+            asyncio.get_running_loop(), asyncio.Queue(maxsize=settings.INVENT_STREAM_QUEUE_SIZE), **filters,
+        )
+        events.broker.subscribe(subscription)
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        response = StreamingHttpResponse(
+            self.stream(subscription, last_event_id), content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, subscription, last_event_id):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.INVENT_STREAM_MAX_SECONDS
+        try:
+            yield f'retry: {settings.INVENT_STREAM_RETRY_MS}\n\n'
+            replayed = 0
+            if last_event_id:
+                missed = events.broker.replay(subscription, last_event_id)
+                if missed is None:
+                    yield events.format_event(events.RESYNC)
+                else:
+                    for event in missed:
+                        yield events.format_event(event)
+                    replayed = events.sequence(missed[-1]) if missed else 0
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), min(settings.INVENT_STREAM_HEARTBEAT_SECONDS, remaining),
+                    )
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                if event is not events.RESYNC and events.sequence(event) <= replayed:
+                    continue
+                yield events.format_event(event)
+                if event is events.RESYNC:
+                    return
+        finally:
+            events.broker.unsubscribe(subscription)
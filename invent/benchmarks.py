@@ -0,0 +1,97 @@
+# inventory/benchmarks.py
+"""Helpers for driving code concurrently and summarising latencies."""
+import asyncio
+import threading
+import time
+
+from django.db import connections
+
+
+def run_concurrently(task, payloads, concurrency):
+    """Call ``task(payload)`` for every payload from ``concurrency`` threads.
+
+    Returns ``(latencies, elapsed)`` in seconds.
+    """
+    latencies = []
+    lock = threading.Lock()
+    chunks = [payloads[index::concurrency] for index in range(concurrency)]
+
+    def worker(chunk):
+        timings = []
+        try:
+            for payload in chunk:
+                started = time.perf_counter()
+                task(payload)
+                timings.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks if chunk]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+async def run_concurrently_async(task, payloads, concurrency):
+    """Await ``task(payload)`` for every payload with at most ``concurrency`` in flight.
+
+    Returns ``(latencies, elapsed)`` in seconds, like ``run_concurrently``.
+    """
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed(payload):
+        async with slots:
+            started = time.perf_counter()
+            await task(payload)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(payload) for payload in payloads))
+    return latencies, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and p50/p95/p99 latency (milliseconds) of a run."""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'throughput': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Regressions of ``current`` against ``baseline`` benchmark results.
+
+    Latency percentiles that grew, or throughput that fell, by more than
+    ``threshold`` percent, and any growth of the median queries per request, are
+    returned as ``(endpoint, metric, before, after)``.
+    """
+    regressions = []
+    for name, after in current['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if before[metric] and after[metric] > before[metric] * (1 + threshold / 100):
+                regressions.append((name, metric, before[metric], after[metric]))
+        if after['throughput'] < before['throughput'] * (1 - threshold / 100):
+            regressions.append((name, 'throughput', before['throughput'], after['throughput']))
+        if after['queries'] > before['queries']:
+            regressions.append((name, 'queries', before['queries'], after['queries']))
+    return regressions
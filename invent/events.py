@@ -0,0 +1,209 @@
+# inventory/events.py
+"""In-process fan-out of stock changes to Server-Sent Events subscribers.
+
+When a transaction batch posts, or an item's quantity, location or category
+is edited, the item's new state is published after commit to every
+subscriber whose location / category subtree contains it. Subscribers are
+indexed by the node they follow, so a publish only visits interested
+subscribers, and each one is an ``asyncio.Queue`` on its event loop: idle
+connections cost a parked coroutine, not a thread. Writers run in other
+threads, so delivery is handed to each loop with one
+``call_soon_threadsafe`` per publish.
+
+The broker lives in the worker process: it sees the writes committed by that
+process. A subscriber that falls ``INVENT_STREAM_QUEUE_SIZE`` events behind
+is sent ``resync`` and disconnected. Recent events are kept so a client that
+reconnects with ``Last-Event-ID`` (as ``EventSource`` does) gets what it
+missed, or ``resync`` when that is no longer possible.
+"""
+import itertools
+import json
+import threading
+import uuid
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from core.db import pin_primary
+from .models import Item, Transaction
+from .signals import transactions_posted
+
+RESYNC = object()
+
+
+class Subscription:
+    def __init__(self, loop, queue, location=None, category=None):
+        self.loop = loop
+        self.queue = queue
+        self.location = location
+        self.category = category
+        self.closed = False
+
+    @property
+    def key(self):
+        if self.location is not None:
+            return ('location', self.location)
+        if self.category is not None:
+            return ('category', self.category)
+        return None
+
+    def matches(self, event):
+        return (
+            (self.location is None or self.location in event['location_path'])
+            and (self.category is None or self.category in event['category_path'])
+        )
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop.
+        if self.closed:
+            return
+        if event is not RESYNC and self.queue.full():
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+
+class Broker:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._recent = deque(maxlen=getattr(settings, 'INVENT_STREAM_REPLAY', 1000))
+        self.active = False
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.key].add(subscription)
+            self.active = True
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.key]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, events):
+        """Number and hand ``events`` to the matching subscribers; callable from any thread."""
+        by_loop = defaultdict(list)
+        with self._lock:
+            for event in events:
+                event['id'] = f'{self.epoch}-{next(self._sequence)}'
+                self._recent.append(event)
+                candidates = set(self._subscribers.get(None, ()))
+                for pk in event['location_path']:
+                    candidates |= self._subscribers.get(('location', pk), set())
+                for pk in event['category_path']:
+                    candidates |= self._subscribers.get(('category', pk), set())
+                for subscription in candidates:
+                    if subscription.matches(event):
+                        by_loop[subscription.loop].append((subscription, event))
+        for loop, deliveries in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, deliveries)
+            except RuntimeError:
+                # The loop has shut down; its subscribers are gone with it.
+                pass
+
+    def replay(self, subscription, last_event_id):
+        """Events after ``last_event_id`` for ``subscription``, or None if they are no longer known."""
+        epoch, _, after = last_event_id.partition('-')
+        if epoch != self.epoch or not after.isdigit():
+            return None
+        after = int(after)
+        with self._lock:
+            recent = list(self._recent)
+        if recent and sequence(recent[0]) > after + 1:
+            return None
+        return [event for event in recent if sequence(event) > after and subscription.matches(event)]
+
+
+def sequence(event):
+    return int(event['id'].rpartition('-')[2])
+
+
+def _deliver_all(deliveries):
+    for subscription, event in deliveries:
+        subscription.deliver(event)
+
+
+broker = Broker()
+
+
+def _path_ids(path):
+    return [int(pk) for pk in path.split('/') if pk] if path else []
+
+
+def publish_items(item_ids, reason):
+    """Publish the committed state of ``item_ids``."""
+    if not broker.active or not item_ids:
+        return
+    # Read the committed row on the primary; a replica may not have it yet.
+    with pin_primary():
+        rows = list(
+            Item.objects.filter(pk__in=item_ids).order_by()
+            .values('id', 'name', 'quantity', 'minimum_quantity', 'unit', 'location_id', 'category_id',
+                    'location__path', 'category__path', 'updated_at')
+        )
+    broker.publish([
+        {
+            'item': row['id'],
+            'name': row['name'],
+            'quantity': row['quantity'],
+            'minimum_quantity': row['minimum_quantity'],
+            'unit': row['unit'],
+            'location': row['location_id'],
+            'category': row['category_id'],
+            'location_path': _path_ids(row['location__path']),
+            'category_path': _path_ids(row['category__path']),
+            'updated_at': row['updated_at'].isoformat(),
+            'reason': reason,
+        }
+        for row in rows
+    ])
+
+
+def format_event(event):
+    if event is RESYNC:
+        return 'event: resync\ndata: {}\n\n'
+    data = {key: value for key, value in event.items() if key not in ('id', 'location_path', 'category_path')}
+    return f'id: {event["id"]}\nevent: stock\ndata: {json.dumps(data)}\n\n'
+
+
+@receiver(transactions_posted, sender=Transaction)
+def transactions_streamed(sender, transactions, reverted, **kwargs):
+    if not broker.active:
+        return
+    item_ids = {transaction.item_id for transaction in transactions}
+    # The write has committed; a failed publish must not be reported as its error.
+    db_transaction.on_commit(lambda: publish_items(item_ids, 'transaction'), robust=True)
+
+
+@receiver(pre_save, sender=Item)
+def remember_stock_state(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None or not broker.active:
+        instance._stream_before = None
+        return
+    instance._stream_before = (
+        Item.objects.filter(pk=instance.pk).values_list('quantity', 'location_id', 'category_id').first()
+    )
+
+
+@receiver(post_save, sender=Item)
+def item_streamed(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not broker.active:
+        return
+    before = getattr(instance, '_stream_before', None)
+    if created or before != (instance.quantity, instance.location_id, instance.category_id):
+        db_transaction.on_commit(lambda: publish_items([instance.pk], 'item'), robust=True)
@@ -0,0 +1,47 @@
+# inventory/filters.py
+import django_filters
+
+from core.models import Category
+from .models import ArchivedTransaction, Item, MaintenanceRecord, Transaction
+from .search import search_items
+
+
+class ItemFilter(django_filters.FilterSet):
+    category_subtree = django_filters.NumberFilter(method='filter_category_subtree')
+    search = django_filters.CharFilter(method='filter_search')
+    purchased_after = django_filters.DateFilter(field_name='purchase_date', lookup_expr='gte')
+    purchased_before = django_filters.DateFilter(field_name='purchase_date', lookup_expr='lte')
+    updated_after = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='gte')
+
+    class Meta:
+        model = Item
+        fields = ['type', 'is_active', 'category', 'location', 'supplier', 'assigned_to']
+
+    def filter_category_subtree(self, queryset, name, value):
+        return queryset.filter(Category.subtree_q(int(value), prefix='category__'))
+
+    def filter_search(self, queryset, name, value):
+        return search_items(queryset, value)
+
+
+class TransactionFilter(django_filters.FilterSet):
+    date_after = django_filters.IsoDateTimeFilter(field_name='date', lookup_expr='gte')
+    date_before = django_filters.IsoDateTimeFilter(field_name='date', lookup_expr='lte')
+
+    class Meta:
+        model = Transaction
+        fields = ['transaction_type', 'item', 'person', 'location', 'created_by']
+
+
+class ArchivedTransactionFilter(TransactionFilter):
+    class Meta(TransactionFilter.Meta):
+        model = ArchivedTransaction
+
+
+class MaintenanceRecordFilter(django_filters.FilterSet):
+    date_after = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_before = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+
+    class Meta:
+        model = MaintenanceRecord
+        fields = ['item', 'performed_by']
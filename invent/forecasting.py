@@ -0,0 +1,90 @@
+# inventory/forecasting.py
+"""Stock-out forecasts for every consumable in one set-based pass.
+
+The daily consumption rate of each item is its net usage (checked out plus
+discarded, minus checked back in) over the last ``window`` days of the
+``DailyConsumption`` rollup. Rates, days until stock-out and the reorder
+quantity needed to cover ``cover`` days above the minimum are all computed by
+the database in a single grouped query; Python only streams the result rows
+into ``StockForecast`` in batches.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FilteredRelation, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Ceil, Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Item, StockForecast
+
+BATCH_SIZE = 2000
+FORECAST_FIELDS = ('pk', 'daily_rate', 'days_until_stockout', 'days_until_minimum', 'suggested_reorder')
+
+
+def default_window():
+    return getattr(settings, 'INVENT_FORECAST_WINDOW_DAYS', 30)
+
+
+def default_cover():
+    return getattr(settings, 'INVENT_FORECAST_COVER_DAYS', 30)
+
+
+def _days_until(level):
+    return Case(
+        When(daily_rate__gt=0, then=Greatest(Cast(level, FloatField()), Value(0.0)) / F('daily_rate')),
+        default=None,
+        output_field=FloatField(),
+    )
+
+
+def forecast_queryset(window, cover, today=None):
+    """Active consumables annotated with their forecast columns."""
+    today = today or timezone.localdate()
+    # The window goes into the join condition, so only the window's rollup
+    # rows are read (an ``(item, day)`` index range per item).
+    in_window = FilteredRelation('daily_consumption', condition=Q(
+        daily_consumption__day__gt=today - timedelta(days=window), daily_consumption__day__lte=today,
+    ))
+    used = F('recent__checked_out') + F('recent__discarded') - F('recent__checked_in')
+    return (
+        Item.objects.filter(type=Item.CONSUMABLE, is_active=True).order_by()
+        .annotate(recent=in_window)
+        .annotate(consumed=Coalesce(Sum(used), Value(0)))
+        .annotate(daily_rate=Cast(Greatest(F('consumed'), Value(0)), FloatField()) / Value(float(window)))
+        .annotate(
+            days_until_stockout=_days_until(F('quantity')),
+            days_until_minimum=_days_until(F('quantity') - F('minimum_quantity')),
+            suggested_reorder=Cast(
+                Greatest(
+                    Ceil(F('daily_rate') * Value(float(cover))) + F('minimum_quantity') - F('quantity'), Value(0),
+                ),
+                IntegerField(),
+            ),
+        )
+    )
+
+
+def run(window=None, cover=None):
+    """Replace every stored forecast; returns the number written."""
+    window = window or default_window()
+    cover = cover if cover is not None else default_cover()
+    computed_at = timezone.now()
+    rows = forecast_queryset(window, cover).values_list(*FORECAST_FIELDS).iterator(chunk_size=BATCH_SIZE)
+    count = 0
+    with transaction.atomic():
+        StockForecast.objects.all().delete()
+        batch = []
+        for item_id, daily_rate, days_until_stockout, days_until_minimum, suggested_reorder in rows:
+            batch.append(StockForecast(
+                item_id=item_id, computed_at=computed_at, window_days=window, daily_rate=daily_rate,
+                days_until_stockout=days_until_stockout, days_until_minimum=days_until_minimum,
+                suggested_reorder=suggested_reorder,
+            ))
+            if len(batch) == BATCH_SIZE:
+                StockForecast.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        StockForecast.objects.bulk_create(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,159 @@
+# inventory/ledger.py
+"""Stock ledger: every Transaction moves its item's quantity.
+
+Quantities are changed with a single conditional ``UPDATE ... SET quantity =
+quantity + delta`` so concurrent writers never read-modify-write the same row,
+and a decrement that would take the stock below zero matches no row and is
+rejected.
+"""
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.models import Location, Person
+from .models import Item, Transaction
+from .signals import transactions_posted
+
+STOCK_DIRECTION = {
+    Transaction.CHECKOUT: -1,
+    Transaction.CHECKIN: 1,
+    Transaction.RESTOCK: 1,
+    Transaction.DISCARD: -1,
+}
+
+
+class InsufficientStock(ValidationError):
+    default_detail = 'Not enough stock for this transaction.'
+    default_code = 'insufficient_stock'
+
+
+def stock_delta(transaction):
+    return STOCK_DIRECTION[transaction.transaction_type] * transaction.quantity
+
+
+def signed_quantity(prefix=''):
+    """Expression evaluating to the stock delta of a transaction row."""
+    return Case(
+        *[
+            When(**{f'{prefix}transaction_type': kind}, then=F(f'{prefix}quantity') * Value(direction))
+            for kind, direction in STOCK_DIRECTION.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def move_stock(item_id, delta):
+    """Atomically add ``delta`` to an item's quantity, refusing negative stock."""
+    if not delta:
+        return
+    items = Item.objects.filter(pk=item_id)
+    if delta < 0:
+        items = items.filter(quantity__gte=-delta)
+    if not items.update(quantity=F('quantity') + delta, updated_at=timezone.now()):
+        if delta < 0 and Item.objects.filter(pk=item_id).exists():
+            raise InsufficientStock({'quantity': [InsufficientStock.default_detail]})
+        raise ValidationError({'item': ['Item does not exist.']})
+
+
+def _refresh_item(transaction):
+    if Transaction.item.is_cached(transaction):
+        transaction.item.refresh_from_db(fields=['quantity', 'updated_at'])
+
+
+def apply_transaction(transaction):
+    """Move stock for an already saved transaction."""
+    with db_transaction.atomic():
+        move_stock(transaction.item_id, stock_delta(transaction))
+        transactions_posted.send(sender=Transaction, transactions=[transaction], reverted=False)
+    _refresh_item(transaction)
+
+
+def revert_transaction(transaction):
+    """Undo the stock movement of a transaction as it is stored in the database."""
+    with db_transaction.atomic():
+        move_stock(transaction.item_id, -stock_delta(transaction))
+        transactions_posted.send(sender=Transaction, transactions=[transaction], reverted=True)
+    _refresh_item(transaction)
+
+
+def post_transaction(transaction):
+    """Save a new transaction and apply it to stock in one database transaction."""
+    with db_transaction.atomic():
+        transaction.save()
+        apply_transaction(transaction)
+    return transaction
+
+
+def delete_transaction(transaction):
+    with db_transaction.atomic():
+        revert_transaction(transaction)
+        transaction.delete()
+
+
+def post_transactions(rows, allow_partial=False, commit=True):
+    """Post a batch of transactions with a fixed number of queries.
+
+    ``rows`` are dicts as produced by ``TransactionBatchRowSerializer``. All
+    referenced objects are resolved up front, the running balance of every item
+    is checked in memory and the accepted rows are written with one
+    ``bulk_create`` plus one ``UPDATE`` adding each touched item's net delta.
+
+    Returns ``(transactions, errors)`` where ``errors`` maps row indexes to
+    field errors. Unless ``allow_partial`` is set, any error rejects the whole
+    batch and nothing is written. With ``commit=False`` the rows are only
+    validated.
+    """
+    person_ids = {row.get(key) for row in rows for key in ('person_id', 'created_by_id')} - {None}
+    location_ids = {row.get('location_id') for row in rows} - {None}
+    errors = {}
+    accepted = []
+    with db_transaction.atomic():
+        items = Item.objects.select_for_update().only('id', 'quantity').in_bulk({row['item_id'] for row in rows})
+        people = set(Person.objects.filter(pk__in=person_ids).values_list('pk', flat=True))
+        locations = set(Location.objects.filter(pk__in=location_ids).values_list('pk', flat=True))
+        balances = {pk: item.quantity for pk, item in items.items()}
+
+        for index, row in enumerate(rows):
+            row_errors = {}
+            if row['item_id'] not in items:
+                row_errors['item_id'] = ['Item does not exist.']
+            for key in ('person_id', 'created_by_id'):
+                if row.get(key) is not None and row[key] not in people:
+                    row_errors[key] = ['Person does not exist.']
+            if row.get('location_id') is not None and row['location_id'] not in locations:
+                row_errors['location_id'] = ['Location does not exist.']
+            if not row_errors:
+                balance = balances[row['item_id']] + STOCK_DIRECTION[row['transaction_type']] * row['quantity']
+                if balance < 0:
+                    row_errors['quantity'] = [InsufficientStock.default_detail]
+                else:
+                    balances[row['item_id']] = balance
+            if row_errors:
+                errors[index] = row_errors
+            else:
+                accepted.append(Transaction(**row))
+
+        if not commit or not accepted or (errors and not allow_partial):
+            return [], errors
+
+        Transaction.objects.bulk_create(accepted)
+        deltas = defaultdict(int)
+        for transaction in accepted:
+            deltas[transaction.item_id] += stock_delta(transaction)
+        # Increment like move_stock rather than writing the balances read above.
+        change = Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+            default=Value(0), output_field=IntegerField(),
+        )
+        moved = Item.objects.filter(pk__in=deltas).filter(GreaterThanOrEqual(F('quantity') + change, 0)).update(
+            quantity=F('quantity') + change, updated_at=timezone.now(),
+        )
+        if moved != len(deltas):
+            raise InsufficientStock({'quantity': [InsufficientStock.default_detail]})
+        transactions_posted.send(sender=Transaction, transactions=accepted, reverted=False)
+    return accepted, errors
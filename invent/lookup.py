@@ -0,0 +1,91 @@
+# inventory/lookup.py
+"""Cached barcode / serial-number lookups for scanners.
+
+Results (including misses) are kept in the Django cache under a key derived
+from the scanned code, and dropped whenever an item with that code is saved,
+deleted or has its quantity moved by the ledger, and again when that change
+commits.
+
+Payloads carry the stock level, so a change must be visible to every worker at
+once: like token lookups, they are only cached when the default backend is
+shared between processes (see ``core.authentication.PROCESS_LOCAL_BACKENDS``);
+with a process-local one every scan reads the row.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.authentication import PROCESS_LOCAL_BACKENDS
+from .models import Item, Transaction
+from .signals import transactions_posted
+
+LOOKUP_FIELDS = {'barcode': 'barcode', 'serial': 'serial_number'}
+PAYLOAD_FIELDS = (
+    'id', 'name', 'barcode', 'serial_number', 'type', 'quantity', 'minimum_quantity', 'unit',
+    'is_active', 'category_id', 'location_id', 'assigned_to_id',
+)
+_MISSING = object()
+
+
+def cache_key(field, value):
+    digest = hashlib.sha1(value.encode()).hexdigest()
+    return f'invent:lookup:{field}:{digest}'
+
+
+def cache_timeout():
+    return getattr(settings, 'INVENT_LOOKUP_CACHE_TIMEOUT', 300)
+
+
+def caching():
+    """Whether lookups are cached: only with a cache every worker sees."""
+    return cache_timeout() > 0 and settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def lookup_item(field, value):
+    """Return the compact payload of the item whose ``field`` equals ``value``, or None."""
+    if not caching():
+        return Item.objects.filter(**{field: value}).order_by('pk').values(*PAYLOAD_FIELDS).first()
+    key = cache_key(field, value)
+    payload = cache.get(key, _MISSING)
+    if payload is _MISSING:
+        payload = Item.objects.filter(**{field: value}).order_by('pk').values(*PAYLOAD_FIELDS).first()
+        cache.set(key, payload, cache_timeout())
+    return payload
+
+
+def invalidate(codes):
+    """Drop cached lookups for ``(barcode, serial_number)`` pairs."""
+    keys = []
+    for barcode, serial_number in codes:
+        if barcode:
+            keys.append(cache_key('barcode', barcode))
+        if serial_number:
+            keys.append(cache_key('serial_number', serial_number))
+    if keys and caching():
+        cache.delete_many(keys)
+        # A lookup racing the writer can re-cache the row as it was before the
+        # commit; drop it again once the change is visible.
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(post_init, sender=Item)
+def remember_codes(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded one query at a time.
+    instance._lookup_codes = (instance.__dict__.get('barcode'), instance.__dict__.get('serial_number'))
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def item_changed(sender, instance, **kwargs):
+    invalidate([getattr(instance, '_lookup_codes', (None, None)), (instance.barcode, instance.serial_number)])
+    instance._lookup_codes = (instance.barcode, instance.serial_number)
+
+
+@receiver(transactions_posted, sender=Transaction)
+def transactions_moved_stock(sender, transactions, **kwargs):
+    item_ids = {transaction.item_id for transaction in transactions}
+    invalidate(Item.objects.filter(pk__in=item_ids).values_list('barcode', 'serial_number'))
@@ -0,0 +1,44 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from invent import archive
+from invent.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Move transactions older than the archive horizon into the archive table, '
+        'checkpointing the balances of their items first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', metavar='YYYY-MM-DD',
+            help='Archive transactions dated before this day (default: INVENT_ARCHIVE_HORIZON_DAYS ago).',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived.')
+
+    def handle(self, *args, before=None, batch_size=5000, dry_run=False, **options):
+        cutoff = archive.default_cutoff()
+        if before is not None:
+            day = parse_date(before)
+            if day is None:
+                raise CommandError(f'Invalid date: {before}')
+            cutoff = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+        if dry_run:
+            count = Transaction.objects.filter(date__lt=cutoff).count()
+            self.stdout.write(f'{count} transaction(s) dated before {cutoff:%Y-%m-%d %H:%M} would be archived.')
+            return
+        started = time.perf_counter()
+        count = archive.archive(cutoff, batch_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {count} transaction(s) dated before {cutoff:%Y-%m-%d %H:%M} in {elapsed:.2f}s.'
+        ))
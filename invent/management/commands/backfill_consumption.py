@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from invent import analytics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily consumption rollup from transactions and maintenance records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', metavar='YYYY-MM-DD',
+            help='Only rebuild days from this date on; earlier rows are left untouched.',
+        )
+
+    def handle(self, *args, since=None, **options):
+        if since is not None:
+            day = parse_date(since)
+            if day is None:
+                raise CommandError(f'Invalid date: {since}')
+            since = day
+        with transaction.atomic():
+            count = analytics.backfill(since)
+        scope = f' from {since}' if since else ''
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} daily consumption row(s){scope}.'))
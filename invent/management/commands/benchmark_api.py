@@ -0,0 +1,185 @@
+import json
+import random
+import statistics
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core import instrumentation
+from core.models import Category, Location, Person, Supplier
+from invent.benchmarks import compare, run_concurrently, summarize
+from invent.models import Item, MaintenanceRecord, Transaction
+
+
+def sample_ids(model, rng, count=200):
+    ids = list(model.objects.order_by().values_list('pk', flat=True)[:10_000])
+    return rng.sample(ids, min(count, len(ids)))
+
+
+def scenarios(rng):
+    """Endpoint name -> function returning the next ``(method, path, body)`` to request."""
+    categories, locations = sample_ids(Category, rng), sample_ids(Location, rng)
+    suppliers, people = sample_ids(Supplier, rng), sample_ids(Person, rng)
+    items, transactions = sample_ids(Item, rng), sample_ids(Transaction, rng)
+    barcodes = list(Item.objects.filter(pk__in=items).exclude(barcode='').values_list('barcode', flat=True))
+    if not (categories and locations and suppliers and people and items and transactions):
+        raise CommandError('Every model needs some rows; run seed_inventory first.')
+
+    def get(path, ids=None):
+        if ids is None:
+            return lambda: ('get', path, None)
+        return lambda: ('get', path.format(rng.choice(ids)), None)
+
+    return {
+        'categories.list': get('/api/categories/'),
+        'categories.detail': get('/api/categories/{}/', categories),
+        'categories.descendants': get('/api/categories/{}/descendants/', categories),
+        'categories.ancestors': get('/api/categories/{}/ancestors/', categories),
+        'suppliers.list': get('/api/suppliers/'),
+        'suppliers.detail': get('/api/suppliers/{}/', suppliers),
+        'locations.list': get('/api/locations/'),
+        'locations.detail': get('/api/locations/{}/', locations),
+        'locations.stock': get('/api/locations/{}/stock/', locations),
+        'people.list': get('/api/people/'),
+        'people.detail': get('/api/people/{}/', people),
+        'items.list': get('/invent/api/items/'),
+        'items.list.fast': get('/invent/api/items/?fast=1'),
+        'items.list.sparse': get('/invent/api/items/?fields=id,name,quantity,category&expand='),
+        'items.detail': get('/invent/api/items/{}/', items),
+        'items.search': lambda: ('get', f'/invent/api/items/?search={rng.choice(["drill", "toner", "cable"])}', None),
+        'items.category_subtree': get('/invent/api/items/?category_subtree={}', categories),
+        'items.lookup': lambda: ('get', f'/invent/api/items/lookup/?barcode={rng.choice(barcodes)}', None),
+        'items.restock_queue': get('/invent/api/items/restock-queue/'),
+        'items.forecast': get('/invent/api/items/forecast/?within=30'),
+        'items.as_of': lambda: (
+            'get', f'/invent/api/items/?as_of={timezone.now().date() - timedelta(days=rng.randint(1, 90))}', None,
+        ),
+        'items.async': get('/invent/async/items/'),
+        'transactions.list': get('/invent/api/transactions/'),
+        'transactions.list.fast': get('/invent/api/transactions/?fast=1'),
+        'transactions.detail': get('/invent/api/transactions/{}/', transactions),
+        'transactions.by_item': get('/invent/api/transactions/?item={}', items),
+        'transactions.async': get('/invent/async/transactions/'),
+        'maintenance.list': get('/invent/api/maintenance-records/'),
+        'analytics.consumption': get('/invent/api/analytics/consumption/?bucket=week&group_by=category'),
+    }
+
+
+def write_scenarios(rng):
+    items = list(Item.objects.filter(type=Item.CONSUMABLE).values_list('pk', flat=True)[:200])
+    if not items:
+        return {}
+    return {
+        'transactions.create': lambda: ('post', '/invent/api/transactions/', {
+            'item_id': rng.choice(items), 'transaction_type': Transaction.RESTOCK, 'quantity': 1,
+        }),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive every core and invent API endpoint with concurrent clients and report throughput, '
+        'p50/p95/p99 latency and the median queries per request; optionally save and compare results.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--only', help='Comma separated endpoint names (or prefixes) to run.')
+        parser.add_argument('--writes', action='store_true', help='Also post transactions (changes stock).')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='Compare against results saved earlier with --output.')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Allowed regression in percent.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(is_active=True, is_superuser=True).first() \
+            or get_user_model().objects.filter(is_active=True).first()
+        if user is None:
+            raise CommandError('No active user to authenticate as; create one first.')
+        token, _ = Token.objects.get_or_create(user=user)
+        rng = random.Random(options['seed'])
+        plan = scenarios(rng)
+        if options['writes']:
+            plan.update(write_scenarios(rng))
+        if options['only']:
+            wanted = [name.strip() for name in options['only'].split(',') if name.strip()]
+            plan = {name: next_request for name, next_request in plan.items()
+                    if any(name == prefix or name.startswith(prefix + '.') for prefix in wanted)}
+            if not plan:
+                raise CommandError('No endpoint matches --only.')
+
+        results = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'database': connection.vendor,
+                'rows': {
+                    model.__name__: model.objects.count()
+                    for model in (Category, Location, Person, Supplier, Item, Transaction, MaintenanceRecord)
+                },
+            },
+            'endpoints': {},
+        }
+        # The test clients address the app as "testserver"; the sampling
+        # middleware stays off so the measured queries are the request's own.
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], CORE_INSTRUMENTATION_SAMPLE_RATE=0.0,
+        ):
+            for name, next_request in plan.items():
+                stats = self.run_endpoint(next_request, token.key, options['requests'], options['concurrency'])
+                results['endpoints'][name] = stats
+                self.stdout.write(
+                    f'{name:<26} {stats["throughput"]:>8,.0f} req/s  p50 {stats["p50_ms"]:>7.1f} ms  '
+                    f'p95 {stats["p95_ms"]:>7.1f} ms  p99 {stats["p99_ms"]:>7.1f} ms  '
+                    f'{stats["queries"]:>5.1f} queries' + (f'  {stats["errors"]} errors' if stats['errors'] else '')
+                )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(f'Results written to {options["output"]}.')
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+            regressions = compare(baseline, results, options['threshold'])
+            for name, metric, before, after in regressions:
+                self.stdout.write(self.style.WARNING(f'{name}: {metric} {before:.2f} -> {after:.2f}'))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}.')
+
+    def run_endpoint(self, next_request, token, requests, concurrency):
+        local = threading.local()
+        queries, errors = [], []
+        lock = threading.Lock()
+        payloads = [next_request() for _ in range(requests)]
+
+        def task(payload):
+            method, path, body = payload
+            if not hasattr(local, 'client'):
+                local.client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+            with instrumentation.measure() as metrics:
+                if method == 'get':
+                    response = local.client.get(path)
+                else:
+                    response = local.client.post(path, body, content_type='application/json')
+            with lock:
+                queries.append(metrics.queries)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+        latencies, elapsed = run_concurrently(task, payloads, concurrency)
+        stats = summarize(latencies, elapsed)
+        stats['queries'] = statistics.median(queries) if queries else 0
+        stats['errors'] = len(errors)
+        return stats
@@ -0,0 +1,51 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from invent.benchmarks import run_concurrently, summarize
+from invent.models import Item
+from invent.views import ItemViewSet
+
+
+class Command(BaseCommand):
+    help = 'Measure barcode lookup latency under concurrent scan load.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--codes', type=int, default=500, help='Number of distinct barcodes to scan.')
+        parser.add_argument('--miss-ratio', type=float, default=0.05, help='Share of scans for unknown codes.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        barcodes = list(
+            Item.objects.exclude(barcode='').order_by('?').values_list('barcode', flat=True)[:options['codes']]
+        )
+        if not barcodes:
+            raise CommandError('No items with barcodes; run seed_inventory or import_items first.')
+        user = get_user_model().objects.filter(is_active=True).first()
+        if user is None:
+            raise CommandError('At least one active user is required.')
+
+        scans = [
+            f'missing-{rng.randrange(10 ** 9)}' if rng.random() < options['miss_ratio'] else rng.choice(barcodes)
+            for _ in range(options['requests'])
+        ]
+        factory = APIRequestFactory()
+        view = ItemViewSet.as_view({'get': 'lookup'})
+
+        def scan(barcode):
+            request = factory.get('/invent/api/items/lookup/', {'barcode': barcode})
+            force_authenticate(request, user)
+            view(request)
+
+        for label in ('cold', 'warm'):
+            latencies, elapsed = run_concurrently(scan, scans, options['concurrency'])
+            stats = summarize(latencies, elapsed)
+            self.stdout.write(
+                f"{label}: {stats['requests']} scans, {stats['throughput']:.0f} req/s, "
+                f"p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms"
+            )
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.fastpath import RowBuilder
+from invent.models import Item, Transaction
+from invent.serializers import ItemSerializer, TransactionSerializer
+
+TARGETS = {
+    'items': (Item, ItemSerializer),
+    'transactions': (Transaction, TransactionSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare rows per second of the regular and the fast list serialization paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='transactions')
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, target, rows, repeat, **options):
+        model, serializer_class = TARGETS[target]
+        if not model.objects.exists():
+            raise CommandError(f'No {target} to serialize; run seed_inventory first.')
+        renderer = JSONRenderer()
+
+        def regular():
+            related, _ = serializer_class.query_shape()
+            instances = model.objects.select_related(*related)[:rows]
+            data = serializer_class(instances, many=True).data
+            return len(data), renderer.render(data)
+
+        def fast():
+            builder = RowBuilder(serializer_class())
+            data = [builder.build(row) for row in model.objects.values(*builder.columns)[:rows]]
+            return len(data), renderer.render(data)
+
+        results = {}
+        for label, run in (('regular', regular), ('fast', fast)):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                count, body = run()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[label] = body
+            self.stdout.write(f'{label:>8}: {count} rows in {best * 1000:.1f} ms, {count / best:,.0f} rows/s')
+        if results['regular'] != results['fast']:
+            raise CommandError('Fast path output differs from the regular serializer.')
+        self.stdout.write(self.style.SUCCESS('Output is byte-identical.'))
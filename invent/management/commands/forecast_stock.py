@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from invent import forecasting
+
+
+class Command(BaseCommand):
+    help = 'Estimate days until stock-out and reorder quantities for every active consumable.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int, default=None,
+            help='Days of consumption history behind the daily rate (default INVENT_FORECAST_WINDOW_DAYS).',
+        )
+        parser.add_argument(
+            '--cover', type=int, default=None,
+            help='Days of stock a reorder should cover (default INVENT_FORECAST_COVER_DAYS).',
+        )
+
+    def handle(self, *args, window=None, cover=None, **options):
+        if (window is not None and window < 1) or (cover is not None and cover < 0):
+            raise CommandError('--window must be positive and --cover must not be negative.')
+        started = time.perf_counter()
+        count = forecasting.run(window, cover)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Forecast {count} item(s) in {elapsed:.2f}s.'))
@@ -0,0 +1,207 @@
+import csv
+import itertools
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Category, Location, Person, Supplier
+from invent import ledger, lookup, rollups
+from invent.models import Item, Transaction
+
+ITEM_FIELDS = [
+    'name', 'description', 'type', 'quantity', 'minimum_quantity', 'unit', 'purchase_date', 'purchase_price',
+    'serial_number', 'barcode', 'notes', 'is_active',
+]
+RELATED_FIELDS = ['category', 'location', 'supplier', 'assigned_to']
+
+
+def read_rows(path):
+    """Yield input rows as dicts; CSV and NDJSON are streamed, a JSON array is loaded whole."""
+    if path.suffix == '.csv':
+        with path.open(newline='') as handle:
+            yield from csv.DictReader(handle)
+    elif path.suffix in ('.ndjson', '.jsonl'):
+        with path.open() as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.suffix == '.json':
+        with path.open() as handle:
+            yield from json.load(handle)
+    else:
+        raise CommandError('Input must be a .csv, .json, .ndjson or .jsonl file.')
+
+
+class References:
+    """In-memory lookup maps for the core objects items point at.
+
+    Loaded with one query per model; unknown categories and locations are
+    created on first use, suppliers and people only when an email is given.
+    """
+
+    def __init__(self):
+        self.categories = {category.name: category for category in Category.objects.all()}
+        self.locations = {}
+        for location in Location.objects.order_by('-pk'):
+            self.locations[location.name] = location
+        self.suppliers, self.supplier_names = self._by_email_and_name(Supplier)
+        self.people, self.person_names = self._by_email_and_name(Person)
+
+    @staticmethod
+    def _by_email_and_name(model):
+        by_email, by_name = {}, {}
+        for obj in model.objects.order_by('-pk'):
+            by_email[obj.email.lower()] = obj
+            by_name[obj.name] = obj
+        return by_email, by_name
+
+    def category(self, name):
+        if name not in self.categories:
+            self.categories[name] = Category.objects.create(name=name)
+        return self.categories[name]
+
+    def location(self, name):
+        if name not in self.locations:
+            self.locations[name] = Location.objects.create(name=name)
+        return self.locations[name]
+
+    def _contact(self, model, by_email, by_name, name, email):
+        if email:
+            email = email.lower()
+            if email not in by_email:
+                by_email[email] = model.objects.create(name=name or email, email=email)
+                by_name.setdefault(by_email[email].name, by_email[email])
+            return by_email[email]
+        if name in by_name:
+            return by_name[name]
+        raise ValidationError(f'Unknown {model._meta.verbose_name} "{name}"; give an email to create it.')
+
+    def supplier(self, name, email):
+        return self._contact(Supplier, self.suppliers, self.supplier_names, name, email)
+
+    def person(self, name, email):
+        return self._contact(Person, self.people, self.person_names, name, email)
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import or update (keyed on barcode) items from a CSV, JSON or NDJSON file. Existing items only '
+        'get the fields present in their row, and a new quantity is posted to the ledger as a stock adjustment.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Skip the rows committed by a previous run, as recorded in the state file.',
+        )
+
+    def handle(self, *args, path, batch_size, resume, **options):
+        if not path.exists():
+            raise CommandError(f'{path} does not exist.')
+        state_path = path.with_name(path.name + '.import-state')
+        skip = 0
+        if resume and state_path.exists():
+            skip = json.loads(state_path.read_text())['rows_done']
+            self.stdout.write(f'Resuming after row {skip}.')
+
+        references = References()
+        rows = itertools.islice(enumerate(read_rows(path), start=1), skip, None)
+        done, imported, failed = skip, 0, 0
+        started = time.perf_counter()
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                items, errors = self.build_items(batch, references)
+                self.save_items(items, path.name)
+            lookup.invalidate((item.barcode, item.serial_number) for item in items)
+            for number, message in errors:
+                self.stderr.write(f'row {number}: {message}')
+            done += len(batch)
+            imported += len(items)
+            failed += len(errors)
+            state_path.write_text(json.dumps({'rows_done': done}))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{done} rows read, {imported} imported, {failed} rejected, {imported / elapsed:.0f} items/s')
+
+        rollups.rebuild()
+        state_path.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} items in {time.perf_counter() - started:.1f}s; {failed} rows rejected.'
+        ))
+
+    def save_items(self, items, source):
+        """Upsert ``items``, updating only the fields each row gave, and post quantity changes to the ledger."""
+        existing = {
+            barcode: (pk, quantity)
+            for pk, barcode, quantity in Item.objects.select_for_update()
+            .filter(barcode__in=[item.barcode for item in items]).values_list('pk', 'barcode', 'quantity')
+        }
+        groups = defaultdict(list)
+        for item in items:
+            groups[item._imported_fields].append(item)
+        for fields, group in groups.items():
+            # New rows are inserted with their quantity; existing ones change it through the ledger below.
+            update_fields = [field for field in fields if field != 'quantity'] + ['updated_at']
+            Item.objects.bulk_create(
+                group, update_conflicts=True, unique_fields=['barcode'], update_fields=update_fields,
+            )
+        adjustments = []
+        for item in items:
+            if item.barcode not in existing or 'quantity' not in item._imported_fields:
+                continue
+            pk, quantity = existing[item.barcode]
+            delta = item.quantity - quantity
+            if delta:
+                adjustments.append({
+                    'item_id': pk,
+                    'transaction_type': Transaction.RESTOCK if delta > 0 else Transaction.DISCARD,
+                    'quantity': abs(delta),
+                    'notes': f'Stock count imported from {source}',
+                })
+        if adjustments:
+            _, errors = ledger.post_transactions(adjustments)
+            if errors:
+                raise CommandError(f'Stock adjustments were rejected: {errors}')
+
+    def build_items(self, batch, references):
+        """Validate a chunk of rows; later rows win when a barcode repeats."""
+        items, errors = {}, []
+        for number, row in batch:
+            try:
+                item = self.build_item(row, references)
+            except ValidationError as error:
+                errors.append((number, '; '.join(error.messages)))
+                continue
+            items[item.barcode] = item
+        return list(items.values()), errors
+
+    def build_item(self, row, references):
+        row = {key: value for key, value in row.items() if value not in (None, '')}
+        if 'barcode' not in row:
+            raise ValidationError('barcode is required.')
+        if 'is_active' in row and isinstance(row['is_active'], str):
+            row['is_active'] = row['is_active'].strip().lower() in ('1', 'true', 'yes', 'y')
+        item = Item(**{field: row[field] for field in ITEM_FIELDS if field in row})
+        item.barcode = str(item.barcode)
+        if 'category' in row:
+            item.category = references.category(row['category'])
+        if 'location' in row:
+            item.location = references.location(row['location'])
+        if 'supplier' in row or 'supplier_email' in row:
+            item.supplier = references.supplier(row.get('supplier'), row.get('supplier_email'))
+        if 'assigned_to' in row or 'assigned_to_email' in row:
+            item.assigned_to = references.person(row.get('assigned_to'), row.get('assigned_to_email'))
+        item.clean_fields(exclude=RELATED_FIELDS)
+        present = {field for field in ITEM_FIELDS if field in row}
+        present.update(field for field in RELATED_FIELDS if getattr(item, field + '_id') is not None)
+        item._imported_fields = tuple(field for field in ITEM_FIELDS + RELATED_FIELDS if field in present)
+        return item
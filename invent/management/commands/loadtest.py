@@ -0,0 +1,79 @@
+import asyncio
+import itertools
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from invent.benchmarks import run_concurrently, run_concurrently_async, summarize
+
+# (regular DRF endpoint, async-native endpoint) pairs serving the same data.
+ENDPOINTS = [
+    ('/invent/api/items/', '/invent/async/items/'),
+    ('/invent/api/transactions/', '/invent/async/transactions/'),
+    ('/api/categories/', '/async/categories/'),
+    ('/api/locations/', '/async/locations/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare read throughput and latency of the regular API under WSGI, the regular API under ASGI '
+        'and the async-native endpoints under ASGI, driving the handlers in-process.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--user', help='Username to authenticate as (default: first active user).')
+
+    def handle(self, *args, requests, concurrency, user=None, **options):
+        users = get_user_model().objects.filter(is_active=True)
+        account = users.filter(username=user).first() if user else users.first()
+        if account is None:
+            raise CommandError('No active user to authenticate as.')
+        token, _ = Token.objects.get_or_create(user=account)
+        headers = {'Authorization': f'Token {token.key}'}
+        regular = list(itertools.islice(itertools.cycle(pair[0] for pair in ENDPOINTS), requests))
+        native = list(itertools.islice(itertools.cycle(pair[1] for pair in ENDPOINTS), requests))
+
+        # The test clients address the handlers as "testserver".
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            runs = [
+                ('wsgi', self.run_wsgi(regular, headers, concurrency)),
+                ('asgi (sync views)', asyncio.run(self.run_asgi(regular, headers, concurrency))),
+                ('asgi (async views)', asyncio.run(self.run_asgi(native, headers, concurrency))),
+            ]
+        for label, (stats, failures) in runs:
+            self.stdout.write(
+                f'{label:>19}: {stats["requests"]} requests, {stats["throughput"]:,.0f} req/s, '
+                f'p50 {stats["p50_ms"]:.1f} ms, p95 {stats["p95_ms"]:.1f} ms, p99 {stats["p99_ms"]:.1f} ms'
+                + (f', {failures} failed' if failures else '')
+            )
+
+    def run_wsgi(self, paths, headers, concurrency):
+        local = threading.local()
+        failures = []
+
+        def task(path):
+            if not hasattr(local, 'client'):
+                local.client = Client(headers=headers)
+            if local.client.get(path).status_code != 200:
+                failures.append(path)
+
+        latencies, elapsed = run_concurrently(task, paths, concurrency)
+        return summarize(latencies, elapsed), len(failures)
+
+    async def run_asgi(self, paths, headers, concurrency):
+        client = AsyncClient()
+        failures = []
+
+        async def task(path):
+            if (await client.get(path, headers=headers)).status_code != 200:
+                failures.append(path)
+
+        latencies, elapsed = await run_concurrently_async(task, paths, concurrency)
+        return summarize(latencies, elapsed), len(failures)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from invent import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-location stock rollup from the items and report any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report drift; exit with an error if any is found.',
+        )
+
+    def handle(self, *args, verify=False, **options):
+        with transaction.atomic():
+            drift = rollups.find_drift()
+            for (location_id, category_id, item_type), expected, stored in drift:
+                self.stdout.write(
+                    f'location={location_id} category={category_id} type={item_type}: '
+                    f'expected {expected}, stored {stored}'
+                )
+            if verify:
+                if drift:
+                    raise CommandError(f'{len(drift)} rollup row(s) drifted.')
+                self.stdout.write(self.style.SUCCESS('Location stock rollup is consistent.'))
+                return
+            rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt location stock rollup; fixed {len(drift)} drifted row(s).'))
@@ -0,0 +1,210 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.caching import bump_model_version
+from core.models import Category, Location, Person, Supplier
+from invent import analytics, rollups
+from invent.models import Item, MaintenanceRecord, Transaction
+
+ADJECTIVES = [
+    'Compact', 'Heavy-duty', 'Wireless', 'Portable', 'Industrial', 'Ergonomic', 'Refurbished', 'Standard',
+    'Premium', 'Recycled', 'Insulated', 'Adjustable', 'Folding', 'Digital', 'Rugged', 'Sterile',
+]
+NOUNS = [
+    'Laptop', 'Monitor', 'Drill', 'Ladder', 'Printer paper', 'Toner', 'Glove', 'Battery', 'Cable', 'Chair',
+    'Desk', 'Projector', 'Scanner', 'Headset', 'Label roll', 'Marker', 'Safety vest', 'Helmet', 'Router',
+    'Extension cord', 'First aid kit', 'Mask', 'Notebook', 'Tape', 'Cleaning wipe', 'Light bulb',
+]
+DEPARTMENTS = ['Operations', 'Facilities', 'IT', 'Finance', 'Research', 'Logistics', 'Sales', 'Support']
+UNITS = {Item.ASSET: ['unit'], Item.CONSUMABLE: ['box', 'pack', 'roll', 'unit', 'litre']}
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill an empty database with deterministic synthetic inventory data: category and location trees, '
+        'people, suppliers, items, their transaction history and maintenance records.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000)
+        parser.add_argument('--transactions', type=int, default=1_000_000)
+        parser.add_argument('--people', type=int, default=5_000)
+        parser.add_argument('--suppliers', type=int, default=2_000)
+        parser.add_argument('--category-depth', type=int, default=4)
+        parser.add_argument('--category-breadth', type=int, default=6)
+        parser.add_argument('--location-depth', type=int, default=4)
+        parser.add_argument('--location-breadth', type=int, default=5)
+        parser.add_argument('--history-days', type=int, default=365)
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply the row counts, e.g. 10 or 0.01.')
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if Item.objects.exists() or Category.objects.exists() or Location.objects.exists():
+            raise CommandError('The database already has inventory data; run "manage.py flush" first.')
+        scale = options['scale']
+        self.counts = {
+            name: max(1, int(options[name] * scale)) for name in ('items', 'transactions', 'people', 'suppliers')
+        }
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.now = timezone.now().replace(microsecond=0)
+        started = time.perf_counter()
+        with transaction.atomic():
+            self.phase('categories', lambda: self.tree(
+                Category, options['category_depth'], options['category_breadth'], 'parent', 'Category',
+            ))
+            self.phase('locations', lambda: self.tree(
+                Location, options['location_depth'], options['location_breadth'], 'parent_location', 'Location',
+            ))
+            self.phase('people', self.people)
+            self.phase('suppliers', self.suppliers)
+            self.phase('items and transactions', self.items)
+            self.phase('rollups', self.rollups)
+        for model in (Category, Location, Person, Supplier):
+            bump_model_version(model)
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s.'))
+
+    def phase(self, label, run):
+        started = time.perf_counter()
+        created = run()
+        self.stdout.write(f'{label}: {created:,} rows in {time.perf_counter() - started:.1f}s')
+
+    def tree(self, model, depth, breadth, parent_field, label):
+        """A full ``breadth``-ary tree, ``depth`` levels deep, inserted level by level."""
+        level = [None]
+        names = [label]
+        total = 0
+        for _ in range(depth):
+            nodes, child_names = [], []
+            for parent, name in zip(level, names):
+                for index in range(1, breadth + (0 if parent is None else self.rng.randint(-1, 1)) + 1):
+                    child_name = f'{name} {index}' if parent is not None else f'{label} {index}'
+                    nodes.append(model(name=child_name, **{parent_field: parent}))
+                    child_names.append(child_name)
+            level = model.objects.bulk_create(nodes, batch_size=self.options['batch_size'])
+            names = child_names
+            total += len(level)
+        model.rebuild_paths()
+        setattr(self, f'{label.lower()}_leaves', [node.pk for node in level])
+        setattr(self, f'{label.lower()}_ids', list(model.objects.values_list('pk', flat=True)))
+        return total
+
+    def people(self):
+        people = [
+            Person(
+                name=f'Person {index}', email=f'person{index}@example.com',
+                department=self.rng.choice(DEPARTMENTS), position=self.rng.choice(['Staff', 'Lead', 'Manager']),
+            )
+            for index in range(1, self.counts['people'] + 1)
+        ]
+        created = Person.objects.bulk_create(people, batch_size=self.options['batch_size'])
+        self.person_ids = [person.pk for person in created]
+        return len(people)
+
+    def suppliers(self):
+        suppliers = [
+            Supplier(
+                name=f'Supplier {index}', email=f'supplier{index}@example.com', contact_person=f'Contact {index}',
+            )
+            for index in range(1, self.counts['suppliers'] + 1)
+        ]
+        created = Supplier.objects.bulk_create(suppliers, batch_size=self.options['batch_size'])
+        self.supplier_ids = [supplier.pk for supplier in created]
+        return len(suppliers)
+
+    def items(self):
+        rng, batch_size = self.rng, self.options['batch_size']
+        total_items, total_transactions = self.counts['items'], self.counts['transactions']
+        # Skewed activity: a few items see most of the traffic, capped so no
+        # single item takes over the ledger.
+        weights = [min(rng.paretovariate(1.2), 200.0) for _ in range(total_items)]
+        scale = total_transactions / sum(weights)
+        history = [int(weight * scale) for weight in weights]
+        for index in rng.sample(range(total_items), min(total_items, total_transactions - sum(history))):
+            history[index] += 1
+        created_rows = 0
+        for start in range(0, total_items, batch_size):
+            items, ledgers = [], []
+            for number in range(start, min(start + batch_size, total_items)):
+                item, ledger = self.item(number, history[number])
+                items.append(item)
+                ledgers.append(ledger)
+            Item.objects.bulk_create(items, batch_size=batch_size)
+            rows, records = [], []
+            for item, ledger in zip(items, ledgers):
+                for kind, quantity, date, person_id in ledger:
+                    rows.append(Transaction(
+                        item_id=item.pk, transaction_type=kind, quantity=quantity, date=date,
+                        person_id=person_id, location_id=item.location_id,
+                    ))
+                if item.type == Item.ASSET and rng.random() < 0.1:
+                    serviced = self.now - timedelta(days=rng.randint(0, self.options['history_days']))
+                    records.append(MaintenanceRecord(
+                        item_id=item.pk, date=serviced.date(),
+                        description='Scheduled service', cost=Decimal(rng.randint(1000, 50000)) / 100,
+                        performed_by_id=rng.choice(self.person_ids),
+                    ))
+            Transaction.objects.bulk_create(rows, batch_size=batch_size)
+            MaintenanceRecord.objects.bulk_create(records, batch_size=batch_size)
+            created_rows += len(items) + len(rows) + len(records)
+        return created_rows
+
+    def item(self, number, activity):
+        """An unsaved item and its ledger, whose running balance never goes negative."""
+        rng = self.rng
+        kind = Item.CONSUMABLE if rng.random() < 0.6 else Item.ASSET
+        minimum = rng.randint(0, 20) if kind == Item.CONSUMABLE else 0
+        balance = rng.randint(minimum, minimum + 200) if kind == Item.CONSUMABLE else rng.randint(1, 10)
+        days = self.options['history_days']
+        dates = sorted(self.now - timedelta(seconds=rng.randint(0, days * 86400)) for _ in range(activity))
+        ledger, out = [], 0
+        for date in dates:
+            person_id = rng.choice(self.person_ids)
+            if kind == Item.ASSET:
+                if out and rng.random() < 0.5:
+                    quantity = rng.randint(1, out)
+                    out -= quantity
+                    balance += quantity
+                    ledger.append((Transaction.CHECKIN, quantity, date, person_id))
+                elif balance:
+                    quantity = 1
+                    out += quantity
+                    balance -= quantity
+                    ledger.append((Transaction.CHECKOUT, quantity, date, person_id))
+                else:
+                    ledger.append((Transaction.RESTOCK, 1, date, person_id))
+                    balance += 1
+            elif balance <= minimum or rng.random() < 0.05:
+                quantity = rng.randint(20, 200)
+                balance += quantity
+                ledger.append((Transaction.RESTOCK, quantity, date, person_id))
+            else:
+                quantity = rng.randint(1, min(balance, 10))
+                balance -= quantity
+                kind_out = Transaction.DISCARD if rng.random() < 0.03 else Transaction.CHECKOUT
+                ledger.append((kind_out, quantity, date, person_id))
+        name = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS).lower()} {number + 1}'
+        item = Item(
+            name=name, type=kind, quantity=balance, minimum_quantity=minimum,
+            unit=rng.choice(UNITS[kind]),
+            category_id=rng.choice(self.category_leaves),
+            location_id=rng.choice(self.location_ids),
+            supplier_id=rng.choice(self.supplier_ids),
+            assigned_to_id=rng.choice(self.person_ids) if kind == Item.ASSET and rng.random() < 0.5 else None,
+            purchase_date=(self.now - timedelta(days=rng.randint(days, days * 3))).date(),
+            purchase_price=Decimal(rng.randint(100, 250000)) / 100,
+            serial_number=f'SN-{self.options["seed"]}-{number + 1:09d}' if kind == Item.ASSET else '',
+            barcode=f'{self.options["seed"]:03d}{number + 1:010d}',
+        )
+        return item, ledger
+
+    def rollups(self):
+        rollups.rebuild()
+        return analytics.backfill()
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from invent import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Record every item\'s current balance as a stock snapshot for point-in-time ("as of") queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, batch_size=5000, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            taken_at, count = snapshots.take(batch_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshotted {count} item(s) at {taken_at:%Y-%m-%d %H:%M:%S} in {elapsed:.2f}s.'
+        ))
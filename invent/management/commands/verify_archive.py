@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from invent import archive
+
+
+class Command(BaseCommand):
+    help = 'Check that every balance checkpoint plus the hot ledger matches the item, and the archive its checkpoint.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            problems = archive.verify()
+        for item_id, problem in problems:
+            self.stdout.write(f'item={item_id}: {problem}' if item_id is not None else problem)
+        if problems:
+            raise CommandError(f'{len(problems)} archive inconsistenc{"y" if len(problems) == 1 else "ies"} found.')
+        self.stdout.write(self.style.SUCCESS('Checkpoints, archive and hot ledger are consistent.'))
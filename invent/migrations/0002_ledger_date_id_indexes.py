@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invent', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='maintenancerecord',
+            options={'ordering': ['-date', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='transaction',
+            options={'ordering': ['-date', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['-date', '-id'], name='invent_maint_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-date', '-id'], name='invent_txn_date_id_idx'),
+        ),
+    ]
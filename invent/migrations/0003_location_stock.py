@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_location_path'),
+        ('invent', '0002_ledger_date_id_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('asset', 'Asset'), ('consumable', 'Consumable')], max_length=20)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.category')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_totals', to='core.location')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='locationstock',
+            constraint=models.UniqueConstraint(fields=('location', 'category', 'item_type'), name='invent_location_stock_key'),
+        ),
+    ]
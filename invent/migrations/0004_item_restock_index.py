@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invent', '0003_location_stock'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_active', True), ('quantity__lte', models.F('minimum_quantity'))), fields=['supplier', 'name'], name='invent_item_restock_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invent', '0004_item_restock_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='serial_number',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
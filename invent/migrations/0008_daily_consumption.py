@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invent', '0007_item_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('location_id', models.BigIntegerField(blank=True, null=True)),
+                ('checked_out', models.BigIntegerField(default=0)),
+                ('checked_in', models.BigIntegerField(default=0)),
+                ('restocked', models.BigIntegerField(default=0)),
+                ('discarded', models.BigIntegerField(default=0)),
+                ('restocked_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discarded_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('maintenance_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_consumption', to='invent.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', 'day'], name='invent_daily_item_day_idx'), models.Index(fields=['category_id', 'day'], name='invent_daily_category_day_idx'), models.Index(fields=['location_id', 'day'], name='invent_daily_location_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyconsumption',
+            constraint=models.UniqueConstraint(fields=('day', 'item', 'category_id', 'location_id'), name='invent_daily_consumption_key'),
+        ),
+    ]
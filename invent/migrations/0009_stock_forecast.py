@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invent', '0008_daily_consumption'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockForecast',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='invent.item')),
+                ('computed_at', models.DateTimeField()),
+                ('window_days', models.PositiveIntegerField()),
+                ('daily_rate', models.FloatField()),
+                ('days_until_stockout', models.FloatField(blank=True, null=True)),
+                ('days_until_minimum', models.FloatField(blank=True, null=True)),
+                ('suggested_reorder', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['days_until_stockout'], name='invent_forecast_stockout_idx')],
+            },
+        ),
+    ]
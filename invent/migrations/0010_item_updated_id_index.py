@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invent', '0009_stock_forecast'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='item',
+            name='invent_item_updated_at_idx',
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['updated_at', 'id'], name='invent_item_updated_idx'),
+        ),
+    ]
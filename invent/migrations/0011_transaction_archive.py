@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_change_feed'),
+        ('invent', '0010_item_updated_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance_checkpoint', serialize=False, to='invent.item')),
+                ('archived_through', models.DateTimeField()),
+                ('quantity', models.BigIntegerField()),
+                ('archived_count', models.BigIntegerField(default=0)),
+                ('archived_delta', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_type', models.CharField(choices=[('checkout', 'Check Out'), ('checkin', 'Check In'), ('restock', 'Restock'), ('discard', 'Discard')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('date', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.person')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='invent.item')),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.location')),
+                ('person', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.person')),
+            ],
+            options={
+                'ordering': ['-date', '-id'],
+                'indexes': [models.Index(fields=['-date', '-id'], name='invent_archive_date_id_idx'), models.Index(fields=['item', '-date', '-id'], name='invent_archive_item_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invent', '0012_stock_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='locationstock',
+            constraint=models.UniqueConstraint(condition=models.Q(('category', None)), fields=('location', 'item_type'), name='invent_location_stock_uncategorized_key'),
+        ),
+    ]
@@ -1,9 +1,18 @@
 # inventory/models.py
 from django.db import models
+from django.db.models import F, Q
 from core.models import Category, Supplier, Location, Person
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+class ItemQuerySet(models.QuerySet):
+    def with_shortfall(self):
+        return self.annotate(shortfall=F('minimum_quantity') - F('quantity'))
+
+    def needs_restock(self):
+        """Active items at or below their minimum quantity, as ``Item.needs_restock``."""
+        return self.filter(is_active=True, quantity__lte=F('minimum_quantity'))
+
 class Item(models.Model):
     ASSET = 'asset'
     CONSUMABLE = 'consumable'
@@ -24,15 +33,29 @@ class Item(models.Model):
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True)
     purchase_date = models.DateField(null=True, blank=True)
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    serial_number = models.CharField(max_length=100, blank=True)
+    serial_number = models.CharField(max_length=100, blank=True, db_index=True)
     barcode = models.CharField(max_length=100, blank=True, unique=True)
     notes = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ItemQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Only low-stock rows are indexed, so the restock queue stays small
+            # however large the catalog grows.
+            models.Index(
+                fields=['supplier', 'name'], name='invent_item_restock_idx',
+                condition=Q(is_active=True, quantity__lte=F('minimum_quantity')),
+            ),
+            models.Index(fields=['type', 'is_active'], name='invent_item_type_active_idx'),
+            models.Index(fields=['purchase_date'], name='invent_item_purchase_date_idx'),
+            # (updated_at, id) is the change feed's keyset.
+            models.Index(fields=['updated_at', 'id'], name='invent_item_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.quantity} {self.unit})"
@@ -51,7 +74,12 @@ class MaintenanceRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['-date']
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='invent_maint_date_id_idx'),
+            models.Index(fields=['item', '-date', '-id'], name='invent_maint_item_date_idx'),
+            models.Index(fields=['performed_by', '-date', '-id'], name='invent_maint_person_date_idx'),
+        ]
 
     def __str__(self):
         return f"Maintenance for {self.item.name} on {self.date}"
@@ -78,7 +106,156 @@ class Transaction(models.Model):
     created_by = models.ForeignKey(Person, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_transactions')
 
     class Meta:
-        ordering = ['-date']
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='invent_txn_date_id_idx'),
+            models.Index(fields=['item', '-date', '-id'], name='invent_txn_item_date_idx'),
+            models.Index(fields=['transaction_type', '-date', '-id'], name='invent_txn_type_date_idx'),
+            models.Index(fields=['person', '-date', '-id'], name='invent_txn_person_date_idx'),
+            models.Index(fields=['location', '-date', '-id'], name='invent_txn_location_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_transaction_type_display()} of {self.quantity} {self.item.unit}(s) of {self.item.name}"
+
+class LocationStock(models.Model):
+    """Units on hand per location, category and item type.
+
+    Each row counts the stock at ``location`` *and every location below it*,
+    so the totals for a building including all its rooms are a plain lookup.
+    Maintained incrementally by ``invent.rollups``.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='stock_totals')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    item_type = models.CharField(max_length=20, choices=Item.TYPE_CHOICES)
+    quantity = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'category', 'item_type'], name='invent_location_stock_key'),
+            # NULLs are distinct in the key above.
+            models.UniqueConstraint(
+                fields=['location', 'item_type'], condition=Q(category=None),
+                name='invent_location_stock_uncategorized_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} {self.item_type} in {self.location_id}"
+
+
+class DailyConsumption(models.Model):
+    """Units moved and money spent per day, item and the item's category/location.
+
+    ``category_id`` and ``location_id`` record where the item was filed when the
+    activity posted; they are plain ids so history survives deleted categories
+    and locations. Maintained incrementally by ``invent.analytics``.
+    """
+    day = models.DateField()
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='daily_consumption')
+    category_id = models.BigIntegerField(null=True, blank=True)
+    location_id = models.BigIntegerField(null=True, blank=True)
+    checked_out = models.BigIntegerField(default=0)
+    checked_in = models.BigIntegerField(default=0)
+    restocked = models.BigIntegerField(default=0)
+    discarded = models.BigIntegerField(default=0)
+    restocked_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discarded_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    maintenance_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'item', 'category_id', 'location_id'],
+                                    name='invent_daily_consumption_key'),
+        ]
+        indexes = [
+            models.Index(fields=['item', 'day'], name='invent_daily_item_day_idx'),
+            models.Index(fields=['category_id', 'day'], name='invent_daily_category_day_idx'),
+            models.Index(fields=['location_id', 'day'], name='invent_daily_location_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} on {self.day}"
+
+
+class StockForecast(models.Model):
+    """Latest stock-out estimate for a consumable, written by ``forecast_stock``."""
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    computed_at = models.DateTimeField()
+    window_days = models.PositiveIntegerField()
+    daily_rate = models.FloatField()
+    days_until_stockout = models.FloatField(null=True, blank=True)
+    days_until_minimum = models.FloatField(null=True, blank=True)
+    suggested_reorder = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['days_until_stockout'], name='invent_forecast_stockout_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.days_until_stockout} days"
+
+
+class ArchivedTransaction(models.Model):
+    """A ledger row moved out of ``Transaction`` by ``archive_transactions``, keeping its id."""
+    id = models.BigIntegerField(primary_key=True)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='archived_transactions')
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TYPE_CHOICES)
+    quantity = models.PositiveIntegerField(default=1)
+    person = models.ForeignKey(Person, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    date = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(Person, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='invent_archive_date_id_idx'),
+            models.Index(fields=['item', '-date', '-id'], name='invent_archive_item_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived {self.transaction_type} of {self.quantity} ({self.item_id})"
+
+
+class BalanceCheckpoint(models.Model):
+    """An item's stock before its hot ledger, and a summary of its archived rows.
+
+    ``quantity`` plus the deltas of the item's rows still in ``Transaction`` is
+    the item's current quantity; ``archived_count`` and ``archived_delta``
+    describe its rows in ``ArchivedTransaction``. Written by ``invent.archive``.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='balance_checkpoint')
+    archived_through = models.DateTimeField()
+    quantity = models.BigIntegerField()
+    archived_count = models.BigIntegerField(default=0)
+    archived_delta = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.item_id}: {self.quantity} before {self.archived_through}"
+
+
+class StockSnapshot(models.Model):
+    """An item's balance at ``taken_at``: every ledger row dated up to then, archived or not.
+
+    Written for the whole catalog at once by ``snapshot_stock``, so all rows of
+    a run share ``taken_at``; ``invent.snapshots`` replays from the nearest run.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_snapshots')
+    taken_at = models.DateTimeField()
+    quantity = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'taken_at'], name='invent_stock_snapshot_key'),
+        ]
+        indexes = [
+            models.Index(fields=['taken_at'], name='invent_snapshot_taken_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.quantity} at {self.taken_at}"
@@ -0,0 +1,15 @@
+# inventory/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class LedgerCursorPagination(CursorPagination):
+    """Keyset pagination for append-mostly ledgers ordered by ``(date, id)``.
+
+    Pages are fetched with a ``WHERE date < cursor`` seek on the composite
+    index instead of ``COUNT(*)`` plus ``OFFSET``, so every page costs the same
+    however deep into the history a client walks.
+    """
+    ordering = ('-date', '-id')
+    page_size = 6
+    page_size_query_param = 'page_size'
+    max_page_size = 500
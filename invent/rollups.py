@@ -0,0 +1,188 @@
+# inventory/rollups.py
+"""Incremental maintenance of the LocationStock rollup.
+
+A stock change at a location is added to the rows of that location and of
+every ancestor in its path, so reads never aggregate. Item saves and deletes,
+posted transactions, location moves and deletes and category deletes all
+adjust the affected rows; ``rebuild_location_stock`` recomputes the table
+from scratch and reports drift.
+"""
+from collections import defaultdict, namedtuple
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.models import Category, Location
+from core.signals import tree_node_moved
+from .ledger import STOCK_DIRECTION
+from .models import Item, LocationStock, Transaction
+from .signals import transactions_posted
+
+StockState = namedtuple('StockState', ['location_id', 'category_id', 'type', 'quantity'])
+
+
+def _path_ids(path):
+    return [int(pk) for pk in path.split('/')[:-1]]
+
+
+def apply_deltas(changes):
+    """Apply ``(location_id, category_id, item_type, delta)`` changes to the rollup."""
+    changes = [change for change in changes if change[0] is not None and change[3]]
+    if not changes:
+        return
+    ancestry = {
+        pk: _path_ids(path)
+        for pk, path in Location.objects.filter(pk__in={change[0] for change in changes}).values_list('pk', 'path')
+    }
+    totals = defaultdict(int)
+    for location_id, category_id, item_type, delta in changes:
+        for ancestor_id in ancestry.get(location_id, ()):
+            totals[ancestor_id, category_id, item_type] += delta
+    write_totals(totals)
+
+
+def write_totals(totals):
+    for (location_id, category_id, item_type), delta in totals.items():
+        if not delta:
+            continue
+        rows = LocationStock.objects.filter(location_id=location_id, category_id=category_id, item_type=item_type)
+        if rows.update(quantity=F('quantity') + delta):
+            continue
+        try:
+            with db_transaction.atomic():
+                LocationStock.objects.create(
+                    location_id=location_id, category_id=category_id, item_type=item_type, quantity=delta,
+                )
+        except IntegrityError:
+            # Another writer created the row since the update above.
+            rows.update(quantity=F('quantity') + delta)
+
+
+def expected_totals():
+    """Recompute the rollup from the items, keyed like the table."""
+    ancestry = {pk: _path_ids(path) for pk, path in Location.objects.values_list('pk', 'path')}
+    stock = (
+        Item.objects.filter(location__isnull=False).order_by()
+        .values_list('location_id', 'category_id', 'type').annotate(total=Sum('quantity'))
+    )
+    totals = defaultdict(int)
+    for location_id, category_id, item_type, total in stock:
+        for ancestor_id in ancestry[location_id]:
+            totals[ancestor_id, category_id, item_type] += total
+    return {key: total for key, total in totals.items() if total}
+
+
+def stored_totals():
+    rows = LocationStock.objects.values_list('location_id', 'category_id', 'item_type', 'quantity')
+    return {(location_id, category_id, item_type): quantity for location_id, category_id, item_type, quantity in rows if quantity}
+
+
+def find_drift():
+    """Return ``(key, expected, stored)`` for every row that disagrees with the items."""
+    expected, stored = expected_totals(), stored_totals()
+    return [
+        (key, expected.get(key, 0), stored.get(key, 0))
+        for key in sorted(expected.keys() | stored.keys(), key=str)
+        if expected.get(key, 0) != stored.get(key, 0)
+    ]
+
+
+def rebuild():
+    LocationStock.objects.all().delete()
+    LocationStock.objects.bulk_create(
+        [
+            LocationStock(location_id=location_id, category_id=category_id, item_type=item_type, quantity=total)
+            for (location_id, category_id, item_type), total in expected_totals().items()
+        ],
+        batch_size=1000,
+    )
+
+
+def _stock_state(item_id):
+    row = Item.objects.filter(pk=item_id).values_list(*StockState._fields).first()
+    return StockState(*row) if row else None
+
+
+def stock_before(instance):
+    """The stored ``StockState`` of an item being saved, from before the save; None for new items.
+
+    Valid in ``post_save`` receivers of ``Item``.
+    """
+    return getattr(instance, '_stock_before', None)
+
+
+@receiver(pre_save, sender=Item)
+def remember_item_stock(sender, instance, raw=False, **kwargs):
+    instance._stock_before = None if raw or instance.pk is None else _stock_state(instance.pk)
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changes = [(instance.location_id, instance.category_id, instance.type, instance.quantity)]
+    before = stock_before(instance)
+    if before:
+        changes.append((before.location_id, before.category_id, before.type, -before.quantity))
+    apply_deltas(changes)
+
+
+@receiver(pre_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    before = _stock_state(instance.pk)
+    if before:
+        location_id, category_id, item_type, quantity = before
+        apply_deltas([(location_id, category_id, item_type, -quantity)])
+
+
+@receiver(transactions_posted, sender=Transaction)
+def transactions_moved_stock(sender, transactions, reverted, **kwargs):
+    sign = -1 if reverted else 1
+    items = Item.objects.in_bulk({transaction.item_id for transaction in transactions})
+    apply_deltas([
+        (
+            items[transaction.item_id].location_id, items[transaction.item_id].category_id,
+            items[transaction.item_id].type,
+            sign * STOCK_DIRECTION[transaction.transaction_type] * transaction.quantity,
+        )
+        for transaction in transactions if transaction.item_id in items
+    ])
+
+
+def _subtree_rows(location):
+    return LocationStock.objects.filter(location=location).values_list('category_id', 'item_type', 'quantity')
+
+
+@receiver(tree_node_moved, sender=Location)
+def location_moved(sender, instance, old_path, **kwargs):
+    totals = defaultdict(int)
+    for category_id, item_type, quantity in _subtree_rows(instance):
+        for ancestor_id in _path_ids(old_path)[:-1]:
+            totals[ancestor_id, category_id, item_type] -= quantity
+        for ancestor_id in instance.ancestor_ids:
+            totals[ancestor_id, category_id, item_type] += quantity
+    write_totals(totals)
+
+
+@receiver(pre_delete, sender=Location)
+def location_deleted(sender, instance, **kwargs):
+    # Items at the location lose it and child locations become roots, so the
+    # whole subtree total leaves every ancestor.
+    totals = defaultdict(int)
+    for category_id, item_type, quantity in _subtree_rows(instance):
+        for ancestor_id in instance.ancestor_ids:
+            totals[ancestor_id, category_id, item_type] -= quantity
+    write_totals(totals)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # Items fall back to no category, so their totals move to the NULL bucket.
+    rows = LocationStock.objects.filter(category=instance)
+    totals = defaultdict(int)
+    for location_id, item_type, quantity in rows.values_list('location_id', 'item_type', 'quantity'):
+        totals[location_id, None, item_type] += quantity
+    rows.delete()
+    write_totals(totals)
@@ -0,0 +1,58 @@
+# inventory/search.py
+"""Ranked full-text search over item text fields.
+
+SQLite uses an FTS5 external-content table kept in sync by triggers;
+PostgreSQL uses a GIN expression index over the same columns. Both are
+created by migration ``0007_item_search``, and because they live in the
+database they also follow bulk writes. Other databases fall back to an
+unranked ``icontains`` match.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_FIELDS = ['name', 'description', 'serial_number', 'notes']
+
+FTS_TABLE = 'invent_item_fts'
+
+PG_CONFIG = 'english'
+PG_DOCUMENT = "to_tsvector('{config}', {columns})".format(
+    config=PG_CONFIG,
+    columns=" || ' ' || ".join(f"coalesce({{table}}{field}, '')" for field in SEARCH_FIELDS),
+)
+
+
+def fts5_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r'\w+', text)
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def search_items(queryset, text):
+    """Filter ``queryset`` to items matching ``text``, best matches first."""
+    vendor = connections[queryset.db].vendor
+    table = queryset.model._meta.db_table
+    if vendor == 'sqlite':
+        match = fts5_query(text)
+        if not match:
+            return queryset.none()
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+        ).order_by('-search_rank', 'name', 'id')
+    if vendor == 'postgresql':
+        document = PG_DOCUMENT.format(table=f'{table}.')
+        query = f"websearch_to_tsquery('{PG_CONFIG}', %s)"
+        return queryset.filter(
+            RawSQL(f'{document} @@ {query}', [text], output_field=BooleanField()),
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({document}, {query})', [text], output_field=FloatField()),
+        ).order_by('-search_rank', 'name', 'id')
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': text})
+    return queryset.filter(condition)
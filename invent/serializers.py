@@ -1,9 +1,15 @@
 # inventory/serializers.py
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Item, MaintenanceRecord, Transaction
-from core.serializers import CategorySerializer, SupplierSerializer, LocationSerializer, PersonSerializer
+from .models import ArchivedTransaction, Item, MaintenanceRecord, Transaction
+from core.models import Location, Person
+from core.serializers import (
+    CategorySerializer, SupplierSerializer, LocationSerializer, PersonSerializer, DynamicFieldsModelSerializer,
+)
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(DynamicFieldsModelSerializer):
     category = CategorySerializer(read_only=True)
     supplier = SupplierSerializer(read_only=True)
     location = LocationSerializer(read_only=True)
@@ -13,7 +19,7 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = '__all__'
 
-class MaintenanceRecordSerializer(serializers.ModelSerializer):
+class MaintenanceRecordSerializer(DynamicFieldsModelSerializer):
     item = ItemSerializer(read_only=True)
     performed_by = PersonSerializer(read_only=True)
 
@@ -21,12 +27,65 @@ class MaintenanceRecordSerializer(serializers.ModelSerializer):
         model = MaintenanceRecord
         fields = '__all__'
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(DynamicFieldsModelSerializer):
     item = ItemSerializer(read_only=True)
     person = PersonSerializer(read_only=True)
     location = LocationSerializer(read_only=True)
     created_by = PersonSerializer(read_only=True)
+    item_id = serializers.PrimaryKeyRelatedField(source='item', queryset=Item.objects.all(), write_only=True)
+    person_id = serializers.PrimaryKeyRelatedField(
+        source='person', queryset=Person.objects.all(), write_only=True, required=False, allow_null=True
+    )
+    location_id = serializers.PrimaryKeyRelatedField(
+        source='location', queryset=Location.objects.all(), write_only=True, required=False, allow_null=True
+    )
+    created_by_id = serializers.PrimaryKeyRelatedField(
+        source='created_by', queryset=Person.objects.all(), write_only=True, required=False, allow_null=True
+    )
 
     class Meta:
         model = Transaction
         fields = '__all__'
+
+
+class ArchivedTransactionSerializer(DynamicFieldsModelSerializer):
+    """Archived ledger rows, with related objects as ids only."""
+    class Meta:
+        model = ArchivedTransaction
+        fields = '__all__'
+
+
+class TransactionBatchRowSerializer(serializers.Serializer):
+    """One row of a bulk upload. References are plain ids, resolved in bulk by the ledger."""
+    item_id = serializers.IntegerField()
+    transaction_type = serializers.ChoiceField(choices=Transaction.TYPE_CHOICES)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    person_id = serializers.IntegerField(required=False, allow_null=True)
+    location_id = serializers.IntegerField(required=False, allow_null=True)
+    created_by_id = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateTimeField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class TransactionBatchSerializer(serializers.Serializer):
+    """Object form of a bulk upload; the rows are validated one by one with ``TransactionBatchRowSerializer``."""
+    transactions = serializers.ListField()
+    allow_partial = serializers.BooleanField(default=False)
+
+
+class ConsumptionQuerySerializer(serializers.Serializer):
+    """Query parameters of the consumption report; the window defaults to the last 30 days."""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    bucket = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    group_by = serializers.ChoiceField(choices=['item', 'category', 'location'], required=False)
+    item = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    location = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=29))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': ['Must not be after end.']})
+        return attrs
@@ -0,0 +1,8 @@
+# inventory/signals.py
+from django.dispatch import Signal
+
+# Sent by ``invent.ledger`` once a batch of transactions has moved stock, inside
+# the same database transaction. Receivers get ``transactions`` (a list of saved
+# Transaction instances) and ``reverted`` (True when the stock movement of those
+# transactions was undone, e.g. on update or delete).
+transactions_posted = Signal()
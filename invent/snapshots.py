@@ -0,0 +1,137 @@
+# inventory/snapshots.py
+"""Point-in-time stock from periodic snapshots plus the ledger in between.
+
+``take()`` records every item's balance by transaction date. ``stock_as_of()``
+annotates items with their quantity at a past moment, starting from whichever
+anchor is closest to it — the snapshot run just before or after, or the
+current quantity — and adding or subtracting only the hot and archived ledger
+rows dated between the anchor and the moment. Each row is a seek on the
+``(item, date)`` ledger indexes, so a report costs the activity between anchor
+and moment rather than the item's whole history.
+
+Snapshots follow the ledger: a transaction posted (or reverted) with a date
+before a snapshot also corrects that snapshot. Quantity edits outside the
+ledger are undated, so like the balance checkpoint, every snapshot of the item
+shifts with them; either anchor then gives the same answer.
+"""
+import re
+from datetime import datetime, time
+
+from django.db.models import F, Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import rollups
+from .ledger import signed_quantity, stock_delta
+from .models import ArchivedTransaction, Item, StockSnapshot, Transaction
+from .signals import transactions_posted
+
+LEDGERS = (Transaction, ArchivedTransaction)
+DATE = re.compile(r'\d{4}-\d{2}-\d{2}$')
+
+
+def parse_moment(value):
+    """A datetime from an ISO datetime, or the end of the day for a plain date; None if invalid."""
+    try:
+        if DATE.match(value):
+            # parse_datetime() would read a plain date as its midnight.
+            moment = datetime.combine(parse_date(value), time.max)
+        else:
+            moment = parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _dated_delta(after, through=None):
+    """Net stock moved by an item's ledger rows dated in ``(after, through]``."""
+    total = Value(0)
+    for model in LEDGERS:
+        rows = model.objects.filter(item=OuterRef('pk'), date__gt=after)
+        if through is not None:
+            rows = rows.filter(date__lte=through)
+        total = total + Coalesce(
+            Subquery(rows.order_by().values('item').annotate(total=Sum(signed_quantity())).values('total')),
+            Value(0),
+        )
+    return total
+
+
+def take(batch_size=5000):
+    """Snapshot every item's balance now; returns ``(taken_at, rows written)``."""
+    taken_at = timezone.now()
+    rows = (
+        Item.objects.order_by('pk')
+        .annotate(balance=F('quantity') - _dated_delta(taken_at))
+        .values_list('pk', 'balance')
+    )
+    batch, written = [], 0
+    for item_id, balance in rows.iterator(chunk_size=batch_size):
+        batch.append(StockSnapshot(item_id=item_id, taken_at=taken_at, quantity=balance))
+        if len(batch) >= batch_size:
+            written += len(StockSnapshot.objects.bulk_create(batch))
+            batch = []
+    written += len(StockSnapshot.objects.bulk_create(batch))
+    return taken_at, written
+
+
+def nearest_run(moment):
+    """``taken_at`` of the snapshot run closest to ``moment``, or None when the current state is closer."""
+    before = StockSnapshot.objects.filter(taken_at__lte=moment).aggregate(at=Max('taken_at'))['at']
+    after = StockSnapshot.objects.filter(taken_at__gt=moment).aggregate(at=Min('taken_at'))['at']
+    candidates = [run for run in (before, after) if run is not None]
+    now = timezone.now()
+    if moment < now:
+        candidates.append(None)
+    if not candidates:
+        return None
+    return min(candidates, key=lambda run: abs(((run or now) - moment).total_seconds()))
+
+
+def stock_as_of(queryset, moment):
+    """Items that existed at ``moment``, annotated with ``quantity_as_of``."""
+    current = F('quantity') - _dated_delta(moment)
+    run = nearest_run(moment)
+    if run is None:
+        expression = current
+    else:
+        snapshot = Subquery(
+            StockSnapshot.objects.filter(item=OuterRef('pk'), taken_at=run).values('quantity')[:1]
+        )
+        if run <= moment:
+            replayed = snapshot + _dated_delta(run, moment)
+        else:
+            replayed = snapshot - _dated_delta(moment, run)
+        # Items created after the run have no snapshot in it.
+        expression = Coalesce(replayed, current)
+    return queryset.filter(created_at__lte=moment).annotate(quantity_as_of=expression)
+
+
+@receiver(transactions_posted, sender=Transaction)
+def correct_snapshots(sender, transactions, reverted, **kwargs):
+    latest = StockSnapshot.objects.aggregate(at=Max('taken_at'))['at']
+    if latest is None:
+        return
+    sign = -1 if reverted else 1
+    for transaction in transactions:
+        if transaction.date <= latest:
+            StockSnapshot.objects.filter(item_id=transaction.item_id, taken_at__gte=transaction.date).update(
+                quantity=F('quantity') + sign * stock_delta(transaction),
+            )
+
+
+@receiver(post_save, sender=Item)
+def shift_snapshots(sender, instance, raw=False, **kwargs):
+    before = rollups.stock_before(instance)
+    if raw or before is None or before.quantity == instance.quantity:
+        return
+    StockSnapshot.objects.filter(item_id=instance.pk).update(
+        quantity=F('quantity') + instance.quantity - before.quantity,
+    )
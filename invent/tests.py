@@ -1,3 +1,1156 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import json
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.models import F, QuerySet, Sum
+from django.db.models.deletion import Collector
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Category, Supplier, Location, Person
+from core.serializers import CategorySerializer
+from . import analytics, archive, benchmarks, events, forecasting, ledger, lookup, rollups, snapshots
+from .models import (
+    ArchivedTransaction, BalanceCheckpoint, DailyConsumption, Item, LocationStock, MaintenanceRecord, StockForecast,
+    StockSnapshot, Transaction,
+)
+from .pagination import LedgerCursorPagination
+
+
+class InventAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('tester', password='secret')
+        cls.category = Category.objects.create(name='Electronics')
+        cls.supplier = Supplier.objects.create(name='Acme', email='acme@example.com')
+        cls.location = Location.objects.create(name='Warehouse')
+        cls.person = Person.objects.create(name='Alice', email='alice@example.com')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @classmethod
+    def make_item(cls, name, **kwargs):
+        defaults = {
+            'category': cls.category,
+            'supplier': cls.supplier,
+            'location': cls.location,
+            'assigned_to': cls.person,
+            'barcode': name,
+        }
+        defaults.update(kwargs)
+        return Item.objects.create(name=name, **defaults)
+
+
+class QueryBudgetTests(InventAPITestCase):
+    # Maximum number of queries per endpoint. A list page must cost the same
+    # no matter how many rows it holds, so the budgets are checked against two
+    # different amounts of data.
+    BUDGETS = {
+        '/invent/api/items/': 2,
+        '/invent/api/transactions/': 1,
+        '/invent/api/maintenance-records/': 1,
+    }
+    DETAIL_BUDGETS = {
+        'items': 1,
+        'transactions': 1,
+        'maintenance-records': 1,
+    }
+
+    def populate(self, count):
+        start = Item.objects.count()
+        for i in range(start, start + count):
+            item = self.make_item(f'Item {i}')
+            Transaction.objects.create(
+                item=item, transaction_type=Transaction.CHECKOUT,
+                person=self.person, location=self.location, created_by=self.person,
+            )
+            MaintenanceRecord.objects.create(item=item, performed_by=self.person, description='Service')
+
+    def assert_budget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_endpoints_are_constant(self):
+        for count in (1, 12):
+            self.populate(count)
+            for url, budget in self.BUDGETS.items():
+                with self.subTest(url=url, rows=count):
+                    self.assert_budget(url, budget)
+
+    def test_detail_endpoints(self):
+        self.populate(1)
+        objects = {
+            'items': Item.objects.first(),
+            'transactions': Transaction.objects.first(),
+            'maintenance-records': MaintenanceRecord.objects.first(),
+        }
+        for prefix, budget in self.DETAIL_BUDGETS.items():
+            with self.subTest(prefix=prefix):
+                self.assert_budget(f'/invent/api/{prefix}/{objects[prefix].pk}/', budget)
+
+
+class CategorySubtreeFilterTests(InventAPITestCase):
+    def test_items_in_subtree(self):
+        child = Category.objects.create(name='Computers', parent=self.category)
+        grandchild = Category.objects.create(name='Laptops', parent=child)
+        other = Category.objects.create(name='Furniture')
+        self.make_item('TV')
+        self.make_item('Desktop', category=child)
+        self.make_item('Notebook', category=grandchild)
+        self.make_item('Desk', category=other)
+        with self.assertNumQueries(2):
+            response = self.client.get('/invent/api/items/', {'category_subtree': self.category.pk})
+        self.assertEqual(self.client.get('/invent/api/items/', {'category_subtree': 'x'}).status_code, 400)
+        self.assertEqual([row['name'] for row in response.data['results']], ['Desktop', 'Notebook', 'TV'])
+        response = self.client.get('/invent/api/items/', {'category_subtree': child.pk})
+        self.assertEqual(response.data['count'], 2)
+
+
+class RestockQueueTests(InventAPITestCase):
+    def test_queue_grouped_by_supplier(self):
+        other = Supplier.objects.create(name='Globex', email='globex@example.com')
+        self.make_item('Toner', quantity=1, minimum_quantity=5)
+        self.make_item('Paper', quantity=2, minimum_quantity=2)
+        self.make_item('Pens', quantity=10, minimum_quantity=2)
+        self.make_item('Ink', quantity=0, minimum_quantity=3, supplier=other)
+        self.make_item('Old ink', quantity=0, minimum_quantity=3, supplier=other, is_active=False)
+        self.assertEqual(
+            sorted(Item.objects.needs_restock().values_list('name', flat=True)),
+            sorted(item.name for item in Item.objects.filter(is_active=True) if item.needs_restock),
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get('/invent/api/items/restock-queue/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(group['supplier_name'], group['total_shortfall'], [row['name'] for row in group['items']])
+             for group in response.data],
+            [('Acme', 4, ['Paper', 'Toner']), ('Globex', 3, ['Ink'])],
+        )
+
+
+class LookupTests(InventAPITestCase):
+    url = '/invent/api/items/lookup/'
+
+    def setUp(self):
+        super().setUp()
+        # Lookups are only cached in a cache shared by every worker.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        })
+        shared.enable()
+        self.addCleanup(shared.disable)
+        self.item = self.make_item('Scanner', barcode='0123456789', serial_number='SN-1', quantity=5)
+
+    def test_lookup_is_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'barcode': '0123456789'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.item.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, {'barcode': '0123456789'}).data['id'], self.item.pk)
+        self.assertEqual(self.client.get(self.url, {'serial': 'SN-1'}).data['id'], self.item.pk)
+        self.assertEqual(self.client.get(self.url, {'barcode': 'nope'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_process_local_cache_is_not_used(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(self.client.get(self.url, {'barcode': '0123456789'}).data['quantity'], 5)
+            with self.assertNumQueries(1):
+                self.client.get(self.url, {'barcode': '0123456789'})
+            self.assertIsNone(cache.get(lookup.cache_key('barcode', '0123456789')))
+
+    def test_saves_and_transactions_invalidate(self):
+        self.assertEqual(self.client.get(self.url, {'barcode': 'new-code'}).status_code, 404)
+        self.item.barcode = 'new-code'
+        self.item.save()
+        self.assertEqual(self.client.get(self.url, {'barcode': '0123456789'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'barcode': 'new-code'}).data['quantity'], 5)
+        ledger.post_transaction(Transaction(item=self.item, transaction_type=Transaction.CHECKOUT, quantity=2))
+        self.assertEqual(self.client.get(self.url, {'barcode': 'new-code'}).data['quantity'], 3)
+        self.item.delete()
+        self.assertEqual(self.client.get(self.url, {'barcode': 'new-code'}).status_code, 404)
+
+    def test_invalidated_again_on_commit(self):
+        self.assertEqual(self.client.get(self.url, {'barcode': '0123456789'}).data['quantity'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            ledger.post_transaction(Transaction(item=self.item, transaction_type=Transaction.CHECKOUT, quantity=2))
+            # A concurrent lookup before the commit still reads the old row.
+            cache.set(lookup.cache_key('barcode', '0123456789'), {'id': self.item.pk, 'quantity': 5})
+        self.assertEqual(self.client.get(self.url, {'barcode': '0123456789'}).data['quantity'], 3)
+
+
+class ExportTests(InventAPITestCase):
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_item_csv_export(self):
+        for i in range(30):
+            self.make_item(f'Item {i:02}')
+        with self.assertNumQueries(1):
+            content = self.read(self.client.get('/invent/api/items/export/'))
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[0]['name'], 'Item 00')
+        self.assertEqual(rows[0]['category'], 'Electronics')
+        self.assertEqual(rows[0]['assigned_to'], 'Alice')
+
+    def test_export_honours_filters(self):
+        child = Category.objects.create(name='Laptops', parent=self.category)
+        self.make_item('Notebook', category=child)
+        self.make_item('Chair', category=Category.objects.create(name='Furniture'))
+        content = self.read(self.client.get('/invent/api/items/export/', {'category_subtree': self.category.pk}))
+        self.assertEqual([row['name'] for row in csv.DictReader(StringIO(content))], ['Notebook'])
+
+    def test_transaction_ndjson_export(self):
+        item = self.make_item('Paper', quantity=10)
+        for _ in range(3):
+            ledger.post_transaction(Transaction(item=item, transaction_type=Transaction.CHECKOUT, person=self.person))
+        response = self.client.get('/invent/api/transactions/export/', {'file_format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual((rows[0]['item'], rows[0]['person']), ('Paper', 'Alice'))
+        self.assertEqual(self.client.get('/invent/api/transactions/export/', {'file_format': 'xml'}).status_code, 400)
+
+
+class SparseFieldsetTests(InventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = self.make_item('Laptop', quantity=3)
+        ledger.post_transaction(Transaction(item=self.item, transaction_type=Transaction.CHECKOUT, person=self.person))
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0], queries[-1]['sql']
+
+    def test_default_shape_is_fully_expanded(self):
+        row, _ = self.get('/invent/api/transactions/')
+        self.assertEqual(row['item']['category']['name'], 'Electronics')
+        self.assertEqual(row['person']['name'], 'Alice')
+
+    def test_unexpanded_relations_are_pks(self):
+        row, sql = self.get('/invent/api/transactions/', expand='item')
+        self.assertEqual(row['item']['category'], self.category.pk)
+        self.assertEqual(row['person'], self.person.pk)
+        self.assertNotIn('core_category', sql)
+        self.assertNotIn('core_person', sql)
+
+    def test_nested_expand(self):
+        row, sql = self.get('/invent/api/transactions/', expand='item.location,person')
+        self.assertEqual(row['item']['location']['name'], 'Warehouse')
+        self.assertEqual(row['item']['supplier'], self.supplier.pk)
+        self.assertEqual(row['person']['name'], 'Alice')
+        self.assertNotIn('core_supplier', sql)
+
+    def test_sparse_fields(self):
+        row, sql = self.get('/invent/api/items/', fields='id,name,category.name')
+        self.assertEqual(row, {'id': self.item.pk, 'name': 'Laptop', 'category': {'name': 'Electronics'}})
+        self.assertNotIn('"invent_item"."description"', sql)
+        self.assertNotIn('core_supplier', sql)
+        row, _ = self.get('/invent/api/transactions/', fields='id,item.name', expand='')
+        self.assertEqual(row, {'id': Transaction.objects.get().pk, 'item': self.item.pk})
+
+    def test_core_fields_and_expand(self):
+        child = Category.objects.create(name='Laptops', parent=self.category)
+        response = self.client.get(f'/api/categories/{child.pk}/', {'fields': 'name,parent', 'expand': 'parent'})
+        self.assertEqual(response.data, {'name': 'Laptops', 'parent': CategorySerializer(self.category).data})
+
+
+class FastListParityTests(InventAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.make_item(
+            'Laptop', quantity=3, purchase_price=Decimal('1299.90'), purchase_date=date(2024, 5, 1),
+            serial_number='SN1', notes='Ünïcode',
+        )
+        bare = Item.objects.create(name='Bare', barcode='bare', type=Item.CONSUMABLE)
+        for item in Item.objects.all():
+            ledger.post_transaction(Transaction(item=item, transaction_type=Transaction.RESTOCK, quantity=4))
+            MaintenanceRecord.objects.create(item=item, description='Service', cost=Decimal('10.50'))
+        Transaction.objects.create(item=bare, transaction_type=Transaction.CHECKIN, person=cls.person, location=cls.location)
+
+    def assert_parity(self, url, **params):
+        regular = self.client.get(url, params)
+        fast = self.client.get(url, {**params, 'fast': 1})
+        self.assertEqual(regular.status_code, 200)
+        # Pagination links carry the fast flag along; everything else must match.
+        self.assertEqual(fast.content.replace(b'&fast=1', b''), regular.content)
+
+    def test_parity(self):
+        for url in ['/invent/api/items/', '/invent/api/transactions/', '/invent/api/maintenance-records/']:
+            for params in [{}, {'expand': ''}, {'expand': 'item.category'}, {'fields': 'id,item.name,date'},
+                           {'page_size': 2}]:
+                with self.subTest(url=url, params=params):
+                    self.assert_parity(url, **params)
+
+    def test_cursor_pages_match(self):
+        regular = self.client.get('/invent/api/transactions/', {'page_size': 1})
+        fast = self.client.get('/invent/api/transactions/', {'page_size': 1, 'fast': 1})
+        self.assertEqual(fast.data['next'].replace('&fast=1', ''), regular.data['next'])
+        self.assertEqual(
+            self.client.get(fast.data['next']).content.replace(b'&fast=1', b''),
+            self.client.get(regular.data['next']).content,
+        )
+
+    def test_fast_path_skips_model_instances(self):
+        with self.assertNumQueries(1):
+            self.client.get('/invent/api/transactions/', {'fast': 1})
+
+
+class AsyncReadTests(InventAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.token = Token.objects.create(user=cls.user)
+        other = Category.objects.create(name='Furniture')
+        start = timezone.now() - timedelta(days=1)
+        for index in range(9):
+            item = cls.make_item(f'Item {index}', quantity=50, category=other if index % 3 else cls.category)
+            for offset in range(2):
+                Transaction.objects.create(
+                    item=item, transaction_type=Transaction.CHECKOUT, date=start + timedelta(hours=index % 4),
+                )
+
+    def get(self, url, params=None):
+        return self.async_client.get(url, params or {}, headers={'Authorization': f'Token {self.token.key}'})
+
+    async def test_items_match_the_regular_api(self):
+        for params in ({}, {'page': 2}, {'category': self.category.pk}, {'fields': 'id,name,category', 'expand': ''}):
+            response = await self.get('/invent/async/items/', params)
+            self.assertEqual(response.status_code, 200)
+            expected = (await self.get('/invent/api/items/', params)).content.replace(b'/api/', b'/async/')
+            self.assertEqual(response.json(), json.loads(expected))
+        self.assertEqual((await self.get('/invent/async/items/', {'category': 0})).status_code, 400)
+
+    async def test_transaction_keyset_walk(self):
+        seen, url, params = [], '/invent/async/transactions/', {'page_size': 4}
+        while url:
+            response = (await self.get(url, params)).json()
+            seen.extend(row['id'] for row in response['results'])
+            url, params = response['next'], None
+        expected = [pk async for pk in Transaction.objects.values_list('pk', flat=True)]
+        self.assertEqual(seen, expected)
+        for cursor in ('bogus', base64.urlsafe_b64encode(b'{"a": 1}').decode()):
+            self.assertEqual((await self.get('/invent/async/transactions/', {'cursor': cursor})).status_code, 404)
+
+
+class StockStreamTests(InventAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.token = Token.objects.create(user=cls.user)
+        cls.shelf = Location.objects.create(name='Shelf', parent_location=cls.location)
+        cls.office = Location.objects.create(name='Office')
+        cls.tape = cls.make_item('Tape', type=Item.CONSUMABLE, quantity=10, location=cls.shelf)
+        cls.paper = cls.make_item('Paper', type=Item.CONSUMABLE, quantity=10, location=cls.office)
+
+    def open(self, params=None, **headers):
+        return self.async_client.get(
+            '/invent/stream/stock/', params or {}, headers={'Authorization': f'Token {self.token.key}', **headers},
+        )
+
+    @sync_to_async
+    def checkout(self, item, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            ledger.post_transaction(Transaction(item=item, transaction_type=Transaction.CHECKOUT, quantity=quantity))
+
+    async def next_event(self, response):
+        chunk = await asyncio.wait_for(anext(response.streaming_content), 1)
+        lines = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines())
+        return lines.get('id'), lines.get('event'), json.loads(lines.get('data', 'null'))
+
+    async def test_subscribers_get_changes_in_their_subtree(self):
+        response = await self.open({'location': self.location.pk})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(await anext(response.streaming_content), b'retry: 2000\n\n')
+        await self.checkout(self.paper, 2)
+        await self.checkout(self.tape, 3)
+        event_id, name, data = await self.next_event(response)
+        self.assertEqual((name, data['item'], data['quantity'], data['reason']), ('stock', self.tape.pk, 7, 'transaction'))
+        await response.streaming_content.aclose()
+
+        # Reconnecting with Last-Event-ID replays what was missed meanwhile.
+        await self.checkout(self.tape, 1)
+        response = await self.open({'location': self.location.pk}, **{'Last-Event-ID': event_id})
+        await anext(response.streaming_content)
+        _, _, data = await self.next_event(response)
+        self.assertEqual(data['quantity'], 6)
+        await response.streaming_content.aclose()
+
+        response = await self.open(**{'Last-Event-ID': 'stale-1'})
+        await anext(response.streaming_content)
+        self.assertEqual((await self.next_event(response))[1], 'resync')
+        await response.streaming_content.aclose()
+
+    async def test_fan_out_to_many_idle_subscribers(self):
+        loop = asyncio.get_running_loop()
+        subscriptions = [
+            events.Subscription(loop, asyncio.Queue(maxsize=2), location=self.office.pk if index % 2 else None)
+            for index in range(2000)
+        ]
+        for subscription in subscriptions:
+            events.broker.subscribe(subscription)
+        try:
+            await self.checkout(self.tape, 1)
+            await asyncio.sleep(0)
+            delivered = [subscription.queue.qsize() for subscription in subscriptions]
+            self.assertEqual(delivered, [1, 0] * 1000)
+            for _ in range(2):
+                await self.checkout(self.tape, 1)
+            await asyncio.sleep(0)
+            self.assertIs(subscriptions[0].queue.get_nowait(), events.RESYNC)
+        finally:
+            for subscription in subscriptions:
+                events.broker.unsubscribe(subscription)
+
+    async def test_rejected_requests(self):
+        self.assertEqual((await self.async_client.get('/invent/stream/stock/')).status_code, 401)
+        self.assertEqual((await self.open({'category': 0})).status_code, 400)
+
+    def test_not_served_over_wsgi(self):
+        response = self.client.get('/invent/stream/stock/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 501)
+
+
+class FilterAndSearchTests(InventAPITestCase):
+    def names(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] if 'name' in row else row['id'] for row in response.data['results']]
+
+    def test_item_filters(self):
+        self.make_item('Laptop', purchase_date=date(2024, 1, 10))
+        self.make_item('Toner', type=Item.CONSUMABLE, purchase_date=date(2024, 6, 1))
+        self.make_item('Old printer', is_active=False, location=None)
+        url = '/invent/api/items/'
+        self.assertEqual(self.names(url, type='consumable'), ['Toner'])
+        self.assertEqual(self.names(url, is_active='false'), ['Old printer'])
+        self.assertEqual(self.names(url, location=self.location.pk), ['Laptop', 'Toner'])
+        self.assertEqual(self.names(url, purchased_after='2024-03-01'), ['Toner'])
+
+    def test_transaction_filters(self):
+        item = self.make_item('Paper', quantity=10)
+        ledger.post_transaction(Transaction(item=item, transaction_type=Transaction.CHECKOUT, person=self.person,
+                                            date=timezone.now() - timedelta(days=10)))
+        recent = ledger.post_transaction(Transaction(item=item, transaction_type=Transaction.RESTOCK))
+        url = '/invent/api/transactions/'
+        self.assertEqual(self.names(url, transaction_type='restock'), [recent.pk])
+        self.assertEqual(self.names(url, date_after=(timezone.now() - timedelta(days=1)).isoformat()), [recent.pk])
+        self.assertIn(recent.pk, self.names(url, date_before=recent.date.isoformat()))
+        self.assertEqual(len(self.names(url, person=self.person.pk)), 1)
+
+    def test_ranked_search_stays_in_sync(self):
+        self.make_item('Cordless drill', description='18V drill with two batteries')
+        self.make_item('Drill bits', notes='For the cordless drill')
+        self.make_item('Hammer', serial_number='HAM-001')
+        url = '/invent/api/items/'
+        self.assertEqual(sorted(self.names(url, search='drill')), ['Cordless drill', 'Drill bits'])
+        self.assertEqual(self.names(url, search='batter'), ['Cordless drill'])
+        self.make_item('Widget', description='widget widget', notes='spare widget')
+        self.make_item('Box', description='A box of assorted parts that may contain a widget among others')
+        self.assertEqual(self.names(url, search='widget'), ['Widget', 'Box'])
+        fast = self.client.get(url, {'search': 'widget', 'fast': 1})
+        self.assertEqual(fast.content, self.client.get(url, {'search': 'widget'}).content)
+        export = b''.join(self.client.get(f'{url}export/', {'search': 'widget'}).streaming_content).decode()
+        self.assertEqual([row['name'] for row in csv.DictReader(StringIO(export))], ['Widget', 'Box'])
+        self.assertEqual(self.names(url, search='HAM'), ['Hammer'])
+        hammer = Item.objects.get(name='Hammer')
+        hammer.description = 'Claw hammer, not a drill'
+        hammer.save()
+        self.assertEqual(len(self.names(url, search='drill')), 3)
+        Item.objects.filter(name='Drill bits').delete()
+        Item.objects.filter(name='Hammer').update(description='')
+        self.assertEqual(self.names(url, search='drill'), ['Cordless drill'])
+        self.assertEqual(self.names(url, search='"*'), [])
+
+
+class LedgerPaginationTests(InventAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        item = cls.make_item('Cable')
+        date = timezone.now()
+        # Several rows share a timestamp so the id tie-breaker is exercised.
+        Transaction.objects.bulk_create([
+            Transaction(item=item, transaction_type=Transaction.RESTOCK, date=date - timedelta(days=i // 3))
+            for i in range(20)
+        ])
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_walk_is_complete_and_ordered(self):
+        ids = self.walk('/invent/api/transactions/')
+        expected = list(Transaction.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_page_size_is_client_selectable_and_capped(self):
+        response = self.client.get('/invent/api/transactions/', {'page_size': 15})
+        self.assertEqual(len(response.data['results']), 15)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(LedgerCursorPagination.max_page_size, 500)
+        response = self.client.get('/invent/api/transactions/', {'page_size': 10_000})
+        self.assertEqual(len(response.data['results']), 20)
+
+
+class LedgerTests(InventAPITestCase):
+    def post(self, item, kind, quantity):
+        return self.client.post('/invent/api/transactions/', {
+            'item_id': item.pk, 'transaction_type': kind, 'quantity': quantity,
+        }, format='json')
+
+    def test_transactions_move_quantity(self):
+        item = self.make_item('Paper', quantity=10)
+        self.assertEqual(self.post(item, Transaction.CHECKOUT, 3).status_code, 201)
+        self.assertEqual(self.post(item, Transaction.RESTOCK, 5).status_code, 201)
+        self.assertEqual(self.post(item, Transaction.DISCARD, 2).status_code, 201)
+        response = self.post(item, Transaction.CHECKIN, 1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['item']['quantity'], 11)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 11)
+
+    def test_negative_stock_is_rejected(self):
+        item = self.make_item('Toner', quantity=2)
+        response = self.post(item, Transaction.CHECKOUT, 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 2)
+
+    def test_update_and_delete_rebalance(self):
+        item = self.make_item('Tape', quantity=10)
+        txn_id = self.post(item, Transaction.CHECKOUT, 4).data['id']
+        response = self.client.patch(f'/invent/api/transactions/{txn_id}/', {'quantity': 6}, format='json')
+        self.assertEqual(response.status_code, 200)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 4)
+        self.assertEqual(self.client.delete(f'/invent/api/transactions/{txn_id}/').status_code, 204)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 10)
+
+
+class BulkTransactionTests(InventAPITestCase):
+    url = '/invent/api/transactions/bulk/'
+
+    def rows(self, item, count, kind=Transaction.CHECKOUT):
+        return [
+            {'item_id': item.pk, 'transaction_type': kind, 'person_id': self.person.pk, 'location_id': self.location.pk}
+            for _ in range(count)
+        ]
+
+    def test_batch_is_applied(self):
+        item = self.make_item('Gloves', quantity=100)
+        other = self.make_item('Masks', quantity=0)
+        rows = self.rows(item, 30) + self.rows(other, 5, Transaction.RESTOCK)
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 35)
+        item.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((item.quantity, other.quantity), (70, 5))
+
+    def test_query_count_does_not_grow_with_batch(self):
+        item = self.make_item('Gloves', quantity=1000)
+        # The first posting of the day creates its rollup rows; later ones only update them.
+        self.client.post(self.url, self.rows(item, 1), format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, self.rows(item, 5), format='json')
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.client.post(self.url, self.rows(item, 100), format='json')
+
+    def test_errors_reject_whole_batch(self):
+        item = self.make_item('Gloves', quantity=2)
+        rows = self.rows(item, 3) + [{'item_id': 0, 'transaction_type': 'checkout'}, {'transaction_type': 'lend'}]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3, 4])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_partial_success(self):
+        item = self.make_item('Gloves', quantity=2)
+        rows = self.rows(item, 3) + [{'item_id': 0, 'transaction_type': 'checkout'}]
+        response = self.client.post(self.url, {'transactions': rows, 'allow_partial': True}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3])
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 0)
+
+    def test_allow_partial_is_a_boolean(self):
+        item = self.make_item('Gloves', quantity=2)
+        rows = self.rows(item, 1) + [{'item_id': 0, 'transaction_type': 'checkout'}]
+        response = self.client.post(self.url, {'transactions': rows, 'allow_partial': 'false'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+        response = self.client.post(self.url, {'transactions': rows, 'allow_partial': 'maybe'}, format='json')
+        self.assertIn('allow_partial', response.data)
+
+    def test_stock_moved_meanwhile_is_kept(self):
+        item = self.make_item('Gloves', quantity=10)
+        people = Person.objects.filter
+
+        def moved_meanwhile(*args, **kwargs):
+            # Another writer moves the stock after the batch has read the balances.
+            Item.objects.filter(pk=item.pk).update(quantity=F('quantity') + 5)
+            return people(*args, **kwargs)
+
+        with mock.patch.object(Person.objects, 'filter', moved_meanwhile):
+            ledger.post_transactions([{'item_id': item.pk, 'transaction_type': Transaction.CHECKOUT, 'quantity': 3}])
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 12)
+
+
+class LedgerConcurrencyTests(TransactionTestCase):
+    databases = '__all__'
+    WORKERS = 8
+    ATTEMPTS = 10
+
+    def test_parallel_checkouts_balance(self):
+        item = Item.objects.create(name='Batteries', barcode='BAT', quantity=50, type=Item.CONSUMABLE)
+        barrier = threading.Barrier(self.WORKERS)
+        rejected = []
+
+        def checkout():
+            while True:
+                try:
+                    ledger.post_transaction(Transaction(item_id=item.pk, transaction_type=Transaction.CHECKOUT))
+                    return
+                except ledger.InsufficientStock:
+                    rejected.append(1)
+                    return
+                except OperationalError:
+                    # SQLite reports lock contention instead of waiting; the
+                    # failed attempt must leave no trace, so simply retry.
+                    time.sleep(0.001)
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(self.ATTEMPTS):
+                    checkout()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        item.refresh_from_db()
+        posted = Transaction.objects.filter(item=item).aggregate(total=Sum(ledger.signed_quantity()))['total'] or 0
+        self.assertEqual(item.quantity, 50 + posted)
+        self.assertEqual(item.quantity, 0)
+        self.assertEqual(len(rejected), self.WORKERS * self.ATTEMPTS - 50)
+
+
+class LocationStockTests(InventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.building = Location.objects.create(name='Building A')
+        self.floor = Location.objects.create(name='Floor 1', parent_location=self.building)
+        self.room = Location.objects.create(name='Room 101', parent_location=self.floor)
+        self.annex = Location.objects.create(name='Annex')
+
+    def stock(self, location):
+        response = self.client.get(f'/api/locations/{location.pk}/stock/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['total']
+
+    def assert_consistent(self):
+        self.assertEqual(rollups.find_drift(), [])
+
+    def test_items_roll_up_through_locations(self):
+        self.make_item('Chair', location=self.room, quantity=4, barcode='C1')
+        self.make_item('Desk', location=self.floor, quantity=2, barcode='D1')
+        self.assertEqual([self.stock(loc) for loc in (self.building, self.floor, self.room)], [6, 6, 4])
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/locations/{self.building.pk}/stock/')
+        self.assert_consistent()
+
+    def test_item_moves_and_transactions(self):
+        item = self.make_item('Paper', location=self.room, quantity=10, type=Item.CONSUMABLE)
+        ledger.post_transaction(Transaction(item=item, transaction_type=Transaction.CHECKOUT, quantity=3))
+        self.assertEqual(self.stock(self.building), 7)
+        item.refresh_from_db()
+        item.location = self.annex
+        item.save()
+        self.assertEqual((self.stock(self.building), self.stock(self.annex)), (0, 7))
+        item.delete()
+        self.assertEqual(self.stock(self.annex), 0)
+        self.assert_consistent()
+
+    def test_location_move_and_delete(self):
+        self.make_item('Chair', location=self.room, quantity=4)
+        self.floor.parent_location = self.annex
+        self.floor.save()
+        self.assertEqual((self.stock(self.building), self.stock(self.annex)), (0, 4))
+        self.assert_consistent()
+        self.floor.delete()
+        self.assertEqual((self.stock(self.annex), self.stock(self.room)), (0, 4))
+        self.assert_consistent()
+
+    def test_category_delete(self):
+        self.make_item('Chair', location=self.room, quantity=4)
+        self.category.delete()
+        self.assertEqual(self.stock(self.building), 4)
+        self.assert_consistent()
+
+    def test_concurrently_created_rows_are_merged(self):
+        LocationStock.objects.create(location=self.annex, category=None, item_type=Item.ASSET, quantity=2)
+        update, calls = QuerySet.update, []
+
+        def racing_update(queryset, **kwargs):
+            # The first update runs before the other writer's row exists.
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            rollups.write_totals({(self.annex.pk, None, Item.ASSET): 3})
+        self.assertEqual(LocationStock.objects.get(location=self.annex).quantity, 5)
+
+    def test_rebuild_command(self):
+        self.make_item('Chair', location=self.room, quantity=4)
+        LocationStock.objects.filter(location=self.building).update(quantity=99)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_location_stock', verify=True, stdout=StringIO())
+        call_command('rebuild_location_stock', stdout=StringIO())
+        self.assert_consistent()
+        self.assertEqual(self.stock(self.building), 4)
+
+
+class ConsumptionAnalyticsTests(InventAPITestCase):
+    URL = '/invent/api/analytics/consumption/'
+
+    def setUp(self):
+        super().setUp()
+        self.paper = self.make_item('Paper', quantity=100, type=Item.CONSUMABLE, purchase_price=Decimal('2.50'))
+        self.toner = self.make_item('Toner', quantity=10, type=Item.CONSUMABLE, category=None)
+        self.days = [timezone.make_aware(timezone.datetime(2024, 3, day, 12)) for day in (4, 5, 12)]
+
+    def post(self, item, kind, quantity, when):
+        return ledger.post_transaction(Transaction(item=item, transaction_type=kind, quantity=quantity, date=when))
+
+    def populate(self):
+        self.post(self.paper, Transaction.CHECKOUT, 5, self.days[0])
+        self.post(self.paper, Transaction.CHECKOUT, 3, self.days[1])
+        self.post(self.paper, Transaction.RESTOCK, 20, self.days[2])
+        self.post(self.toner, Transaction.DISCARD, 1, self.days[2])
+        MaintenanceRecord.objects.create(item=self.paper, date=date(2024, 3, 5), description='Jam', cost=Decimal('40'))
+
+    def report(self, **params):
+        response = self.client.get(self.URL, {'start': '2024-03-01', 'end': '2024-03-31', **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['results']
+
+    def test_rollup_follows_the_ledger(self):
+        self.populate()
+        rows = {row['period']: row for row in self.report()}
+        self.assertEqual(sorted(rows), [date(2024, 3, day) for day in (4, 5, 12)])
+        self.assertEqual(rows[date(2024, 3, 5)]['checked_out'], 3)
+        self.assertEqual(rows[date(2024, 3, 5)]['maintenance_cost'], Decimal('40'))
+        self.assertEqual(rows[date(2024, 3, 12)]['restocked_value'], Decimal('50'))
+
+        checkout = Transaction.objects.get(quantity=5)
+        self.client.patch(f'/invent/api/transactions/{checkout.pk}/', {'quantity': 2}, format='json')
+        self.client.delete(f'/invent/api/transactions/{Transaction.objects.get(quantity=3).pk}/')
+        record = MaintenanceRecord.objects.get()
+        record.cost = Decimal('15')
+        record.save()
+        weekly = self.report(bucket='week')
+        self.assertEqual([row['checked_out'] for row in weekly], [2, 0])
+        self.assertEqual(weekly[0]['maintenance_cost'], Decimal('15'))
+        self.assertEqual(analytics.expected_rows().keys(), set(
+            DailyConsumption.objects.values_list('day', 'item_id', 'category_id', 'location_id')
+        ))
+
+    def test_grouping_and_subtree_filters(self):
+        self.populate()
+        by_category = self.report(bucket='month', group_by='category')
+        self.assertEqual(
+            [(row['name'], row['checked_out'], row['discarded']) for row in by_category],
+            [(None, 0, 1), ('Electronics', 8, 0)],
+        )
+        parent = Category.objects.create(name='Office')
+        self.category.parent = parent
+        self.category.save()
+        rows = self.report(bucket='month', category=parent.pk)
+        self.assertEqual([row['checked_out'] for row in rows], [8])
+        with self.assertNumQueries(2):
+            self.report(group_by='item', location=self.location.pk)
+
+    def test_backfill_matches_incremental_rollup(self):
+        self.populate()
+        incremental = sorted(DailyConsumption.objects.values_list(
+            'day', 'item_id', 'checked_out', 'restocked', 'discarded', 'restocked_value', 'maintenance_cost',
+        ))
+        DailyConsumption.objects.update(checked_out=0)
+        call_command('backfill_consumption', since='2024-03-05', stdout=StringIO())
+        self.assertEqual(DailyConsumption.objects.get(day=date(2024, 3, 4)).checked_out, 0)
+        call_command('backfill_consumption', stdout=StringIO())
+        self.assertEqual(sorted(DailyConsumption.objects.values_list(
+            'day', 'item_id', 'checked_out', 'restocked', 'discarded', 'restocked_value', 'maintenance_cost',
+        )), incremental)
+
+    def test_rejects_bad_windows(self):
+        response = self.client.get(self.URL, {'start': '2024-03-10', 'end': '2024-03-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.URL, {'bucket': 'year'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StockForecastTests(InventAPITestCase):
+    URL = '/invent/api/items/forecast/'
+
+    def setUp(self):
+        super().setUp()
+        self.paper = self.make_item('Paper', quantity=160, minimum_quantity=20, type=Item.CONSUMABLE)
+        self.toner = self.make_item('Toner', quantity=20, minimum_quantity=2, type=Item.CONSUMABLE)
+        self.idle = self.make_item('Staples', quantity=1, minimum_quantity=4, type=Item.CONSUMABLE)
+        self.make_item('Laptop', quantity=3)
+        now = timezone.now()
+        for item, kind, quantity, when in [
+            (self.paper, Transaction.CHECKOUT, 50, now - timedelta(days=3)),
+            (self.paper, Transaction.DISCARD, 20, now - timedelta(days=1)),
+            (self.paper, Transaction.CHECKIN, 10, now),
+            (self.toner, Transaction.CHECKOUT, 15, now - timedelta(days=2)),
+            (self.idle, Transaction.CHECKOUT, 1, now - timedelta(days=90)),
+        ]:
+            ledger.post_transaction(Transaction(item=item, transaction_type=kind, quantity=quantity, date=when))
+
+    def test_forecast_is_computed_for_consumables(self):
+        call_command('forecast_stock', window=30, cover=30, stdout=StringIO())
+        forecasts = {
+            forecast.item_id: forecast for forecast in StockForecast.objects.all()
+        }
+        self.assertEqual(set(forecasts), {self.paper.pk, self.toner.pk, self.idle.pk})
+        paper, toner, idle = forecasts[self.paper.pk], forecasts[self.toner.pk], forecasts[self.idle.pk]
+        self.assertAlmostEqual(paper.daily_rate, 2.0)
+        self.assertAlmostEqual(paper.days_until_stockout, 50.0)
+        self.assertAlmostEqual(paper.days_until_minimum, 40.0)
+        self.assertEqual(paper.suggested_reorder, 0)
+        self.assertAlmostEqual(toner.days_until_stockout, 10.0)
+        self.assertEqual(toner.suggested_reorder, 12)
+        self.assertEqual((idle.daily_rate, idle.days_until_stockout, idle.suggested_reorder), (0.0, None, 4))
+
+    def test_endpoint_orders_by_urgency(self):
+        forecasting.run(window=30, cover=30)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.URL)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([row['name'] for row in response.data['results']], ['Toner', 'Paper', 'Staples'])
+        response = self.client.get(self.URL, {'within': 20, 'supplier': self.supplier.pk})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Toner'])
+        self.assertEqual(self.client.get(self.URL, {'within': 'soon'}).status_code, 400)
+
+
+@override_settings(CORE_CHANGES_SETTLE_SECONDS=0)
+class ItemChangeFeedTests(InventAPITestCase):
+    def feed(self, cursor=None):
+        response = self.client.get('/api/changes/', {'models': 'item', **({'cursor': cursor} if cursor else {})})
+        self.assertEqual(response.status_code, 200)
+        return response.data['changes'], response.data['cursor']
+
+    def test_stock_movements_and_orphaned_items_are_fed(self):
+        drill, tape = self.make_item('Drill'), self.make_item('Tape', type=Item.CONSUMABLE, quantity=10)
+        changes, cursor = self.feed()
+        self.assertEqual({change['id'] for change in changes}, {drill.pk, tape.pk})
+        self.assertEqual(changes[0]['data']['category'], self.category.pk)
+
+        ledger.post_transaction(Transaction(item=tape, transaction_type=Transaction.CHECKOUT, quantity=3))
+        changes, cursor = self.feed(cursor)
+        self.assertEqual([(change['id'], change['data']['quantity']) for change in changes], [(tape.pk, 7)])
+
+        self.person.delete()
+        drill_pk = drill.pk
+        drill.delete()
+        changes, _ = self.feed(cursor)
+        self.assertEqual([(change['op'], change['id']) for change in changes],
+                         [('upsert', tape.pk), ('delete', drill_pk)])
+        self.assertIsNone(changes[0]['data']['assigned_to'])
+
+    def test_models_outside_the_feed_keep_fast_deletes(self):
+        self.assertTrue(Collector(using='default').can_fast_delete(Transaction.objects.all()))
+        self.assertFalse(Collector(using='default').can_fast_delete(Person.objects.all()))
+
+
+class ArchiveTests(InventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.drill = self.make_item('Drill', quantity=5)
+        self.tape = self.make_item('Tape', type=Item.CONSUMABLE, quantity=100)
+        now = timezone.now()
+        for days, item, kind, quantity in [
+            (400, self.tape, Transaction.CHECKOUT, 10), (390, self.tape, Transaction.RESTOCK, 50),
+            (380, self.drill, Transaction.CHECKOUT, 2), (100, self.tape, Transaction.CHECKOUT, 7),
+            (10, self.drill, Transaction.CHECKIN, 1), (1, self.tape, Transaction.DISCARD, 3),
+        ]:
+            ledger.post_transaction(Transaction(
+                item=item, transaction_type=kind, quantity=quantity, date=now - timedelta(days=days),
+            ))
+        analytics.backfill()
+        self.consumption = sorted(DailyConsumption.objects.values_list('day', 'item_id', 'checked_out', 'restocked'))
+
+    def test_archive_checkpoints_and_verifies(self):
+        moved = archive.archive(timezone.now() - timedelta(days=365), batch_size=2)
+        self.assertEqual(moved, 3)
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertEqual(ArchivedTransaction.objects.count(), 3)
+        tape = BalanceCheckpoint.objects.get(item=self.tape)
+        self.assertEqual((tape.quantity, tape.archived_count, tape.archived_delta), (140, 2, 40))
+        self.assertEqual(BalanceCheckpoint.objects.get(item=self.drill).quantity, 3)
+        self.assertEqual(archive.verify(), [])
+
+        archive.archive(timezone.now() - timedelta(days=30))
+        tape.refresh_from_db()
+        self.assertEqual((tape.quantity, tape.archived_count, tape.archived_delta), (133, 3, 33))
+        self.tape.refresh_from_db()
+        self.assertEqual(self.tape.quantity, 130)
+
+        # Reports rebuilt from the ledgers still see the archived days.
+        analytics.backfill()
+        self.assertEqual(
+            sorted(DailyConsumption.objects.values_list('day', 'item_id', 'checked_out', 'restocked')),
+            self.consumption,
+        )
+        # Edits outside the ledger move the checkpoint with them.
+        self.client.patch(f'/invent/api/items/{self.tape.pk}/', {'quantity': 120}, format='json')
+        out = StringIO()
+        call_command('verify_archive', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+        ArchivedTransaction.objects.filter(item=self.tape).first().delete()
+        with self.assertRaises(CommandError):
+            call_command('verify_archive', stdout=StringIO())
+
+    def test_archive_api(self):
+        call_command('archive_transactions', stdout=StringIO())
+        response = self.client.get('/invent/api/archived-transactions/', {'item': self.tape.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['quantity'] for row in response.data['results']], [50, 10])
+        self.assertEqual(response.data['results'][0]['item'], self.tape.pk)
+        self.assertEqual(
+            self.client.post('/invent/api/archived-transactions/', {}, format='json').status_code, 405,
+        )
+
+
+class StockAsOfTests(InventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.tape = self.make_item('Tape', type=Item.CONSUMABLE, quantity=100)
+        Item.objects.filter(pk=self.tape.pk).update(created_at=self.now - timedelta(days=500))
+        for days, kind, quantity in [
+            (30, Transaction.RESTOCK, 50), (20, Transaction.CHECKOUT, 10), (5, Transaction.DISCARD, 5),
+        ]:
+            ledger.post_transaction(Transaction(
+                item=self.tape, transaction_type=kind, quantity=quantity, date=self.now - timedelta(days=days),
+            ))
+
+    def as_of(self, days):
+        return snapshots.stock_as_of(Item.objects.all(), self.now - timedelta(days=days))
+
+    def test_replays_from_current_state_without_snapshots(self):
+        self.make_item('New tape', type=Item.CONSUMABLE, quantity=7)
+        self.assertEqual(list(self.as_of(25).values_list('name', 'quantity_as_of')), [('Tape', 150)])
+        self.assertEqual(list(self.as_of(40).values_list('quantity_as_of', flat=True)), [100])
+
+    def test_replays_from_nearest_snapshot(self):
+        with mock.patch('invent.snapshots.timezone.now', return_value=self.now - timedelta(days=15)):
+            taken_at, written = snapshots.take()
+        self.assertEqual(written, 1)
+        self.assertEqual(StockSnapshot.objects.get(item=self.tape, taken_at=taken_at).quantity, 140)
+        self.assertEqual(self.as_of(10).get().quantity_as_of, 140)
+        self.assertEqual(self.as_of(25).get().quantity_as_of, 150)
+
+        # A backdated posting corrects the snapshots taken after its date.
+        ledger.post_transaction(Transaction(
+            item=self.tape, transaction_type=Transaction.RESTOCK, quantity=20, date=self.now - timedelta(days=18),
+        ))
+        self.assertEqual(StockSnapshot.objects.get(item=self.tape).quantity, 160)
+        self.assertEqual(self.as_of(10).get().quantity_as_of, 160)
+        self.assertEqual(self.as_of(25).get().quantity_as_of, 150)
+
+        # Archived rows still count.
+        archive.archive(self.now - timedelta(days=25))
+        self.assertEqual(self.as_of(40).get().quantity_as_of, 100)
+
+    def test_quantity_edits_shift_snapshots(self):
+        with mock.patch('invent.snapshots.timezone.now', return_value=self.now - timedelta(days=15)):
+            snapshots.take()
+        self.client.patch(f'/invent/api/items/{self.tape.pk}/', {'quantity': 100}, format='json')
+        self.assertEqual(StockSnapshot.objects.get(item=self.tape).quantity, 105)
+        # The snapshot (nearer) and the current state agree.
+        self.assertEqual(self.as_of(10).get().quantity_as_of, 105)
+        StockSnapshot.objects.all().delete()
+        self.assertEqual(self.as_of(10).get().quantity_as_of, 105)
+
+    def test_as_of_api(self):
+        day = (self.now - timedelta(days=10)).date()
+        noon = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+        ledger.post_transaction(Transaction(
+            item=self.tape, transaction_type=Transaction.RESTOCK, quantity=3, date=noon,
+        ))
+        drill = self.make_item('Drill', quantity=2)
+        Item.objects.filter(pk=drill.pk).update(created_at=noon)
+        call_command('snapshot_stock', stdout=StringIO())
+        # A date covers the whole day.
+        response = self.client.get('/invent/api/items/', {'as_of': day.isoformat(), 'fields': 'id,quantity'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(response.data['results'], key=lambda row: row['id']),
+            [{'id': self.tape.pk, 'quantity': 143}, {'id': drill.pk, 'quantity': 2}],
+        )
+        response = self.client.get('/invent/api/items/', {'as_of': f'{day.isoformat()}T06:00:00'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.tape.pk])
+        self.assertEqual(response.data['results'][0]['quantity'], 140)
+        for value in ('yesterday', '2026-02-30'):
+            response = self.client.get('/invent/api/items/', {'as_of': value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('as_of', response.data)
+
+
+class ImportItemsTests(InventAPITestCase):
+    HEADER = 'name,barcode,quantity,type,category,location,supplier,supplier_email,assigned_to_email,purchase_price\n'
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_items', str(path), stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_resolves_and_creates_references(self):
+        path = self.write('items.csv', self.HEADER + ''.join(
+            f'Item {i},B{i},{i + 1},consumable,Electronics,Shelf {i % 3},Acme,acme@example.com,bob@example.com,9.50\n'
+            for i in range(25)
+        ) + 'Broken,B99,-4,asset,,,,,,\nNo barcode,,1,asset,,,,,,\n')
+        out, err = self.run_import(path, batch_size=10)
+        self.assertEqual(Item.objects.count(), 25)
+        self.assertIn('row 26', err)
+        self.assertIn('row 27', err)
+        self.assertEqual(Category.objects.filter(name='Electronics').count(), 1)
+        self.assertEqual(Location.objects.filter(name__startswith='Shelf').count(), 3)
+        self.assertEqual(Supplier.objects.count(), 1)
+        item = Item.objects.get(barcode='B7')
+        self.assertEqual((item.quantity, item.category, item.supplier, item.assigned_to.email),
+                         (8, self.category, self.supplier, 'bob@example.com'))
+        self.assertEqual(rollups.find_drift(), [])
+        self.assertFalse(path.with_name('items.csv.import-state').exists())
+
+    def test_upsert_on_barcode(self):
+        self.make_item('Old name', barcode='B1', quantity=1, description='Cordless', notes='Shelf 2')
+        self.make_item('Kept', barcode='B3', quantity=9)
+        path = self.write('items.ndjson', '\n'.join([
+            json.dumps({'name': 'New name', 'barcode': 'B1', 'quantity': 5}),
+            json.dumps({'name': 'Other', 'barcode': 'B2'}),
+            json.dumps({'name': 'Kept', 'barcode': 'B3', 'quantity': 6}),
+        ]))
+        self.run_import(path)
+        self.assertEqual(Item.objects.count(), 3)
+        item = Item.objects.get(barcode='B1')
+        # Fields the row leaves out are kept.
+        self.assertEqual(
+            (item.name, item.quantity, item.description, item.notes, item.category, item.assigned_to),
+            ('New name', 5, 'Cordless', 'Shelf 2', self.category, self.person),
+        )
+        # Quantity changes of existing items go through the ledger.
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('item__barcode', 'transaction_type', 'quantity')),
+            [('B1', Transaction.RESTOCK, 4), ('B3', Transaction.DISCARD, 3)],
+        )
+        self.assertEqual(Item.objects.get(barcode='B3').quantity, 6)
+
+    def test_resume_skips_committed_rows(self):
+        path = self.write('items.csv', self.HEADER + ''.join(f'Item {i},B{i},1,asset,,,,,,\n' for i in range(6)))
+        path.with_name('items.csv.import-state').write_text(json.dumps({'rows_done': 4}))
+        self.run_import(path, resume=True)
+        self.assertEqual(sorted(Item.objects.values_list('barcode', flat=True)), ['B4', 'B5'])
+
+
+class SeedAndBenchmarkTests(TransactionTestCase):
+    databases = '__all__'
+
+    def seed(self):
+        call_command(
+            'seed_inventory', items=40, transactions=400, people=5, suppliers=3, category_depth=2,
+            category_breadth=3, location_depth=2, location_breadth=2, history_days=30, stdout=StringIO(),
+        )
+
+    def test_seed_is_consistent(self):
+        self.seed()
+        self.assertEqual(Item.objects.count(), 40)
+        self.assertEqual(Transaction.objects.count(), 400)
+        self.assertFalse(Category.objects.filter(parent__isnull=False, path='').exists())
+        for item in Item.objects.all():
+            posted = Transaction.objects.filter(item=item).aggregate(
+                total=Sum(ledger.signed_quantity()))['total'] or 0
+            self.assertGreaterEqual(item.quantity, 0)
+            self.assertLessEqual(posted, item.quantity)
+        self.assertEqual(rollups.find_drift(), [])
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_benchmark_writes_and_compares_results(self):
+        self.seed()
+        get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        output = Path(tempfile.mkdtemp()) / 'results.json'
+        call_command('benchmark_api', requests=4, concurrency=2, only='items.detail,suppliers',
+                     output=str(output), stdout=StringIO())
+        results = json.loads(output.read_text())
+        self.assertEqual(sorted(results['endpoints']), ['items.detail', 'suppliers.detail', 'suppliers.list'])
+        self.assertEqual(results['meta']['rows']['Item'], 40)
+        detail = results['endpoints']['items.detail']
+        self.assertEqual((detail['requests'], detail['errors']), (4, 0))
+        self.assertGreaterEqual(detail['queries'], 1)
+
+        slower = json.loads(output.read_text())
+        slower['endpoints']['items.detail']['p50_ms'] *= 3
+        slower['endpoints']['items.detail']['queries'] += 2
+        self.assertEqual(
+            [(name, metric) for name, metric, _, _ in benchmarks.compare(results, slower, 10)],
+            [('items.detail', 'p50_ms'), ('items.detail', 'queries')],
+        )
+        self.assertEqual(benchmarks.compare(results, results, 10), [])
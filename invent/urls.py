@@ -1,12 +1,24 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ItemViewSet, MaintenanceRecordViewSet, TransactionViewSet
+from .asyncviews import ItemReadView, StockStreamView, TransactionReadView
+from .views import (
+    ArchivedTransactionViewSet, ConsumptionViewSet, ItemViewSet, MaintenanceRecordViewSet, TransactionViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'items', ItemViewSet)
 router.register(r'maintenance-records', MaintenanceRecordViewSet)
 router.register(r'transactions', TransactionViewSet)
+router.register(r'archived-transactions', ArchivedTransactionViewSet)
+router.register(r'analytics/consumption', ConsumptionViewSet, basename='consumption')
 
 urlpatterns = [
     path('api/', include(router.urls)),
+    # Async-native reads for the ASGI deployment.
+    path('async/items/', ItemReadView.as_view()),
+    path('async/items/<int:pk>/', ItemReadView.as_view()),
+    path('async/transactions/', TransactionReadView.as_view()),
+    path('async/transactions/<int:pk>/', TransactionReadView.as_view()),
+    # Server-Sent Events, ASGI only.
+    path('stream/stock/', StockStreamView.as_view()),
 ]
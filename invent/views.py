@@ -1,16 +1,255 @@
 # inventory/views.py
-from rest_framework import viewsets
-from .models import Item, MaintenanceRecord, Transaction
-from .serializers import ItemSerializer, MaintenanceRecordSerializer, TransactionSerializer
+from django.db import transaction as db_transaction
+from django.db.models import F
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from core.fastpath import FastListMixin
+from core.views import SparseFieldsetMixin
+from . import analytics, exports, ledger, lookup, snapshots
+from .filters import ArchivedTransactionFilter, ItemFilter, MaintenanceRecordFilter, TransactionFilter
+from .models import ArchivedTransaction, Item, LocationStock, MaintenanceRecord, StockForecast, Transaction
+from .pagination import LedgerCursorPagination
+from .serializers import (
+    ArchivedTransactionSerializer, ConsumptionQuerySerializer, ItemSerializer, MaintenanceRecordSerializer,
+    TransactionSerializer, TransactionBatchRowSerializer, TransactionBatchSerializer,
+)
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ExportMixin:
+    export_columns = None
+    export_name = None
+
+    @action(detail=False)
+    def export(self, request):
+        """Stream every row matching the normal filters as ``?file_format=csv`` (default) or ``ndjson``."""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in exports.EXPORT_FORMATS:
+            raise ValidationError({'file_format': [f'Choose one of: {", ".join(exports.EXPORT_FORMATS)}.']})
+        queryset = self.filter_queryset(self.get_queryset())
+        return exports.export_response(queryset, self.export_columns, file_format, self.export_name)
+
+class ItemViewSet(ExportMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
+    export_columns = exports.ITEM_COLUMNS
+    export_name = 'items'
+    filterset_class = ItemFilter
+
+    def list(self, request, *args, **kwargs):
+        if 'as_of' in request.query_params:
+            return self.as_of_list(request)
+        return super().list(request, *args, **kwargs)
+
+    def as_of_list(self, request):
+        """Items as they were at ``?as_of=`` (ISO datetime, or a date for its end), with past quantities."""
+        moment = snapshots.parse_moment(request.query_params['as_of'])
+        if moment is None:
+            raise ValidationError({'as_of': ['Provide an ISO 8601 date or datetime.']})
+        queryset = snapshots.stock_as_of(self.filter_queryset(self.get_queryset()), moment)
+        page = self.paginate_queryset(queryset)
+        items = list(queryset if page is None else page)
+        for item in items:
+            item.quantity = item.quantity_as_of
+        data = self.get_serializer(items, many=True).data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=False)
+    def lookup(self, request):
+        """Find one item by ``?barcode=`` or ``?serial=`` and return a compact, cached payload."""
+        for param, field in lookup.LOOKUP_FIELDS.items():
+            value = request.query_params.get(param)
+            if value:
+                break
+        else:
+            raise ValidationError({'barcode': ['Provide barcode or serial.']})
+        payload = lookup.lookup_item(field, value)
+        if payload is None:
+            raise NotFound()
+        return Response(payload)
+
+    @action(detail=False, url_path='restock-queue')
+    def restock_queue(self, request):
+        """Low-stock items grouped by supplier, with the shortfall to reach the minimum."""
+        rows = (
+            self.filter_queryset(self.get_queryset()).needs_restock().with_shortfall()
+            .order_by('supplier_id', 'name')
+            .values('id', 'name', 'barcode', 'unit', 'quantity', 'minimum_quantity', 'shortfall',
+                    'supplier_id', 'supplier__name')
+        )
+        suppliers = []
+        for row in rows:
+            if not suppliers or suppliers[-1]['supplier'] != row['supplier_id']:
+                suppliers.append({
+                    'supplier': row['supplier_id'],
+                    'supplier_name': row['supplier__name'],
+                    'total_shortfall': 0,
+                    'items': [],
+                })
+            group = suppliers[-1]
+            group['total_shortfall'] += row['shortfall']
+            group['items'].append({
+                key: row[key] for key in ('id', 'name', 'barcode', 'unit', 'quantity', 'minimum_quantity', 'shortfall')
+            })
+        return Response(suppliers)
 
-class MaintenanceRecordViewSet(viewsets.ModelViewSet):
+    @action(detail=False)
+    def forecast(self, request):
+        """Stored stock-out forecasts, soonest first; ``?within=N`` keeps items running out within N days."""
+        forecasts = StockForecast.objects.filter(item__in=self.filter_queryset(self.get_queryset()).values('pk'))
+        within = request.query_params.get('within')
+        if within:
+            try:
+                forecasts = forecasts.filter(days_until_stockout__lte=float(within))
+            except ValueError:
+                raise ValidationError({'within': ['A number of days is required.']})
+        rows = (
+            forecasts.order_by(F('days_until_stockout').asc(nulls_last=True), 'item__name', 'item_id')
+            .values('item_id', 'item__name', 'item__unit', 'item__quantity', 'item__minimum_quantity',
+                    'item__supplier_id', 'daily_rate', 'days_until_stockout', 'days_until_minimum',
+                    'suggested_reorder', 'computed_at')
+        )
+        page = self.paginate_queryset(rows)
+        data = [
+            {
+                'id': row['item_id'],
+                'name': row['item__name'],
+                'unit': row['item__unit'],
+                'quantity': row['item__quantity'],
+                'minimum_quantity': row['item__minimum_quantity'],
+                'supplier': row['item__supplier_id'],
+                'daily_rate': row['daily_rate'],
+                'days_until_stockout': row['days_until_stockout'],
+                'days_until_minimum': row['days_until_minimum'],
+                'suggested_reorder': row['suggested_reorder'],
+                'computed_at': row['computed_at'],
+            }
+            for row in (rows if page is None else page)
+        ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+class MaintenanceRecordViewSet(FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = MaintenanceRecord.objects.all()
     serializer_class = MaintenanceRecordSerializer
+    filterset_class = MaintenanceRecordFilter
+    pagination_class = LedgerCursorPagination
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ExportMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
+    pagination_class = LedgerCursorPagination
+    export_columns = exports.TRANSACTION_COLUMNS
+    export_name = 'transactions'
+    filterset_class = TransactionFilter
+
+    def perform_create(self, serializer):
+        serializer.instance = ledger.post_transaction(Transaction(**serializer.validated_data))
+
+    def perform_update(self, serializer):
+        with db_transaction.atomic():
+            ledger.revert_transaction(Transaction.objects.select_for_update().get(pk=serializer.instance.pk))
+            ledger.apply_transaction(serializer.save())
+
+    def perform_destroy(self, instance):
+        with db_transaction.atomic():
+            ledger.delete_transaction(Transaction.objects.select_for_update().get(pk=instance.pk))
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Post a batch of transactions in one database transaction.
+
+        Accepts a list of rows, or ``{"transactions": [...], "allow_partial": true}``
+        to write the valid rows even when others fail.
+        """
+        data = request.data
+        allow_partial = False
+        if isinstance(data, dict):
+            batch = TransactionBatchSerializer(data=data)
+            batch.is_valid(raise_exception=True)
+            data, allow_partial = batch.validated_data['transactions'], batch.validated_data['allow_partial']
+        if not isinstance(data, list):
+            return Response({'detail': 'Expected a list of transactions.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, errors = [], {}
+        for index, raw in enumerate(data):
+            row = TransactionBatchRowSerializer(data=raw)
+            if row.is_valid():
+                rows.append((index, row.validated_data))
+            else:
+                errors[index] = row.errors
+        created, ledger_errors = [], {}
+        if rows:
+            created, ledger_errors = ledger.post_transactions(
+                [row for _, row in rows], allow_partial, commit=allow_partial or not errors,
+            )
+        errors.update({rows[position][0]: row_errors for position, row_errors in ledger_errors.items()})
+
+        body = {
+            'created': [transaction.pk for transaction in created],
+            'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+        }
+        if errors and not created:
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
+        return Response(body, status=status.HTTP_201_CREATED)
+
+class ArchivedTransactionViewSet(viewsets.ReadOnlyModelViewSet):
+    """Transactions moved out of the hot ledger by ``archive_transactions``.
+
+    Read-only and kept apart from ``/transactions/`` on purpose: the archive
+    is large and cold, so only filtered, cursor-paged reads are offered.
+    """
+    queryset = ArchivedTransaction.objects.all()
+    serializer_class = ArchivedTransactionSerializer
+    pagination_class = LedgerCursorPagination
+    filterset_class = ArchivedTransactionFilter
+
+class LocationStockActions:
+    """The ``stock`` action of ``core.views.LocationViewSet``, attached by ``InventConfig.ready()``."""
+
+    @action(detail=True)
+    def stock(self, request, pk=None):
+        """Units held at this location and all locations below it, read from the rollup."""
+        location = self.get_object()
+        rows = list(
+            LocationStock.objects.filter(location=location).exclude(quantity=0)
+            .order_by('category__name', 'item_type')
+            .values('category_id', 'category__name', 'item_type', 'quantity')
+        )
+        return Response({
+            'location': location.pk,
+            'total': sum(row['quantity'] for row in rows),
+            'stock': [
+                {
+                    'category': row['category_id'],
+                    'category_name': row['category__name'],
+                    'item_type': row['item_type'],
+                    'quantity': row['quantity'],
+                }
+                for row in rows
+            ],
+        })
+
+class ConsumptionViewSet(viewsets.ViewSet):
+    """Units and money moved per day, week or month, read from the daily rollup.
+
+    ``?start=&end=`` bound the window, ``?bucket=day|week|month`` sets the period,
+    ``?group_by=item|category|location`` splits each period, and ``?item=``,
+    ``?category=`` and ``?location=`` narrow it (categories and locations
+    include their subtree).
+    """
+
+    def list(self, request):
+        params = ConsumptionQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        return Response({
+            'start': query['start'],
+            'end': query['end'],
+            'bucket': query['bucket'],
+            'group_by': query.get('group_by'),
+            'results': analytics.consumption_report(**query),
+        })
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from decouple import Csv, config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,12 +49,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,9 +66,12 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'django_filters.rest_framework.DjangoFilterBackend',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
 }
@@ -72,6 +79,9 @@ REST_FRAMEWORK = {
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',  # Vite default port
 ]
+# EventSource cannot send an Authorization header, so the front end reaches
+# the stock stream with its session cookie.
+CORS_ALLOW_CREDENTIALS = True
 
 ROOT_URLCONF = 'inventory.urls'
 
@@ -96,12 +106,116 @@ WSGI_APPLICATION = 'inventory.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Everything comes from the environment (or a .env file) and defaults to the
+# local SQLite file. Connections are kept open for DB_CONN_MAX_AGE seconds and
+# health-checked before reuse. SQLite connections run in WAL mode with a busy
+# timeout (see core.db), so readers do not block the ledger writers.
+
+DB_ENGINE = config('DB_ENGINE', default='django.db.backends.sqlite3')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': DB_ENGINE,
+        'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        'USER': config('DB_USER', default=''),
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'HOST': config('DB_HOST', default=''),
+        'PORT': config('DB_PORT', default=''),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    # Seconds a connection waits for the write lock before "database is locked".
+    DATABASES['default']['OPTIONS']['timeout'] = config('DB_BUSY_TIMEOUT', default=5, cast=int)
+
+# Read replicas of the primary, by host. Without any, SQLite gets a local
+# stand-in: a second connection to the same file, which under WAL reads a
+# consistent snapshot without waiting for writers. Replicas mirror the primary
+# in tests.
+DB_REPLICA_HOSTS = config('DB_REPLICA_HOSTS', default='', cast=Csv())
+if not DB_REPLICA_HOSTS and DB_ENGINE == 'django.db.backends.sqlite3':
+    DB_REPLICA_HOSTS = ['']
+for index, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host or DATABASES['default']['HOST'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write, so it sees
+# its own changes while the replicas catch up.
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Seconds a barcode / serial-number lookup stays cached. Only used with a
+# cache backend shared between worker processes; the local-memory default
+# disables it.
+INVENT_LOOKUP_CACHE_TIMEOUT = 300
+
+# Seconds a core reference-data response stays cached. Entries are also
+# superseded as soon as the underlying model changes.
+CORE_RESPONSE_CACHE_TIMEOUT = 600
+
+# Seconds an API token's user lookup stays cached. Deleting the token or
+# saving its user drops the entry immediately. Only used with a cache backend
+# shared between worker processes; the local-memory default disables it.
+CORE_TOKEN_CACHE_TIMEOUT = 60
+
+# Share of requests (0.0 - 1.0) timed by core.instrumentation; 0 turns it off.
+# Sampled requests get a Server-Timing header and feed the per-route
+# histograms at /api/metrics/; the last CORE_INSTRUMENTATION_WINDOW samples of
+# each route are kept. Sampled requests slower than CORE_SLOW_REQUEST_MS are
+# logged with their slowest query.
+CORE_INSTRUMENTATION_SAMPLE_RATE = config('CORE_INSTRUMENTATION_SAMPLE_RATE', default=0.0, cast=float)
+CORE_INSTRUMENTATION_WINDOW = 1000
+CORE_SLOW_REQUEST_MS = config('CORE_SLOW_REQUEST_MS', default=500, cast=int)
+
+# Transactions older than INVENT_ARCHIVE_HORIZON_DAYS are moved to the archive
+# table by manage.py archive_transactions.
+INVENT_ARCHIVE_HORIZON_DAYS = 365
+
+# Stock-change stream at /invent/stream/stock/ (ASGI only): a subscriber more
+# than INVENT_STREAM_QUEUE_SIZE events behind is told to resync; the last
+# INVENT_STREAM_REPLAY events are kept for clients reconnecting with
+# Last-Event-ID. Connections get a keepalive comment every
+# INVENT_STREAM_HEARTBEAT_SECONDS and are closed after INVENT_STREAM_MAX_SECONDS,
+# after which EventSource reconnects within INVENT_STREAM_RETRY_MS.
+INVENT_STREAM_QUEUE_SIZE = 100
+INVENT_STREAM_REPLAY = 1000
+INVENT_STREAM_HEARTBEAT_SECONDS = 15
+INVENT_STREAM_MAX_SECONDS = 300
+INVENT_STREAM_RETRY_MS = 2000
+
+# Change feed at /api/changes/: rows are served once they are older than
+# CORE_CHANGES_SETTLE_SECONDS (longer than any write transaction plus clock
+# skew between workers), and delete tombstones are kept for
+# CORE_TOMBSTONE_RETENTION_DAYS, after which clients must sync from scratch.
+CORE_CHANGES_SETTLE_SECONDS = 5
+CORE_CHANGES_PAGE_SIZE = 500
+CORE_CHANGES_MAX_PAGE_SIZE = 5000
+CORE_TOMBSTONE_RETENTION_DAYS = 90
+
+# Stock-out forecasting: days of consumption history behind the daily rate,
+# and days of stock a suggested reorder should cover.
+INVENT_FORECAST_WINDOW_DAYS = 30
+INVENT_FORECAST_COVER_DAYS = 30
 
 
 # Password validation